@@ -0,0 +1,81 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Compare recursive translation/expectation functions of rest_sdk.utility
+# with precompiled accessors of rest_sdk.accessors.
+#
+#   python benchmarks/bench_accessors.py [elements] [repeat]
+
+from __future__ import print_function
+
+import copy
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from rest_sdk import accessors, utility  # noqa: E402
+
+
+def _response(count):
+    return {
+        'id': '6857017661',
+        'status': 'ready',
+        'payload': {'pages': [
+            {'page_name': 'page{}'.format(idx), 'id': idx,
+             'properties': {'color': 'blue', 'size': idx}}
+            for idx in range(count)]}}
+
+
+TRANSLATION = [
+    [['id'], ['id']],
+    [['payload', 'pages', ['page_name']], ['pages', ['name']]],
+    [['payload', 'pages', ['properties'], 'color'], ['colors']]]
+
+EXPECTATION = [['status', 'ready|active'],
+               ['payload', 'pages', 0, 'properties', 'color', 'blue']]
+
+
+def main(count, repeat):
+    response = _response(count)
+
+    def old():
+        # the old functions consume the translation and the expectation
+        for translation in TRANSLATION:
+            utility._translate_and_save(response,
+                                        [copy.deepcopy(translation)], {})
+        utility._check_expectation(response, copy.deepcopy(EXPECTATION))
+
+    call_accessors = accessors.CallAccessors({
+        'response_translation': TRANSLATION,
+        'response_expectation': EXPECTATION})
+
+    def new():
+        call_accessors.translation.apply(response, {})
+        call_accessors.check(response)
+
+    old_time = min(timeit.repeat(old, number=1, repeat=repeat))
+    new_time = min(timeit.repeat(new, number=1, repeat=repeat))
+    print('elements: {}'.format(count))
+    print('recursive: {:.4f}s'.format(old_time))
+    print('compiled:  {:.4f}s'.format(new_time))
+    print('speedup:   {:.1f}x'.format(old_time / new_time))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 3)
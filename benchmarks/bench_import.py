@@ -0,0 +1,141 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Cold start of a task: every run is a new interpreter which imports
+# rest_plugin.tasks and executes one operation against the local stub
+# server, the way an agent starts a task process.
+#
+#   python benchmarks/bench_import.py [-n runs] [-t template] [--json]
+#
+# Optional and format specific modules imported with rest_plugin.tasks are
+# listed, none of them should be needed before a call uses them.
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from stub_server import StubServer  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEMPLATES = {
+    'json': '''
+rest_calls:
+  - path: /json?items=10
+    method: GET
+    response_translation:
+      - [[id], [id]]
+''',
+    'jinja': '''
+rest_calls:
+  - path: /json?items={{ items }}
+    method: GET
+    response_translation:
+      - [[id], [id]]
+''',
+    'xml': '''
+rest_calls:
+  - path: /xml?items=10
+    method: GET
+    response_format: xml
+    response_translation:
+      - [[response, id], [id]]
+''',
+}
+
+OPTIONAL_MODULES = ('jinja2', 'xmltodict', 'ijson', 'multiprocessing.pool',
+                    'aiohttp', 'rest_sdk.aio', 'rest_sdk.cassette')
+
+# runs in a fresh interpreter, prints one json line
+CHILD = '''
+import json, sys, time
+started = time.time()
+from rest_plugin import tasks
+imported = time.time()
+optional = [name for name in {optional!r} if name in sys.modules]
+# the mock context imports modules of its own, not a part of the task
+from cloudify.mocks import MockCloudifyContext
+from cloudify.state import current_ctx
+ctx = MockCloudifyContext('node', properties={{
+    'host': '127.0.0.1', 'port': {port}, 'ssl': False, 'verify': True}},
+    runtime_properties={{}})
+ctx.get_resource = lambda name: {template!r}
+current_ctx.set(ctx)
+executed = time.time()
+tasks.execute({{'items': 10}}, 'template.yaml')
+finished = time.time()
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'execute_ms': (finished - executed) * 1000,
+    'optional': optional}}))
+'''
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def run(template, port, runs):
+    code = CHILD.format(port=port, template=TEMPLATES[template],
+                        optional=OPTIONAL_MODULES)
+    results = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', code],
+                                         cwd=ROOT)
+        results.append(json.loads(output.decode('utf-8').splitlines()[-1]))
+    return {'template': template,
+            'import_ms': _median([r['import_ms'] for r in results]),
+            'execute_ms': _median([r['execute_ms'] for r in results]),
+            'optional': results[-1]['optional']}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--runs', type=int, default=10)
+    parser.add_argument('-t', '--template', action='append',
+                        choices=sorted(TEMPLATES),
+                        help='run only given templates')
+    parser.add_argument('--json', action='store_true',
+                        help='print results as json lines')
+    args = parser.parse_args()
+
+    server = StubServer().start()
+    try:
+        if not args.json:
+            print('{:<10}{:>12}{:>12}  {}'.format(
+                'template', 'import ms', 'execute ms', 'optional modules'))
+        for template in args.template or sorted(TEMPLATES):
+            result = run(template, server.port, args.runs)
+            if args.json:
+                print(json.dumps(result, sort_keys=True))
+            else:
+                print('{:<10}{:>12.1f}{:>12.1f}  {}'.format(
+                    result['template'], result['import_ms'],
+                    result['execute_ms'],
+                    ', '.join(result['optional']) or '-'))
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
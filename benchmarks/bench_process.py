@@ -0,0 +1,180 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Benchmark of rest_sdk.utility.process against the local stub server or
+# a cassette recorded from it.
+#
+#   python benchmarks/bench_process.py                    # stub server
+#   python benchmarks/bench_process.py --record calls.json
+#   python benchmarks/bench_process.py --replay calls.json
+#   python benchmarks/bench_process.py -s json_huge_v2 -n 20
+#
+# Peak RSS is the peak of the whole run so far, run a single scenario to
+# see its own memory use.
+
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from stub_server import StubServer  # noqa: E402
+from rest_sdk import cassette, hosts, utility  # noqa: E402
+
+V1_TRANSLATION = '''
+    response_translation:
+      id: [id]
+      status: [status]
+      payload:
+        pages:
+          - page_name: [first_page]
+'''
+
+V2_TRANSLATION = '''
+    response_translation:
+      - [[id], [id]]
+      - [[payload, pages, [page_name]], [names]]
+      - [[payload, pages, [properties], color], [colors]]
+'''
+
+XML_TRANSLATION = '''
+    response_format: xml
+    response_translation:
+      - [[response, id], [id]]
+      - [[response, payload, pages, [page_name]], [names]]
+'''
+
+
+def _template(path, rest='', method='GET'):
+    return 'rest_calls:\n  - path: {}\n    method: {}\n{}'.format(
+        path, method, rest)
+
+
+# name -> (template, request_props)
+SCENARIOS = [
+    ('json_small_v1', _template('/json?items=10', V1_TRANSLATION), {}),
+    ('json_small_v2', _template('/json?items=10', V2_TRANSLATION), {}),
+    ('json_huge_v2', _template('/json?items=20000', V2_TRANSLATION), {}),
+    ('json_huge_v2_stream', _template(
+        '/json?items=20000', V2_TRANSLATION + '    stream_response: true\n'),
+     {}),
+    ('xml_small', _template('/xml?items=10', XML_TRANSLATION), {}),
+    ('xml_huge', _template('/xml?items=20000', XML_TRANSLATION), {}),
+    ('xml_huge_stream', _template(
+        '/xml?items=20000', XML_TRANSLATION + '    stream_response: true\n'),
+     {}),
+    ('raw_small', _template('/raw?size=1024',
+                            '    response_format: raw\n'), {}),
+    ('raw_huge', _template('/raw?size=4194304',
+                           '    response_format: raw\n'), {}),
+    ('failover', _template('/json?items=10', V2_TRANSLATION),
+     {'hosts': ['127.0.0.2', '127.0.0.1']}),
+]
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on mac
+    return peak / (1024.0 * 1024 if sys.platform == 'darwin' else 1024.0)
+
+
+def run(name, template, request_props, transport, iterations):
+    # first run warms up connections and the template cache
+    utility.process({}, template, dict(request_props), transport)
+    gc.collect()
+    latencies = []
+    started = time.time()
+    for _ in range(iterations):
+        # hosts which failed are skipped by the selector of the process,
+        # forget them so that every run fails over
+        hosts.get_default_selector().reset()
+        call_started = time.time()
+        utility.process({}, template, dict(request_props), transport)
+        latencies.append(time.time() - call_started)
+    elapsed = time.time() - started
+    return {'scenario': name,
+            'calls_per_sec': iterations / elapsed,
+            'p50_ms': _percentile(latencies, 50) * 1000,
+            'p99_ms': _percentile(latencies, 99) * 1000,
+            'peak_rss_mb': _peak_rss_mb()}
+
+
+def _cassette_port(path):
+    with open(path) as f:
+        url = json.load(f)['interactions'][0]['request']['url']
+    return int(url.split('/')[2].rsplit(':', 1)[1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--iterations', type=int, default=50)
+    parser.add_argument('-s', '--scenario', action='append',
+                        help='run only given scenarios')
+    parser.add_argument('--port', type=int, default=0,
+                        help='stub server port')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--record', metavar='CASSETTE')
+    group.add_argument('--replay', metavar='CASSETTE')
+    parser.add_argument('--json', action='store_true',
+                        help='print results as json lines')
+    args = parser.parse_args()
+
+    server = None
+    if args.replay:
+        port = _cassette_port(args.replay)
+        transport = cassette.ReplayTransport(args.replay)
+    else:
+        server = StubServer(port=args.port).start()
+        port = server.port
+        transport = cassette.RecordingTransport(args.record) \
+            if args.record else None
+    try:
+        if not args.json:
+            print('{:<22}{:>12}{:>10}{:>10}{:>12}'.format(
+                'scenario', 'calls/sec', 'p50 ms', 'p99 ms', 'rss MB'))
+        for name, template, props in SCENARIOS:
+            if args.scenario and name not in args.scenario:
+                continue
+            request_props = {'host': '127.0.0.1', 'port': port,
+                             'ssl': False, 'verify': True}
+            request_props.update(props)
+            result = run(name, template, request_props, transport,
+                         args.iterations)
+            if args.json:
+                print(json.dumps(result, sort_keys=True))
+            else:
+                print('{scenario:<22}{calls_per_sec:>12.1f}{p50_ms:>10.2f}'
+                      '{p99_ms:>10.2f}{peak_rss_mb:>12.1f}'.format(**result))
+        if args.record:
+            transport.save()
+    finally:
+        if server is not None:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Local HTTP server answering with generated documents.
+#
+#   GET /json?items=1000&latency=5   json document with 1000 list items,
+#                                    sent after 5 ms
+#   GET /xml?items=1000              same document as xml
+#   GET /raw?size=65536              random bytes
+#
+#   python benchmarks/stub_server.py [port]
+
+from __future__ import print_function
+
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+
+
+def document(items):
+    return {
+        'id': '6857017661',
+        'status': 'ready',
+        'payload': {'pages': [
+            {'page_name': 'page{}'.format(idx), 'id': idx,
+             'properties': {'color': 'blue', 'size': idx}}
+            for idx in range(items)]}}
+
+
+def xml_document(items):
+    pages = ''.join(
+        '<pages><page_name>page{0}</page_name><id>{0}</id>'
+        '<properties><color>blue</color><size>{0}</size></properties>'
+        '</pages>'.format(idx) for idx in range(items))
+    return ('<?xml version="1.0" encoding="UTF-8"?><response>'
+            '<id>6857017661</id><status>ready</status>'
+            '<payload>{}</payload></response>'.format(pages))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately
+    disable_nagle_algorithm = True
+    _bodies = {}
+    _lock = threading.Lock()
+
+    def do_GET(self):
+        # request body is not used, but has to be read for keep-alive
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        url = urlparse(self.path)
+        query = dict((key, values[-1])
+                     for key, values in parse_qs(url.query).items())
+        latency = float(query.get('latency', 0)) / 1000
+        if latency:
+            time.sleep(latency)
+        kind = url.path.strip('/')
+        if kind not in ('json', 'xml', 'raw'):
+            self.send_error(404)
+            return
+        size = int(query.get('items', query.get('size', 10)))
+        body, content_type = self._body(kind, size)
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+    do_PUT = do_GET
+
+    def _body(self, kind, size):
+        # generated once for every kind and size
+        key = (kind, size)
+        with self._lock:
+            if key not in self._bodies:
+                if kind == 'json':
+                    self._bodies[key] = (
+                        json.dumps(document(size)).encode('utf-8'),
+                        'application/json')
+                elif kind == 'xml':
+                    self._bodies[key] = (
+                        xml_document(size).encode('utf-8'),
+                        'application/xml; charset=utf-8')
+                else:
+                    self._bodies[key] = (os.urandom(size),
+                                         'application/octet-stream')
+            return self._bodies[key]
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        HTTPServer.__init__(self, (host, port), _Handler)
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    server = StubServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 0)
+    print('listening on port {}'.format(server.port))
+    server.serve_forever()
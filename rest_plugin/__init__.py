@@ -14,8 +14,12 @@
 #    * limitations under the License.
 
 import logging
+from contextlib import contextmanager
 from cloudify import ctx as imported_ctx
+from cloudify.state import current_ctx, current_workflow_ctx, \
+    workflow_ctx, NotInContext
 from rest_sdk import LOGGER_NAME as SDK_LOGGER_NAME
+from rest_sdk import parallel, payload
 
 
 class CfyLogHandler(logging.Handler):
@@ -40,10 +44,69 @@ class CfyLogHandler(logging.Handler):
         :param record: log record to write
         :type record: logging.LogRecord
         """
+        try:
+            logger = self.ctx.logger
+        except NotInContext:
+            # calls sent by a workflow, like bulk_execute
+            logger = workflow_ctx.logger
+        # messages of the SDK are formatted here, skip the ones the
+        # Cloudify logger would drop anyway
+        if not logger.isEnabledFor(record.levelno):
+            return
         message = self.format(record)
-        self.ctx.logger.log(record.levelno, message)
+        logger.log(record.levelno, message)
 
 
 handler = CfyLogHandler(imported_ctx)
 logging.getLogger(SDK_LOGGER_NAME).setLevel(logging.DEBUG)
 logging.getLogger(SDK_LOGGER_NAME).addHandler(handler)
+
+
+def _capture_ctx():
+    return _capture(current_ctx)
+
+
+def _push_ctx(captured_ctx):
+    return _push(current_ctx, captured_ctx)
+
+
+def _capture_workflow_ctx():
+    return _capture(current_workflow_ctx)
+
+
+def _push_workflow_ctx(captured_ctx):
+    return _push(current_workflow_ctx, captured_ctx)
+
+
+def _capture(current):
+    try:
+        return current.get_ctx()
+    except NotInContext:
+        return None
+
+
+@contextmanager
+def _push(current, captured_ctx):
+    if captured_ctx is None:
+        yield
+    else:
+        with current.push(captured_ctx):
+            yield
+
+
+# calls processed in parallel log from worker threads
+parallel.register_context_propagator(_capture_ctx, _push_ctx)
+parallel.register_context_propagator(_capture_workflow_ctx,
+                                     _push_workflow_ctx)
+
+
+def _download_resource(path):
+    try:
+        return imported_ctx.download_resource(path)
+    except NotInContext:
+        return workflow_ctx.internal.handler.download_deployment_resource(
+            path)
+
+
+# relative payload_file paths are blueprint resources
+payload.set_resource_resolver(_download_resource)
@@ -0,0 +1,236 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Results of an operation written to runtime properties. Only keys whose
+# value changed are set: runtime properties are uploaded to the manager
+# when any key was set, an operation which changed nothing doesn't upload
+# them at all.
+#
+# A value bigger than max_property_size bytes (JSON) is written gzipped
+# to a Store, named by its digest, and the property gets a reference:
+#
+#   {SPILLED_KEY: /path/dep/vm_1/items-9f86d0818.json.gz, bytes: 1048576,
+#    sha256: 9f86d081884c7d65...}
+#
+# The same value gives the same reference, so an unchanged spilled value
+# doesn't change the property either. load() reads the value back, values
+# no longer referenced are removed by release().
+
+import base64
+import gzip
+import hashlib
+import io
+import json
+import os
+
+SPILLED_KEY = 'rest_spilled'
+# location of a value kept as a secret of the manager
+SECRET = 'secret:'
+# property_store keeping values as secrets of the manager, visible to the
+# whole tenant, used only when chosen
+MANAGER = 'manager'
+# property_store by default, in the home directory of the agent
+DEFAULT_DIRECTORY = os.path.join(
+    os.path.expanduser('~'), '.cloudify-rest-plugin', 'properties')
+
+
+def write(runtime_properties, result, max_size=0, store=None):
+    """
+    Set keys of result which differ from runtime_properties, values over
+    max_size bytes are spilled to store. Returns counts of what was
+    written and (released) locations of spilled values replaced.
+    """
+    statistics = {'keys': 0, 'unchanged': 0, 'bytes': 0, 'spilled': 0,
+                  'spilled_bytes': 0, 'released': []}
+    for key, value in result.items():
+        previous = runtime_properties.get(key)
+        if key in runtime_properties and previous == value:
+            statistics['unchanged'] += 1
+            continue
+        data = _dumps(value)
+        if max_size and len(data) > max_size and store is not None:
+            value = store.put(key, data)
+            statistics['spilled'] += 1
+            statistics['spilled_bytes'] += len(data)
+            if previous == value:
+                statistics['unchanged'] += 1
+                continue
+            data = _dumps(value)
+        runtime_properties[key] = value
+        statistics['keys'] += 1
+        statistics['bytes'] += len(data)
+        if is_spilled(previous):
+            statistics['released'].append(previous[SPILLED_KEY])
+    return statistics
+
+
+def is_spilled(value):
+    return isinstance(value, dict) and SPILLED_KEY in value
+
+
+def load(value, store=None):
+    """
+    Value of a property, read from the store when it was spilled.
+    """
+    if not is_spilled(value):
+        return value
+    data = (store or Store()).get(value[SPILLED_KEY])
+    return json.loads(data.decode('utf-8'))
+
+
+def load_all(runtime_properties, store=None):
+    """
+    Copy of runtime_properties with spilled values read back.
+    """
+    return dict((key, load(value, store))
+                for key, value in runtime_properties.items())
+
+
+def release(locations, store=None):
+    """
+    Remove spilled values, call it when the runtime properties which
+    referenced them were stored.
+    """
+    store = store or Store()
+    for location in locations:
+        store.delete(location)
+
+
+def spilled(runtime_properties):
+    """
+    Locations of all spilled values of runtime_properties.
+    """
+    return [value[SPILLED_KEY] for value in runtime_properties.values()
+            if is_spilled(value)]
+
+
+def instance_store(location, deployment_id, instance_id):
+    """
+    Store of spilled values of a node instance, location is a directory,
+    MANAGER or empty - DEFAULT_DIRECTORY.
+    """
+    if location == MANAGER:
+        return Store(prefix='rest-{}-{}-'.format(
+            _name(deployment_id or ''), _name(instance_id or '')))
+    return Store(directory=os.path.join(
+        location or DEFAULT_DIRECTORY, deployment_id or '',
+        instance_id or ''))
+
+
+class Store(object):
+    """
+    Where spilled values of a node instance are kept: gzipped files in
+    directory or, without directory, secrets of the manager named by
+    prefix. Values of any
+    location can be read and removed.
+    """
+
+    def __init__(self, directory=None, prefix='', client=None):
+        self.directory = directory
+        self.prefix = prefix
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from cloudify.manager import get_rest_client
+            self._client = get_rest_client()
+        return self._client
+
+    def put(self, key, data):
+        digest = hashlib.sha256(data).hexdigest()
+        name = '{}-{}'.format(_name(key), digest[:16])
+        if self.directory:
+            location = self._put_file(name, data)
+        else:
+            location = self._put_secret(name, data)
+        return {SPILLED_KEY: location, 'bytes': len(data), 'sha256': digest}
+
+    def get(self, location):
+        if location.startswith(SECRET):
+            value = self.client.secrets.get(location[len(SECRET):]).value
+            return _decompress(base64.b64decode(value))
+        with open(location, 'rb') as f:
+            return _decompress(f.read())
+
+    def delete(self, location):
+        from cloudify_rest_client.exceptions import CloudifyClientError
+        try:
+            if location.startswith(SECRET):
+                self.client.secrets.delete(location[len(SECRET):])
+            else:
+                os.remove(location)
+        except CloudifyClientError as e:
+            if e.status_code != 404:
+                raise
+        except OSError:
+            if os.path.exists(location):
+                raise
+
+    def _put_file(self, name, data):
+        path = os.path.join(self.directory, name + '.json.gz')
+        if os.path.exists(path):
+            return path
+        if not os.path.isdir(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError:
+                if not os.path.isdir(self.directory):
+                    raise
+        partial = '{}.{}.part'.format(path, os.getpid())
+        with open(partial, 'wb') as f:
+            f.write(_compress(data))
+        os.rename(partial, path)
+        return path
+
+    def _put_secret(self, name, data):
+        from cloudify_rest_client.exceptions import CloudifyClientError
+        key = self.prefix + name
+        try:
+            self.client.secrets.create(
+                key, base64.b64encode(_compress(data)).decode('ascii'))
+        except CloudifyClientError as e:
+            # named by the digest, an existing one has the same value
+            if e.status_code != 409:
+                raise
+        return SECRET + key
+
+
+def _name(key):
+    return ''.join(c if c.isalnum() or c in '-_' else '_' for c in key)
+
+
+def _dumps(value):
+    return json.dumps(value, sort_keys=True,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def _compress(data):
+    buf = io.BytesIO()
+    # mtime 0 keeps the artifact the same for the same value
+    f = gzip.GzipFile(fileobj=buf, mode='wb', mtime=0)
+    try:
+        f.write(data)
+    finally:
+        f.close()
+    return buf.getvalue()
+
+
+def _decompress(data):
+    f = gzip.GzipFile(fileobj=io.BytesIO(data), mode='rb')
+    try:
+        return f.read()
+    finally:
+        f.close()
@@ -0,0 +1,69 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Processing of a template for a node instance shared by operations
+# (tasks) and the bulk_execute workflow: params of the call rendered from
+# runtime properties, request properties from node properties and results
+# written back to runtime properties.
+
+import os
+
+from rest_sdk import download
+from rest_plugin import properties
+
+# runtime property with progress of operations which failed with
+# RecoverableError by operation name (and target instance of relationship
+# operations), the retry resumes from the failed call
+CHECKPOINT_PROPERTY = 'rest_checkpoint'
+
+
+def params(params, *runtime_properties):
+    """
+    Params of the template: runtime properties (of the target and then of
+    the source instance of a relationship) with spilled values loaded,
+    updated with params.
+    """
+    result = {}
+    for instance_properties in runtime_properties:
+        result.update(properties.load_all(instance_properties))
+    result.update(params or {})
+    result.pop(CHECKPOINT_PROPERTY, None)
+    return result
+
+
+def request_props(node_properties, deployment_id):
+    result = node_properties.copy()
+    # downloads of every deployment in a directory of its own
+    result['download_dir'] = os.path.join(
+        result.get('download_dir') or download.default_directory(),
+        deployment_id or '')
+    return result
+
+
+def store(node_properties, deployment_id, instance_id):
+    """
+    Store of spilled values of the instance, see property_store.
+    """
+    return properties.instance_store(node_properties.get('property_store'),
+                                     deployment_id, instance_id)
+
+
+def write_result(runtime_properties, result, node_properties, store):
+    """
+    Write result to runtime_properties, see properties.write.
+    """
+    return properties.write(
+        runtime_properties, result,
+        node_properties.get('max_property_size') or 0, store)
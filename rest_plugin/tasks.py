@@ -13,48 +13,153 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import json
 import traceback
 from cloudify import ctx
 from cloudify.exceptions import NonRecoverableError, RecoverableError
-from rest_sdk import utility, exceptions
+from rest_sdk import metrics, utility, exceptions
+from rest_plugin import properties, runtime
+from rest_plugin.runtime import CHECKPOINT_PROPERTY
+
+# runtime property with timings summary, see metrics_summary node property
+METRICS_PROPERTY = 'rest_metrics'
+# spilled values of an instance are removed by this operation
+DELETE_OPERATION = 'cloudify.interfaces.lifecycle.delete'
 
 
 def execute(params, template_file, **kwargs):
     ctx.logger.debug(
         'execute \n params {} \n template \n'.format(params, template_file))
-    runtime_properties = ctx.instance.runtime_properties.copy()
-    if not params:
-        params = {}
-    runtime_properties.update(params)
-    _execute(runtime_properties, template_file, ctx.instance, ctx.node)
+    _execute(runtime.params(params, ctx.instance.runtime_properties),
+             template_file, ctx.instance, ctx.node)
 
 
 def execute_as_relationship(params, template_file, **kwargs):
     ctx.logger.debug(
         'execute_as_relationship \n '
         'params {} \n template \n'.format(params, template_file))
-    if not params:
-        params = {}
-    runtime_properties = ctx.target.instance.runtime_properties.copy()
-    runtime_properties.update(ctx.source.instance.runtime_properties)
-    runtime_properties.update(params)
-    _execute(runtime_properties, template_file, ctx.source.instance,
-             ctx.source.node)
+    _execute(runtime.params(params,
+                            ctx.target.instance.runtime_properties,
+                            ctx.source.instance.runtime_properties),
+             template_file, ctx.source.instance, ctx.source.node,
+             ctx.target.instance.id)
 
 
-def _execute(params, template_file, instance, node):
+def _execute(params, template_file, instance, node, target_id=None):
     if not template_file:
         ctx.logger.info(
             'Processing finished. No template file provided.')
+        _release(instance, node, [])
         return
     template = ctx.get_resource(template_file)
+    # relationship operations have a checkpoint for every target
+    key = ctx.operation.name if target_id is None else \
+        '{}/{}'.format(ctx.operation.name, target_id)
+    store = runtime.store(node.properties, ctx.deployment.id, instance.id)
+    progress = _get_checkpoint(instance, key, store)
+    collector = metrics.Collector()
+    request_props = runtime.request_props(node.properties, ctx.deployment.id)
     try:
-        instance.runtime_properties.update(
-            utility.process(params, template, node.properties.copy()))
+        result = utility.process(params, template, request_props,
+                                 checkpoint=progress,
+                                 metrics_sink=collector)
     except (exceptions.ExpectationException,
-            exceptions.RecoverebleStatusCodeCodeException)as e:
+            exceptions.RecoverebleStatusCodeCodeException,
+            exceptions.DeadlineExceededException)as e:
+        _release(instance, node, _set_checkpoint(instance, key, progress,
+                                                 node, store), store,
+                 succeeded=False)
         raise RecoverableError(e)
     except Exception as e:
+        _release(instance, node, _drop_checkpoint(instance, key), store,
+                 succeeded=False)
         ctx.logger.info(
             'Exception traceback : {}'.format(traceback.format_exc()))
         raise NonRecoverableError(e)
+    finally:
+        _report_metrics(collector, instance, node)
+    released = _drop_checkpoint(instance, key)
+    statistics = runtime.write_result(instance.runtime_properties, result,
+                                      node.properties, store)
+    ctx.logger.info(
+        'runtime properties: {keys} keys written ({bytes} bytes), '
+        '{unchanged} unchanged, {spilled} values spilled '
+        '({spilled_bytes} bytes)'.format(**statistics))
+    _release(instance, node, released + statistics['released'], store)
+
+
+def _release(instance, node, released, store=None, succeeded=True):
+    # spilled values replaced by the operation, all of them when delete
+    # succeeded
+    if succeeded and ctx.operation.name == DELETE_OPERATION:
+        released = released + properties.spilled(
+            instance.runtime_properties)
+    if not released:
+        return
+    # replaced values are referenced until the update
+    instance.update()
+    properties.release(released, store or runtime.store(
+        node.properties, ctx.deployment.id, instance.id))
+
+
+def _get_checkpoint(instance, key, store):
+    # checkpoint is used only by retries of the same operation
+    checkpoints = instance.runtime_properties.get(CHECKPOINT_PROPERTY) or {}
+    if key not in checkpoints or not ctx.operation.retry_number:
+        return {}
+    progress = dict(checkpoints[key])
+    progress['results'] = properties.load(progress.get('results'), store)
+    return progress
+
+
+def _set_checkpoint(instance, key, progress, node, store):
+    # results of the calls done are spilled like the results of the
+    # operation, returns locations of the results replaced
+    checkpoints = dict(instance.runtime_properties.get(CHECKPOINT_PROPERTY)
+                       or {})
+    previous = checkpoints.get(key, {}).get('results')
+    saved = dict((name, value) for name, value in progress.items()
+                 if name != 'results')
+    # spilled under a name of the checkpoint, checkpoints of other targets
+    # with the same results don't share it
+    name = 'checkpoint-{}'.format(key)
+    written = {}
+    runtime.write_result(written, {name: progress.get('results', {})},
+                         node.properties, store)
+    saved['results'] = written[name]
+    checkpoints[key] = saved
+    instance.runtime_properties[CHECKPOINT_PROPERTY] = checkpoints
+    if properties.is_spilled(previous) and previous != saved['results']:
+        return [previous[properties.SPILLED_KEY]]
+    return []
+
+
+def _drop_checkpoint(instance, key):
+    # returns locations of its spilled results, runtime properties are
+    # uploaded when changed, even by a pop of a missing key
+    checkpoints = instance.runtime_properties.get(CHECKPOINT_PROPERTY)
+    if not checkpoints or key not in checkpoints:
+        return []
+    checkpoints = dict(checkpoints)
+    results = checkpoints.pop(key).get('results')
+    if checkpoints:
+        instance.runtime_properties[CHECKPOINT_PROPERTY] = checkpoints
+    else:
+        del instance.runtime_properties[CHECKPOINT_PROPERTY]
+    if properties.is_spilled(results):
+        return [results[properties.SPILLED_KEY]]
+    return []
+
+
+def _report_metrics(collector, instance, node):
+    target = node.properties.get('metrics_summary', 'log')
+    if target == 'none':
+        return
+    summary = collector.summary()
+    if target == 'runtime_properties':
+        # set only when changed, like the results
+        properties.write(instance.runtime_properties,
+                         {METRICS_PROPERTY: summary})
+    else:
+        ctx.logger.info('rest calls metrics: {}'.format(
+            json.dumps(summary, sort_keys=True)))
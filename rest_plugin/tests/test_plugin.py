@@ -13,14 +13,19 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 from cloudify.exceptions import RecoverableError, NonRecoverableError
-from cloudify.mocks import MockCloudifyContext
+from cloudify.manager import DirtyTrackingDict
+from cloudify.mocks import (MockCloudifyContext, MockNodeContext,
+                            MockNodeInstanceContext,
+                            MockRelationshipSubjectContext)
 from cloudify.state import current_ctx
 import unittest
 import requests_mock
 import json
 import os
+import shutil
+import tempfile
 
-from rest_plugin import tasks
+from rest_plugin import properties, runtime, tasks
 from mock import MagicMock
 import logging
 
@@ -180,3 +185,281 @@ class TestPlugin(unittest.TestCase):
                 current_ctx.get_ctx().instance.runtime_properties,
                 {'UUID': '111111111111111111111111111111',
                  'CPUID': 'ABS:FFF222777'})
+
+    def test_execute_retry_resumes_from_checkpoint(self):
+        template = '''
+rest_calls:
+  - path: /create
+    method: POST
+    response_translation: [[[id], [id]]]
+  - path: /status/{{id}}
+    method: GET
+    response_expectation: [state, ready]
+    response_translation: [[[state], [state]]]
+'''
+        properties = {'host': 'test123.test', 'port': -1, 'ssl': False,
+                      'verify': True}
+        _ctx = MockCloudifyContext('node_name', properties=properties,
+                                   runtime_properties={},
+                                   operation={'name': 'create',
+                                              'retry_number': 0})
+        _ctx.get_resource = MagicMock(return_value=template)
+        current_ctx.set(_ctx)
+        with requests_mock.mock() as m:
+            create = m.post('http://test123.test:80/create',
+                            json={'id': 'abc'})
+            m.get('http://test123.test:80/status/abc',
+                  json={'state': 'pending'})
+            with self.assertRaises(RecoverableError):
+                tasks.execute({}, 'mock_param')
+            runtime_properties = _ctx.instance.runtime_properties
+            self.assertEqual(
+                runtime_properties[tasks.CHECKPOINT_PROPERTY]['create'][
+                    'index'], 1)
+
+            _ctx = MockCloudifyContext('node_name', properties=properties,
+                                       runtime_properties=runtime_properties,
+                                       operation={'name': 'create',
+                                                  'retry_number': 1})
+            _ctx.get_resource = MagicMock(return_value=template)
+            current_ctx.set(_ctx)
+            m.get('http://test123.test:80/status/abc',
+                  json={'state': 'ready'})
+            tasks.execute({}, 'mock_param')
+            self.assertEqual(create.call_count, 1)
+            self.assertDictEqual(_ctx.instance.runtime_properties,
+                                 {'id': 'abc', 'state': 'ready'})
+
+    def test_relationship_checkpoint_per_target(self):
+        template = '''
+rest_calls:
+  - path: /create
+    method: POST
+    response_translation: [[[items], [items]]]
+  - path: /status
+    method: GET
+    response_expectation: [state, ready]
+    response_translation: [[[state], [state]]]
+'''
+        directory = tempfile.mkdtemp()
+        properties_ = {'host': 'test123.test', 'port': -1, 'ssl': False,
+                       'verify': True, 'max_property_size': 1024,
+                       'property_store': directory}
+        source = MockRelationshipSubjectContext(
+            MockNodeContext('source', properties_),
+            MockNodeInstanceContext('source_1', {}))
+
+        def _establish(target_id, retry_number):
+            _ctx = MockCloudifyContext(
+                source=source, target=MockRelationshipSubjectContext(
+                    MockNodeContext('target', {}),
+                    MockNodeInstanceContext(target_id, {})),
+                operation={'name': 'establish',
+                           'retry_number': retry_number})
+            _ctx.get_resource = MagicMock(return_value=template)
+            current_ctx.set(_ctx)
+            tasks.execute_as_relationship({}, 'mock_param')
+
+        runtime_properties = source.instance.runtime_properties
+        try:
+            with requests_mock.mock() as m:
+                create = m.post('http://test123.test:80/create',
+                                json={'items': list(range(1000))})
+                m.get('http://test123.test:80/status',
+                      json={'state': 'pending'})
+                for target_id in ('target_1', 'target_2'):
+                    with self.assertRaises(RecoverableError):
+                        _establish(target_id, 0)
+                checkpoints = runtime_properties[tasks.CHECKPOINT_PROPERTY]
+                self.assertEqual(sorted(checkpoints),
+                                 ['establish/target_1',
+                                  'establish/target_2'])
+                results = checkpoints['establish/target_1']['results']
+                self.assertTrue(properties.is_spilled(results))
+                m.get('http://test123.test:80/status',
+                      json={'state': 'ready'})
+                for target_id in ('target_1', 'target_2'):
+                    _establish(target_id, 1)
+                self.assertEqual(create.call_count, 2)
+            self.assertNotIn(tasks.CHECKPOINT_PROPERTY, runtime_properties)
+            self.assertEqual(runtime_properties['state'], 'ready')
+            self.assertEqual(properties.load(runtime_properties['items']),
+                             list(range(1000)))
+            # only the spilled items are left
+            self.assertEqual(len(os.listdir(os.path.join(
+                directory, 'source_1'))), 1)
+        finally:
+            shutil.rmtree(directory)
+
+    def _execute_items(self, runtime_properties, node_properties,
+                       items=None, operation=None):
+        template = """
+rest_calls:
+  - path: /items
+    method: GET
+    response_translation:
+      - [[count], [count]]
+      - [[items], [items]]
+"""
+        _ctx = MockCloudifyContext('node_name', properties=node_properties,
+                                   runtime_properties=runtime_properties,
+                                   operation={'name': operation})
+        _ctx.get_resource = MagicMock(return_value=template)
+        current_ctx.set(_ctx)
+        if items is None:
+            items = list(range(1000))
+        with requests_mock.mock() as m:
+            m.get('http://test123.test:80/items',
+                  json={'count': len(items), 'items': items})
+            tasks.execute({}, 'mock_param')
+        return _ctx.instance.runtime_properties
+
+    def test_execute_writes_changed_properties_only(self):
+        node_properties = {'host': 'test123.test', 'port': -1,
+                           'ssl': False, 'verify': True}
+        runtime_properties = DirtyTrackingDict({'name': 'vm'})
+        self._execute_items(runtime_properties, node_properties)
+        self.assertTrue(runtime_properties.dirty)
+        runtime_properties.dirty = False
+        self._execute_items(runtime_properties, node_properties)
+        self.assertFalse(runtime_properties.dirty)
+
+    def test_execute_spills_big_properties(self):
+        directory = tempfile.mkdtemp()
+        node_properties = {'host': 'test123.test', 'port': -1,
+                           'ssl': False, 'verify': True,
+                           'max_property_size': 1024,
+                           'property_store': directory}
+        try:
+            runtime_properties = DirtyTrackingDict({'name': 'vm'})
+            self._execute_items(runtime_properties, node_properties)
+            items = runtime_properties['items']
+            self.assertEqual(runtime_properties['count'], 1000)
+            self.assertTrue(properties.is_spilled(items))
+            self.assertTrue(items[properties.SPILLED_KEY].startswith(
+                directory))
+            self.assertEqual(properties.load(items), list(range(1000)))
+            runtime_properties.dirty = False
+            self._execute_items(runtime_properties, node_properties)
+            self.assertFalse(runtime_properties.dirty)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_execute_renders_spilled_properties(self):
+        directory = tempfile.mkdtemp()
+        node_properties = {'host': 'test123.test', 'port': -1,
+                           'ssl': False, 'verify': True,
+                           'max_property_size': 1024,
+                           'property_store': directory}
+        try:
+            runtime_properties = {'name': 'vm'}
+            self._execute_items(runtime_properties, node_properties,
+                                items=list(range(7, 1000)))
+            self.assertTrue(properties.is_spilled(
+                runtime_properties['items']))
+            _ctx = MockCloudifyContext(
+                'node_name', properties=node_properties,
+                runtime_properties=runtime_properties)
+            _ctx.get_resource = MagicMock(return_value="""
+rest_calls:
+  - path: /first/{{ items[0] }}
+    method: GET
+    response_translation:
+      - [[state], [state]]
+""")
+            current_ctx.set(_ctx)
+            with requests_mock.mock() as m:
+                m.get('http://test123.test:80/first/7',
+                      json={'state': 'ready'})
+                tasks.execute({}, 'mock_param')
+            self.assertEqual(runtime_properties['state'], 'ready')
+        finally:
+            shutil.rmtree(directory)
+
+    def test_execute_releases_spilled_properties(self):
+        directory = tempfile.mkdtemp()
+        node_properties = {'host': 'test123.test', 'port': -1,
+                           'ssl': False, 'verify': True,
+                           'max_property_size': 1024,
+                           'property_store': directory}
+        try:
+            runtime_properties = {'name': 'vm'}
+            self._execute_items(runtime_properties, node_properties)
+            first = runtime_properties['items'][properties.SPILLED_KEY]
+            self._execute_items(runtime_properties, node_properties,
+                                items=list(range(1, 1000)))
+            second = runtime_properties['items'][properties.SPILLED_KEY]
+            self.assertFalse(os.path.exists(first))
+            self.assertTrue(os.path.exists(second))
+            self._execute_items(runtime_properties, node_properties,
+                                items=list(range(1, 1000)),
+                                operation=tasks.DELETE_OPERATION)
+            self.assertFalse(os.path.exists(second))
+            # delete without a template
+            runtime_properties = {'name': 'vm'}
+            self._execute_items(runtime_properties, node_properties)
+            third = runtime_properties['items'][properties.SPILLED_KEY]
+            _ctx = MockCloudifyContext(
+                'node_name', properties=node_properties,
+                runtime_properties=runtime_properties,
+                operation={'name': tasks.DELETE_OPERATION})
+            current_ctx.set(_ctx)
+            tasks.execute({}, '')
+            self.assertFalse(os.path.exists(third))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_runtime_params(self):
+        directory = tempfile.mkdtemp()
+        try:
+            store = runtime.store({'property_store': directory}, 'dep', 'vm')
+            target = {}
+            properties.write(target, {'items': list(range(1000)),
+                                      'name': 'target'}, 1024, store)
+            source = {'name': 'source',
+                      tasks.CHECKPOINT_PROPERTY: {'progress': {}}}
+            self.assertEqual(
+                runtime.params({'state': 'new'}, target, source),
+                {'items': list(range(1000)), 'name': 'source',
+                 'state': 'new'})
+        finally:
+            shutil.rmtree(directory)
+
+    def test_manager_store(self):
+        secrets = {}
+        client = MagicMock()
+        client.secrets.create.side_effect = \
+            lambda key, value: secrets.__setitem__(key, value)
+        client.secrets.get.side_effect = \
+            lambda key: MagicMock(value=secrets[key])
+        client.secrets.delete.side_effect = secrets.pop
+        self.assertEqual(properties.instance_store('', 'dep', 'vm_1')
+                         .directory, os.path.join(
+                             properties.DEFAULT_DIRECTORY, 'dep', 'vm_1'))
+        store = properties.instance_store(properties.MANAGER, 'dep', 'vm_1')
+        store._client = client
+        runtime_properties = {}
+        properties.write(runtime_properties, {'items': list(range(1000))},
+                         1024, store)
+        location = runtime_properties['items'][properties.SPILLED_KEY]
+        self.assertTrue(location.startswith(
+            properties.SECRET + 'rest-dep-vm_1-items-'))
+        self.assertEqual(
+            properties.load_all(runtime_properties, store),
+            {'items': list(range(1000))})
+        statistics = properties.write(runtime_properties, {'items': []},
+                                      1024, store)
+        self.assertEqual(statistics['released'], [location])
+        properties.release(statistics['released'], store)
+        self.assertEqual(secrets, {})
+
+    def test_execute_metrics_summary(self):
+        node_properties = {'host': 'test123.test', 'port': -1,
+                           'ssl': False, 'verify': True}
+        runtime_properties = DirtyTrackingDict({'name': 'vm'})
+        self._execute_items(runtime_properties, node_properties)
+        self.assertNotIn(tasks.METRICS_PROPERTY, runtime_properties)
+        node_properties['metrics_summary'] = 'runtime_properties'
+        self._execute_items(runtime_properties, node_properties)
+        self.assertEqual(
+            runtime_properties[tasks.METRICS_PROPERTY]['calls'], 1)
@@ -0,0 +1,148 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import logging
+import shutil
+import tempfile
+import unittest
+
+import requests_mock
+from cloudify.state import current_workflow_ctx
+from mock import MagicMock
+
+from rest_plugin import properties, workflows
+from rest_sdk import hosts, metrics, template
+
+TEMPLATE = '''
+rest_calls:
+  - path: /vms/{{name}}
+    method: GET
+    response_translation:
+      - [[state], [state]]
+'''
+
+
+class _Storage(object):
+
+    def __init__(self, runtime_properties):
+        self.runtime_properties = runtime_properties
+        self.updates = []
+
+    def get(self, instance_id):
+        return dict(self.runtime_properties[instance_id]), 1
+
+    def update(self, instance_id, runtime_properties, version):
+        self.updates.append(instance_id)
+        self.runtime_properties[instance_id] = runtime_properties
+
+
+def _instance(instance_id, host):
+    instance = MagicMock()
+    instance.id = instance_id
+    instance.node.properties = {'host': host, 'port': -1, 'ssl': False,
+                                'verify': True}
+    return instance
+
+
+class TestWorkflows(unittest.TestCase):
+
+    def setUp(self):
+        hosts.get_default_selector().reset()
+        workflow_ctx = MagicMock()
+        workflow_ctx.deployment.id = 'deployment'
+        workflow_ctx.logger = logging.getLogger('test_workflows')
+        self.pushed = current_workflow_ctx.push(workflow_ctx)
+        self.pushed.__enter__()
+
+    def tearDown(self):
+        self.pushed.__exit__(None, None, None)
+
+    def _run(self, storage, instances, max_concurrency):
+        collector = metrics.Collector()
+        with requests_mock.mock() as m:
+            for name in ('vm1', 'vm2', 'vm3'):
+                m.get('http://good.test:80/vms/{}'.format(name),
+                      json={'state': 'running'})
+            m.get('http://bad.test:80/vms/vm2', status_code=500)
+            errors = workflows.run(
+                instances, template.get_compiled(TEMPLATE), {}, storage,
+                max_concurrency, collector)
+        return errors, collector
+
+    def test_failed_instance_isolated(self):
+        for max_concurrency in (1, 3):
+            storage = _Storage({'vm1': {'name': 'vm1'},
+                                'vm2': {'name': 'vm2'},
+                                'vm3': {'name': 'vm3'}})
+            instances = [_instance('vm1', 'good.test'),
+                         _instance('vm2', 'bad.test'),
+                         _instance('vm3', 'good.test')]
+            errors, collector = self._run(storage, instances,
+                                          max_concurrency)
+            self.assertEqual(list(errors), ['vm2'])
+            self.assertEqual(sorted(storage.updates), ['vm1', 'vm3'])
+            self.assertEqual(storage.runtime_properties['vm3'],
+                             {'name': 'vm3', 'state': 'running'})
+            self.assertEqual(storage.runtime_properties['vm2'],
+                             {'name': 'vm2'})
+            self.assertEqual(collector.summary()['calls'], 3)
+
+    def test_unchanged_instance_not_updated(self):
+        storage = _Storage({'vm1': {'name': 'vm1', 'state': 'running'},
+                            'vm3': {'name': 'vm3'}})
+        errors, _ = self._run(storage, [_instance('vm1', 'good.test'),
+                                        _instance('vm3', 'good.test')], 2)
+        self.assertEqual(errors, {})
+        self.assertEqual(storage.updates, ['vm3'])
+
+    def test_spilled_properties_rendered(self):
+        directory = tempfile.mkdtemp()
+        try:
+            store = properties.instance_store(directory, 'deployment', 'vm1')
+            runtime_properties = {}
+            properties.write(runtime_properties,
+                             {'name': ['vm1'] * 100}, 64, store)
+            storage = _Storage({'vm1': runtime_properties})
+            instance = _instance('vm1', 'good.test')
+            instance.node.properties['property_store'] = directory
+            with requests_mock.mock() as m:
+                m.get('http://good.test:80/vms/vm1',
+                      json={'state': 'running'})
+                errors = workflows.run(
+                    [instance], template.get_compiled(
+                        TEMPLATE.replace('{{name}}', '{{name[0]}}')),
+                    {}, storage)
+            self.assertEqual(errors, {})
+            self.assertEqual(storage.runtime_properties['vm1']['state'],
+                             'running')
+        finally:
+            shutil.rmtree(directory)
+
+    def test_instances(self):
+        rest_node = MagicMock(id='api', type_hierarchy=[
+            'cloudify.nodes.Root', workflows.REST_NODE_TYPE])
+        rest_node.instances = [MagicMock(id='api_1'), MagicMock(id='api_2')]
+        other_node = MagicMock(id='vm', type_hierarchy=['cloudify.nodes.Root'])
+        other_node.instances = [MagicMock(id='vm_1')]
+        workflow_ctx = MagicMock(nodes=[rest_node, other_node])
+        self.assertEqual(
+            [i.id for i in workflows._instances(workflow_ctx, [], [])],
+            ['api_1', 'api_2'])
+        self.assertEqual(
+            [i.id for i in workflows._instances(workflow_ctx, ['vm'], [])],
+            ['vm_1'])
+        self.assertEqual(
+            [i.id for i in workflows._instances(workflow_ctx, [],
+                                                ['api_2'])],
+            ['api_2'])
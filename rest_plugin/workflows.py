@@ -0,0 +1,154 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Workflow running one template for many node instances in a single task,
+# instead of an operation per instance. The template is fetched and
+# compiled once, calls of all instances share the connection pool of the
+# process and at most max_concurrency instances are processed at the same
+# time. Every instance has its own params (its runtime properties updated
+# with params) and results, a failed instance doesn't stop the others.
+# Runtime properties of an instance are written when it finished, only
+# when they changed.
+
+import json
+
+from cloudify.decorators import workflow
+from cloudify.exceptions import NonRecoverableError
+from cloudify.workflows import ctx
+
+from rest_plugin import properties, runtime
+from rest_sdk import metrics, parallel, template, utility
+
+REST_NODE_TYPE = 'cloudify.rest.Requests'
+
+# failed instances listed in the error of the workflow
+MAX_REPORTED_ERRORS = 10
+
+
+@workflow
+def bulk_execute(template_file, params=None, node_ids=None,
+                 node_instance_ids=None, max_concurrency=10, **kwargs):
+    instances = _instances(ctx, node_ids, node_instance_ids)
+    if not instances:
+        ctx.logger.info('No node instances to process.')
+        return
+    path = ctx.internal.handler.download_deployment_resource(template_file)
+    with open(path) as f:
+        compiled_template = template.get_compiled(f.read())
+    storage = _LocalStorage(ctx.internal.handler.storage) if ctx.local \
+        else _RemoteStorage()
+    collector = metrics.Collector()
+    errors = run(instances, compiled_template, params or {}, storage,
+                 max_concurrency, collector)
+    ctx.logger.info('{} of {} node instances processed, rest calls '
+                    'metrics: {}'.format(
+                        len(instances) - len(errors), len(instances),
+                        json.dumps(collector.summary(), sort_keys=True)))
+    if errors:
+        raise NonRecoverableError('{} of {} node instances failed: {}'.format(
+            len(errors), len(instances), '; '.join(
+                '{}: {}'.format(instance_id, errors[instance_id])
+                for instance_id in sorted(errors)[:MAX_REPORTED_ERRORS])))
+
+
+def run(instances, compiled_template, params, storage, max_concurrency=10,
+        metrics_sink=None):
+    """
+    Process compiled_template for every instance, returns dict of
+    instance id -> exception of the failed ones.
+    """
+    def _run(instance):
+        try:
+            _execute(instance, compiled_template, params, storage,
+                     metrics_sink)
+        except Exception as e:
+            ctx.logger.error('{} failed: {}'.format(instance.id, e))
+            return instance.id, e
+        return instance.id, None
+
+    concurrency = max(1, min(int(max_concurrency or 1), len(instances)))
+    if concurrency == 1:
+        results = [_run(instance) for instance in instances]
+    else:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(concurrency)
+        try:
+            results = pool.map(parallel.bind_context(_run), instances)
+        finally:
+            pool.close()
+            pool.join()
+    return dict((instance_id, error) for instance_id, error in results
+                if error is not None)
+
+
+def _execute(instance, compiled_template, params, storage, metrics_sink):
+    runtime_properties, version = storage.get(instance.id)
+    instance_params = runtime.params(params, runtime_properties)
+    request_props = runtime.request_props(instance.node.properties,
+                                          ctx.deployment.id)
+    result = utility.process(instance_params, compiled_template,
+                             request_props, metrics_sink=metrics_sink)
+    store = runtime.store(instance.node.properties, ctx.deployment.id,
+                          instance.id)
+    statistics = runtime.write_result(runtime_properties, result,
+                                      instance.node.properties, store)
+    if statistics['keys']:
+        storage.update(instance.id, runtime_properties, version)
+        properties.release(statistics['released'], store)
+
+
+def _instances(workflow_ctx, node_ids, node_instance_ids):
+    # instances of the given nodes, or of all rest nodes without node_ids
+    instances = []
+    for node in workflow_ctx.nodes:
+        if node_ids:
+            if node.id not in node_ids:
+                continue
+        elif REST_NODE_TYPE not in node.type_hierarchy:
+            continue
+        instances.extend(instance for instance in node.instances
+                         if not node_instance_ids or
+                         instance.id in node_instance_ids)
+    return instances
+
+
+class _RemoteStorage(object):
+
+    def __init__(self):
+        from cloudify.manager import get_rest_client
+        self.client = get_rest_client()
+
+    def get(self, instance_id):
+        instance = self.client.node_instances.get(instance_id)
+        return dict(instance.runtime_properties or {}), instance.version
+
+    def update(self, instance_id, runtime_properties, version):
+        self.client.node_instances.update(
+            instance_id, runtime_properties=runtime_properties,
+            version=version)
+
+
+class _LocalStorage(object):
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def get(self, instance_id):
+        instance = self.storage.get_node_instance(instance_id)
+        return dict(instance.runtime_properties or {}), instance.version
+
+    def update(self, instance_id, runtime_properties, version):
+        self.storage.update_node_instance(
+            instance_id, version, runtime_properties=runtime_properties)
@@ -0,0 +1,219 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# response_expectation, response_unexpectation and response_translation
+# compiled into flat lists of getter/setter paths. Applying them is a
+# single pass over the response and never modifies the template.
+
+import re
+
+from .exceptions import ExpectationException, UnExpectationException, \
+    WrongTemplateDataException
+
+
+class CallAccessors(object):
+    """
+    Accessors of one call, compiled on first use so template errors are
+    reported when the response is processed, like before.
+    """
+
+    def __init__(self, call):
+        self._call = call
+        self._expectation = None
+        self._unexpectation = None
+        self._translation = None
+
+    @property
+    def expectation(self):
+        if self._expectation is None:
+            self._expectation = Expectation(
+                self._call.get('response_expectation', None))
+        return self._expectation
+
+    @property
+    def unexpectation(self):
+        if self._unexpectation is None:
+            self._unexpectation = Expectation(
+                self._call.get('response_unexpectation', None), True)
+        return self._unexpectation
+
+    @property
+    def translation(self):
+        if self._translation is None:
+            self._translation = compile_translation(
+                self._call.get('response_translation', None))
+        return self._translation
+
+    def check(self, json):
+        self.expectation.check(json)
+        self.unexpectation.check(json)
+
+
+class Expectation(object):
+
+    def __init__(self, expectation, unexpectation=False):
+        self.unexpectation = unexpectation
+        self.paths = []
+        if not expectation:
+            return
+        if not isinstance(expectation, list):
+            raise WrongTemplateDataException(
+                "response_expectation had to be list. "
+                "Type {} not supported. ".format(
+                    type(expectation)))
+        items = expectation if isinstance(expectation[0], list) \
+            else [expectation]
+        for item in items:
+            if not isinstance(item, list):
+                raise WrongTemplateDataException(
+                    "response_expectation had to be list. "
+                    "Type {} not supported. ".format(type(item)))
+            self.paths.append((tuple(item[:-1]), item[-1],
+                               re.compile(item[-1])))
+
+    def check(self, json):
+        for path, pattern, regexp in self.paths:
+            value = json
+            try:
+                for key in path:
+                    value = value[key]
+            except (IndexError, KeyError):
+                if self.unexpectation:
+                    # nothing to match when the value is not there
+                    continue
+                raise ExpectationException(
+                    'No key or index {} in json {}'.format(key, value))
+            if self.unexpectation:
+                if regexp.match(str(value)):
+                    raise UnExpectationException(
+                        'Response value "{}" matches regexp "{}" from '
+                        'response_unexpectation'.format(
+                            value, pattern))
+            elif not regexp.match(str(value)):
+                raise ExpectationException(
+                    'Response value "{}" does not match regexp "{}" from '
+                    'response_expectation'.format(
+                        value, pattern))
+
+
+def compile_translation(translation):
+    # local import, utility depends on this module
+    from .utility import _check_if_v2
+    if not translation:
+        return Translation([])
+    if _check_if_v2(translation):
+        return Translation([_compile_v2(source, target)
+                            for source, target in translation])
+    operations = []
+    _compile_v1(translation, (), operations)
+    return Translation(operations)
+
+
+class Translation(object):
+
+    def __init__(self, operations):
+        self.operations = operations
+
+    def apply(self, json, runtime_dict):
+        for operation in self.operations:
+            operation.apply(json, runtime_dict, ())
+
+
+class _Assignment(object):
+    """
+    Save value from source path of the response under target path,
+    without target only check the source path exists.
+    """
+    __slots__ = ('source', 'target')
+
+    def __init__(self, source, target):
+        self.source = tuple(source)
+        self.target = tuple(target) if target is not None else None
+
+    def apply(self, json, runtime_dict, base):
+        value = _get(json, self.source)
+        if self.target is not None:
+            _set(runtime_dict, base + self.target, value)
+
+
+class _Projection(object):
+    """
+    Apply element operation to every element of the list under source
+    and save results in a new list under target.
+    """
+    __slots__ = ('source', 'target', 'element')
+
+    def __init__(self, source, target, element):
+        self.source = tuple(source)
+        self.target = tuple(target)
+        self.element = element
+
+    def apply(self, json, runtime_dict, base):
+        items = _get(json, self.source)
+        target = base + self.target
+        if not target:
+            raise WrongTemplateDataException(
+                'response_translation list has to be saved under a key')
+        _set(runtime_dict, target, [{} for _ in range(len(items))])
+        for idx, item in enumerate(items):
+            self.element.apply(item, runtime_dict, target + (idx,))
+
+
+def _compile_v1(translation, path, operations):
+    if isinstance(translation, list):
+        if translation and not isinstance(translation[0], (list, dict)):
+            operations.append(_Assignment(path, translation))
+            return
+        if not translation:
+            operations.append(_Assignment(path, None))
+        for idx, val in enumerate(translation):
+            if not isinstance(val, (list, dict)):
+                raise WrongTemplateDataException(
+                    'response_translation list {} mixes paths and '
+                    'structures'.format(translation))
+            _compile_v1(val, path + (idx,), operations)
+    elif isinstance(translation, dict):
+        if not translation:
+            operations.append(_Assignment(path, None))
+        for key, value in translation.items():
+            _compile_v1(value, path + (key,), operations)
+
+
+def _compile_v2(source, target):
+    for idx, key in enumerate(source):
+        if isinstance(key, list):
+            element_source = [key[0]] + list(source[idx + 1:])
+            if target and isinstance(target[-1], list):
+                list_target, element_target = target[:-1], target[-1]
+            else:
+                list_target, element_target = target, []
+            return _Projection(source[:idx], list_target,
+                               _compile_v2(element_source, element_target))
+    return _Assignment(source, target)
+
+
+def _get(json, path):
+    for key in path:
+        json = json[key]
+    return json
+
+
+def _set(runtime_dict, path, value):
+    for key in path[:-1]:
+        if isinstance(runtime_dict, dict):
+            runtime_dict = runtime_dict.setdefault(key, {})
+        else:
+            runtime_dict = runtime_dict[key]
+    runtime_dict[path[-1]] = value
@@ -0,0 +1,467 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# asyncio counterpart of rest_sdk.utility.process.
+# Requires python 3.5+ and aiohttp (pip install cloudify-rest-plugin[async]).
+#
+#   async with AsyncTransport(limit=200, max_in_flight=500) as transport:
+#       results = await asyncio.gather(*[
+#           process_async(params, template, request_props, transport)
+#           for params in devices])
+
+import asyncio
+import logging
+import ssl
+import time
+
+import aiohttp
+import requests
+
+from . import LOGGER_NAME
+from . import auth as _auth
+from . import broadcast as _broadcast
+from . import download as _download
+from . import foreach as _foreach
+from . import hosts as _hosts
+from . import logs as _logs
+from . import pagination as _pagination
+from . import payload as _payload
+from . import polling as _polling
+from . import ratelimit as _ratelimit
+from . import template as _template
+from . import timeouts as _timeouts
+from . import utility
+from .exceptions import DeadlineExceededException
+from .transport import build_response
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# aiohttp older than 3.10 doesn't tell connect and read timeouts apart
+_CONNECT_TIMEOUT = getattr(aiohttp, 'ConnectionTimeoutError', ())
+
+
+class AsyncTransport(object):
+    """
+    aiohttp based transport with a pooled keep-alive connector.
+    Responses are returned as requests.Response objects, so the template
+    semantics (status checks, formats, expectations and translations) are
+    the ones of rest_sdk.utility.
+    """
+
+    def __init__(self, limit=100, limit_per_host=0, max_in_flight=None,
+                 keepalive_timeout=15):
+        """
+        :param limit: max open connections
+        :param limit_per_host: max open connections per host, 0 - no limit
+        :param max_in_flight: max requests sent at the same time by all
+                              executions sharing the transport, requests
+                              above the limit wait for their turn
+        :param keepalive_timeout: seconds an idle connection is kept open
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.max_in_flight = max_in_flight
+        self.keepalive_timeout = keepalive_timeout
+        self._session = None
+        self._semaphore = None
+        self._ssl_contexts = {}
+
+    async def request(self, method, url, verify=True, headers=None,
+                      data=None, json=None, stream=False, timeout=None):
+        # stream is accepted for compatibility, the body is always read
+        # before the response is returned
+        session = self._get_session()
+        if self._semaphore is None and self.max_in_flight:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        if self._semaphore is not None:
+            async with self._semaphore:
+                return await self._request(session, method, url, verify,
+                                           headers, data, json, timeout)
+        return await self._request(session, method, url, verify, headers,
+                                   data, json, timeout)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit, limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout)
+            # like rest_sdk.transport, no cookies shared between calls
+            self._session = aiohttp.ClientSession(
+                connector=connector, cookie_jar=aiohttp.DummyCookieJar())
+        return self._session
+
+    async def _request(self, session, method, url, verify, headers, data,
+                       json, timeout):
+        kwargs = {}
+        if timeout is not None:
+            # (connect, read) tuple, like for requests
+            kwargs['timeout'] = aiohttp.ClientTimeout(
+                sock_connect=timeout[0], sock_read=timeout[1])
+        try:
+            async with session.request(method, url, headers=headers,
+                                       data=data, json=json,
+                                       ssl=self._ssl(verify),
+                                       **kwargs) as resp:
+                body = await resp.read()
+        except _CONNECT_TIMEOUT as e:
+            raise requests.exceptions.ConnectTimeout(e)
+        except aiohttp.ServerTimeoutError as e:
+            raise requests.exceptions.ReadTimeout(e)
+        except aiohttp.ClientConnectionError as e:
+            raise requests.exceptions.ConnectionError(e)
+        return build_response(resp.status, resp.reason, resp.headers, body,
+                              url)
+
+    def _ssl(self, verify):
+        if verify is True:
+            return None
+        if not verify:
+            return False
+        # path to CA bundle, like verify of requests
+        if verify not in self._ssl_contexts:
+            self._ssl_contexts[verify] = ssl.create_default_context(
+                cafile=verify)
+        return self._ssl_contexts[verify]
+
+
+async def process_async(params, template, request_props, transport=None):
+    """
+    Same as rest_sdk.utility.process, but the requests are sent without
+    blocking the event loop. Without transport a new one is opened and
+    closed for this execution only.
+    """
+    own_transport = transport is None
+    if own_transport:
+        transport = AsyncTransport()
+    try:
+        compiled_template = _template.get_compiled(template)
+        deadline = _timeouts.Deadline(request_props.get('deadline'))
+        result_propeties = {}
+        for index in range(len(compiled_template)):
+            deadline.check('call {}'.format(index))
+            # enrich params with items stored in runtime props by prev calls
+            params.update(result_propeties)
+            call, call_with_request_props, accessors = \
+                utility._render_call(compiled_template, index, params,
+                                     request_props)
+            if call.get('foreach'):
+                json = await _send_foreach_async(
+                    compiled_template,
+                    _foreach.Foreach(index, call['foreach'], params),
+                    request_props, transport, deadline)
+            else:
+                json = await _send_call_async(
+                    call, call_with_request_props, accessors, transport,
+                    deadline)
+            utility._translate_response(json, call, result_propeties,
+                                        accessors)
+        return result_propeties
+    finally:
+        if own_transport:
+            await transport.close()
+
+
+async def _send_call_async(call, call_with_request_props, accessors,
+                           transport, deadline=_timeouts.NO_DEADLINE):
+    with _payload.resolved(call_with_request_props) as \
+            call_with_request_props:
+        if _broadcast.is_broadcast(call_with_request_props):
+            return await _send_broadcast_async(
+                call, call_with_request_props, accessors, transport,
+                deadline)
+        return await _send_to_host_async(call, call_with_request_props,
+                                         accessors, transport, deadline)
+
+
+async def _send_broadcast_async(call, call_with_request_props, accessors,
+                                transport, deadline=_timeouts.NO_DEADLINE):
+    broadcast = _broadcast.Broadcast(
+        call_with_request_props.get('broadcast'),
+        [host for host, _ in utility._request_urls(call_with_request_props)])
+
+    async def _host(host):
+        json = await _send_to_host_async(
+            call, dict(call_with_request_props, hosts=[host]), accessors,
+            transport, deadline)
+        properties = {}
+        utility._translate_response(json, call, properties, accessors)
+        return properties
+
+    tasks = dict((asyncio.ensure_future(_host(host)), host)
+                 for host in broadcast.hosts)
+    results, errors = {}, {}
+    # all hosts are waited for, the ones running at the deadline are
+    # cancelled and reported as pending
+    done, pending = await asyncio.wait(tasks, timeout=deadline.remaining())
+    for task in pending:
+        task.cancel()
+    for task in done:
+        host = tasks[task]
+        if task.exception() is None:
+            results[host] = task.result()
+        else:
+            logger.info('broadcast to {} failed: {}'.format(
+                host, task.exception()))
+            errors[host] = task.exception()
+    pending = [host for host in broadcast.hosts
+               if host not in results and host not in errors]
+    broadcast.check(results, errors, pending)
+    return _broadcast.Result(broadcast, results, errors, pending)
+
+
+async def _send_to_host_async(call, call_with_request_props, accessors,
+                              transport, deadline=_timeouts.NO_DEADLINE):
+    if call.get('cache'):
+        return await _send_cached_async(call, call_with_request_props,
+                                        accessors, transport, deadline)
+    if call.get('pagination'):
+        return await _send_pages_async(call, call_with_request_props,
+                                       accessors, transport, deadline)
+    return await _send_and_check_async(call, call_with_request_props,
+                                       accessors, transport, deadline)
+
+
+async def _send_cached_async(call, call_with_request_props, accessors,
+                             transport, deadline=_timeouts.NO_DEADLINE):
+    # same cache as rest_sdk.utility._send_cached
+    policy, cache, entry, request = utility._cache_lookup(
+        call, call_with_request_props)
+    changed = False
+    if request is not None:
+        try:
+            response = await send_request_async(request, transport,
+                                                deadline=deadline)
+        except DeadlineExceededException:
+            raise
+        except Exception as e:
+            utility._check_deadline(deadline, e)
+            raise
+        entry = utility._cache_entry(cache, entry, response)
+        if entry is None:
+            return utility._parse_and_check_response(response, call,
+                                                     accessors)
+        changed = True
+    return utility._cached_result(call, accessors, policy, cache, entry,
+                                  changed)
+
+
+async def _send_foreach_async(compiled_template, each, request_props,
+                              transport, deadline=_timeouts.NO_DEADLINE):
+    semaphore = asyncio.Semaphore(each.concurrency)
+    results = [None] * len(each)
+    errors = []
+
+    async def _element(position):
+        async with semaphore:
+            if each.failed(errors):
+                return
+            try:
+                deadline.check('call {} element {}'.format(each.index,
+                                                           position))
+                call, call_with_request_props, accessors = \
+                    utility._render_call(compiled_template, each.index,
+                                         each.params(position),
+                                         request_props)
+                json = await _send_call_async(
+                    call, call_with_request_props, accessors, transport,
+                    deadline)
+                properties = {}
+                utility._translate_response(json, call, properties,
+                                            accessors)
+                results[position] = properties
+            except Exception as e:
+                logger.info('foreach element {} failed: {}'.format(
+                    position, e))
+                errors.append((position, e))
+
+    await asyncio.gather(*[_element(position)
+                           for position in range(len(each))])
+    errors.sort(key=lambda error: error[0])
+    if each.failed(errors):
+        raise errors[0][1]
+    return _foreach.Result(each, results, errors)
+
+
+async def _send_and_check_async(call, call_with_request_props, accessors,
+                                transport, deadline=_timeouts.NO_DEADLINE):
+    return (await _send_and_check_response_async(
+        call, call_with_request_props, accessors, transport, deadline))[1]
+
+
+async def _send_pages_async(call, call_with_request_props, accessors,
+                            transport, deadline=_timeouts.NO_DEADLINE):
+    # pages are requested one by one, prefetch is not used
+    pagination = _pagination.Pagination(call['pagination'])
+    pages = _pagination.Pages(pagination)
+    path = call_with_request_props['path']
+    page_path = pagination.first_path(path)
+    page = 0
+    while page_path is not None:
+        response, json = await _send_and_check_response_async(
+            call, dict(call_with_request_props, path=page_path), accessors,
+            transport, deadline)
+        page_path = pagination.next_path(path, response.url, response,
+                                         json, page)
+        properties = {}
+        utility._translate_response(json, call, properties, accessors)
+        pages.add(json, properties)
+        page += 1
+    return pages
+
+
+async def _send_and_check_response_async(call, call_with_request_props,
+                                         accessors, transport,
+                                         deadline=_timeouts.NO_DEADLINE):
+    poll = _polling.call_poll(call)
+    # the body is read whole by aiohttp, then written to the file
+    download = _download.Download(call['download'],
+                                  call_with_request_props) \
+        if call.get('download') else None
+    while True:
+        try:
+            deadline.check()
+            response = await send_request_async(call_with_request_props,
+                                                transport, deadline=deadline)
+            return response, utility._parse_and_check_response(
+                response, call, accessors, download)
+        except DeadlineExceededException:
+            raise
+        except Exception as e:
+            delay = utility._poll_delay(poll, e)
+            utility._check_deadline(deadline, e, delay)
+            if delay is None:
+                raise
+        await asyncio.sleep(delay)
+
+
+async def send_request_async(call, transport, selector=None,
+                             deadline=_timeouts.NO_DEADLINE):
+    logger.info(_logs.Message(_logs.options(call),
+                              'send_request_async request_props:{}',
+                              _auth.redacted(call)))
+    authenticator = _auth.get_authenticator(call.get('auth'))
+    if authenticator is None:
+        response = await _send_throttled_async(call, transport, selector,
+                                               deadline)
+    else:
+        headers = await _auth_headers(authenticator, call, deadline)
+        response = await _send_throttled_async(
+            utility._with_headers(call, headers), transport, selector,
+            deadline)
+        if response.status_code == 401 and authenticator.renewable:
+            logger.info('auth token rejected, sending with a new one')
+            authenticator.invalidate(headers)
+            headers = await _auth_headers(authenticator, call, deadline)
+            response = await _send_throttled_async(
+                utility._with_headers(call, headers), transport, selector,
+                deadline)
+    utility._check_status(response, call)
+    return response
+
+
+async def _auth_headers(authenticator, call, deadline):
+    headers = authenticator.cached_headers()
+    if headers is not None:
+        return headers
+    # tokens are shared with rest_sdk.utility and fetched rarely, by the
+    # blocking transport in a thread of the executor
+    fetch = utility._token_fetch(call, deadline=deadline)
+    return await asyncio.get_event_loop().run_in_executor(
+        None, authenticator.headers, fetch)
+
+
+async def _send_throttled_async(call, transport, selector=None,
+                                deadline=_timeouts.NO_DEADLINE):
+    # same as rest_sdk.utility._send_throttled
+    options = call.get('rate_limit')
+    options = _ratelimit.Options(options) if options else None
+    response = await _send_to_hosts_async(call, transport, selector,
+                                          deadline)
+    for attempt in range(options.retries if options else 0):
+        if not utility._send_again(response, options, deadline):
+            break
+        logger.info('response {} throttled, attempt {} of {}'.format(
+            response.status_code, attempt + 1, options.retries))
+        response = await _send_to_hosts_async(call, transport, selector,
+                                              deadline)
+    return response
+
+
+async def _acquire(limiter, deadline):
+    # limiters are shared with threads, waiting doesn't block the loop
+    while True:
+        wait = limiter.try_acquire(deadline)
+        if not wait:
+            return
+        await asyncio.sleep(wait)
+
+
+async def _send_to_hosts_async(call, transport, selector=None,
+                               deadline=_timeouts.NO_DEADLINE):
+    if selector is None:
+        selector = _hosts.get_default_selector()
+    data, json_payload, headers = _payload.request_body(call)
+    if isinstance(data, _payload.Body):
+        # aiohttp doesn't send a plain iterator, the file is read at once
+        data = data.read_all()
+    urls = utility._request_urls(call)
+    by_key = dict((utility._host_key(url), (host, url))
+                  for host, url in urls)
+    strategy = call.get('host_selection') or _hosts.ORDERED
+    if strategy == _hosts.RACE:
+        # not supported here, hosts are tried one by one
+        strategy = _hosts.ORDERED
+    hosts = selector.order([utility._host_key(url) for _, url in urls],
+                           strategy)
+    for i, key in enumerate(hosts):
+        host, full_url = by_key[key]
+        deadline.check('request to {}'.format(host))
+        logger.debug('full_url : {}'.format(full_url))
+        limiter = _ratelimit.get_limiter(key, call.get('rate_limit'))
+        if limiter is not None:
+            await _acquire(limiter, deadline)
+        started = time.time()
+        status_code, retry_after = None, None
+        try:
+            response = await transport.request(
+                call['method'], full_url, headers=headers, data=data,
+                json=json_payload, verify=call['verify'],
+                stream=utility._stream_response(call),
+                timeout=_timeouts.request_timeout(call, deadline))
+            status_code = response.status_code
+            retry_after = _polling.retry_after(response)
+        except requests.exceptions.ConnectionError:
+            logger.debug('ConnectionError for host : {}'.format(host))
+            selector.failure(key)
+            if i == len(hosts) - 1:
+                logger.error('No host from list available')
+                raise
+            continue
+        finally:
+            if limiter is not None:
+                limiter.release(status_code, retry_after)
+        selector.success(key, time.time() - started)
+        return response
@@ -0,0 +1,291 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Authentication of calls with "auth" key (node property or per call,
+# empty auth of a call disables the one of the node):
+#
+#   auth:
+#     type: client_credentials  # bearer - static token
+#                               # basic - username and password
+#                               # client_credentials - OAuth2 token of
+#                               #   client_id and client_secret
+#                               # login - token returned by token_url for
+#                               #   username and password (basic auth) or
+#                               #   payload
+#     token: ...                # bearer
+#     username: ...
+#     password: ...
+#     token_url: https://idp/oauth/token
+#     client_id: ...
+#     client_secret: ...
+#     scope: read write
+#     method: POST              # login
+#     payload: {}               # login, json body
+#     token_path: [access_token]
+#     expires_in_path: [expires_in]
+#     expires_in: 3600          # lifetime when the response has none
+#     refresh_before: 60        # seconds before expiry to get a new one
+#     header: Authorization
+#     scheme: Bearer
+#     verify: true
+#
+# Tokens are cached in the process by fingerprint of the credentials, so
+# all calls and node instances sharing credentials share one token. A
+# token rejected with 401 is fetched again and the call repeated once.
+
+import base64
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from . import LOGGER_NAME
+from .exceptions import WrongTemplateDataException
+
+logger = logging.getLogger(LOGGER_NAME)
+
+BEARER = 'bearer'
+BASIC = 'basic'
+CLIENT_CREDENTIALS = 'client_credentials'
+LOGIN = 'login'
+TYPES = (BEARER, BASIC, CLIENT_CREDENTIALS, LOGIN)
+
+DEFAULTS = {
+    'type': BEARER,
+    'token': None,
+    'username': None,
+    'password': None,
+    'token_url': None,
+    'client_id': None,
+    'client_secret': None,
+    'scope': None,
+    'method': 'POST',
+    'payload': None,
+    'token_path': ['access_token'],
+    'expires_in_path': ['expires_in'],
+    'expires_in': None,
+    'refresh_before': 60,
+    'header': 'Authorization',
+    'scheme': 'Bearer',
+    'verify': None,
+}
+
+SECRETS = ('token', 'password', 'client_secret', 'payload')
+
+# authenticators (and their tokens) kept, the least recently used are
+# dropped
+MAX_AUTHENTICATORS = 1024
+
+_REQUIRED = {
+    BEARER: ('token',),
+    BASIC: ('username', 'password'),
+    CLIENT_CREDENTIALS: ('token_url', 'client_id', 'client_secret'),
+    LOGIN: ('token_url',),
+}
+
+
+class _Token(object):
+    __slots__ = ('value', 'expires')
+
+    def __init__(self, value, expires=None):
+        self.value = value
+        self.expires = expires
+
+
+class Authenticator(object):
+
+    def __init__(self, options, clock=time.time):
+        if not isinstance(options, dict):
+            raise WrongTemplateDataException(
+                "auth had to be dict. Type {} not supported. ".format(
+                    type(options)))
+        unknown = set(options) - set(DEFAULTS)
+        if unknown:
+            raise WrongTemplateDataException(
+                'Unknown auth options: {}'.format(
+                    ', '.join(sorted(unknown))))
+        values = dict(DEFAULTS, **options)
+        if values['type'] not in TYPES:
+            raise WrongTemplateDataException(
+                'auth type {} is not supported, use one of: {}'.format(
+                    values['type'], ', '.join(TYPES)))
+        missing = [key for key in _REQUIRED[values['type']]
+                   if not values[key]]
+        if missing:
+            raise WrongTemplateDataException(
+                'auth type {} requires {}'.format(values['type'],
+                                                  ', '.join(missing)))
+        self.options = values
+        self.type = values['type']
+        self.fingerprint = fingerprint(options)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._token = None
+
+    @property
+    def renewable(self):
+        # static credentials are not fetched again on 401
+        return self.type in (CLIENT_CREDENTIALS, LOGIN)
+
+    def headers(self, fetch):
+        """
+        Headers to add to a request. fetch(method, url, **kwargs) sends
+        the token request when there is no valid token.
+        """
+        headers = self.cached_headers()
+        if headers is None:
+            headers = self._headers(self.token(fetch))
+        return headers
+
+    def cached_headers(self):
+        """
+        Headers to add to a request when they need no token request, else
+        None.
+        """
+        if self.type == BASIC:
+            credentials = '{}:{}'.format(self.options['username'],
+                                         self.options['password'])
+            return {'Authorization': 'Basic ' + base64.b64encode(
+                credentials.encode('utf-8')).decode('ascii')}
+        if self.type == BEARER:
+            return self._headers(self.options['token'])
+        token = self._token
+        if not self._valid(token):
+            return None
+        return self._headers(token.value)
+
+    def token(self, fetch):
+        # one fetch at a time, others wait for its token
+        with self._lock:
+            token = self._token
+            if not self._valid(token):
+                token = self._fetch(fetch)
+                self._token = token
+            return token.value
+
+    def _valid(self, token):
+        return token is not None and (token.expires is None or
+                                      self._clock() < token.expires)
+
+    def _headers(self, token):
+        scheme = self.options['scheme']
+        return {self.options['header']:
+                '{} {}'.format(scheme, token) if scheme else token}
+
+    def invalidate(self, headers):
+        """
+        Drop the token sent with headers, unless it was already renewed.
+        """
+        with self._lock:
+            if self._token is not None and str(headers.get(
+                    self.options['header'], '')).endswith(self._token.value):
+                self._token = None
+
+    def _fetch(self, fetch):
+        options = self.options
+        kwargs = {'headers': {'Accept': 'application/json'}}
+        if options['verify'] is not None:
+            kwargs['verify'] = options['verify']
+        if self.type == CLIENT_CREDENTIALS:
+            data = {'grant_type': 'client_credentials',
+                    'client_id': options['client_id'],
+                    'client_secret': options['client_secret']}
+            if options['scope']:
+                data['scope'] = options['scope']
+            kwargs['data'] = data
+        else:
+            if options['username'] is not None:
+                kwargs['auth'] = (options['username'],
+                                  options['password'] or '')
+            if options['payload'] is not None:
+                kwargs['json'] = options['payload']
+        logger.info('getting auth token from {}'.format(
+            options['token_url']))
+        started = self._clock()
+        response = fetch(options['method'] if self.type == LOGIN else
+                         'POST', options['token_url'], **kwargs)
+        response.raise_for_status()
+        body = response.json()
+        value = _get(body, options['token_path'])
+        if not value:
+            raise WrongTemplateDataException(
+                'auth token not found in {} response at {}'.format(
+                    options['token_url'], options['token_path']))
+        expires_in = _get(body, options['expires_in_path'])
+        if expires_in is None:
+            expires_in = options['expires_in']
+        expires = None
+        if expires_in is not None:
+            lifetime = float(expires_in)
+            # short lived tokens are refreshed after half of their life
+            expires = started + max(
+                lifetime - float(options['refresh_before']), lifetime / 2)
+        return _Token(value, expires)
+
+
+def fingerprint(options):
+    return hashlib.sha1(json.dumps(
+        options, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def redacted(call):
+    """
+    Copy of call with secrets of auth hidden, for logging.
+    """
+    options = call.get('auth')
+    if not isinstance(options, dict):
+        return call
+    call = dict(call)
+    call['auth'] = dict((key, '***' if key in SECRETS and value else value)
+                        for key, value in options.items())
+    return call
+
+
+def _get(body, path):
+    try:
+        for key in path:
+            body = body[key]
+    except (IndexError, KeyError, TypeError):
+        return None
+    return body
+
+
+_authenticators = OrderedDict()
+_authenticators_lock = threading.Lock()
+
+
+def get_authenticator(options):
+    """
+    Authenticator shared by all calls with the same auth options, None
+    without auth.
+    """
+    if not options:
+        return None
+    key = fingerprint(options)
+    with _authenticators_lock:
+        authenticator = _authenticators.pop(key, None)
+        if authenticator is None:
+            authenticator = Authenticator(options)
+        _authenticators[key] = authenticator
+        while len(_authenticators) > MAX_AUTHENTICATORS:
+            _authenticators.popitem(last=False)
+        return authenticator
+
+
+def clear():
+    with _authenticators_lock:
+        _authenticators.clear()
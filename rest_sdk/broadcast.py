@@ -0,0 +1,193 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# host_mode of a call:
+#   failover  - hosts are tried one by one until one answers (default)
+#   broadcast - the call is sent to all hosts at the same time, every
+#               response is checked and translated on its own
+#
+#   host_mode: broadcast
+#   broadcast:
+#     quorum: 2           # hosts which have to succeed: number, majority
+#                         # or all (default)
+#     save_as: by_host    # runtime property: host -> response_translation
+#                         # result, without it results are merged
+#     errors_as: failed   # runtime property: host -> error, or pending
+#                         # for hosts still running at the deadline
+#
+# The call waits for all hosts, also after quorum hosts succeeded: calls
+# are often not idempotent and every host gets its result recorded. Hosts
+# still running at the deadline of the call are left behind as pending.
+
+import logging
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from . import LOGGER_NAME
+from . import timeouts as _timeouts
+from .exceptions import DeadlineExceededException, \
+    WrongTemplateDataException
+from .pagination import merge
+
+logger = logging.getLogger(LOGGER_NAME)
+
+PENDING = 'pending'
+
+FAILOVER = 'failover'
+BROADCAST = 'broadcast'
+HOST_MODES = (FAILOVER, BROADCAST)
+
+DEFAULTS = {
+    'quorum': 'all',
+    'save_as': None,
+    'errors_as': None,
+}
+
+
+def is_broadcast(call):
+    host_mode = call.get('host_mode') or FAILOVER
+    if host_mode not in HOST_MODES:
+        raise WrongTemplateDataException(
+            'host_mode {} is not supported, use one of: {}'.format(
+                host_mode, ', '.join(HOST_MODES)))
+    return host_mode == BROADCAST
+
+
+class Broadcast(object):
+
+    def __init__(self, options, hosts):
+        options = options or {}
+        if not isinstance(options, dict):
+            raise WrongTemplateDataException(
+                "broadcast had to be dict. Type {} not supported. ".format(
+                    type(options)))
+        unknown = set(options) - set(DEFAULTS)
+        if unknown:
+            raise WrongTemplateDataException(
+                'Unknown broadcast options: {}'.format(
+                    ', '.join(sorted(unknown))))
+        values = dict(DEFAULTS, **options)
+        self.hosts = list(hosts)
+        self.save_as = values['save_as']
+        self.errors_as = values['errors_as']
+        self.quorum = _quorum(values['quorum'], len(self.hosts))
+
+    def properties(self, results, errors, pending=()):
+        """
+        runtime properties written by the call
+        """
+        properties = {}
+        if self.save_as:
+            properties[self.save_as] = results
+        else:
+            for host in self.hosts:
+                if host in results:
+                    merge(properties, results[host], concat_lists=True)
+        if self.errors_as:
+            properties[self.errors_as] = dict(
+                (host, str(error)) for host, error in errors.items())
+            properties[self.errors_as].update(
+                (host, PENDING) for host in pending)
+        return properties
+
+    def check(self, results, errors, pending):
+        """
+        Raise the error of the first failed host (in order of hosts) when
+        less than quorum hosts succeeded.
+        """
+        if pending:
+            logger.warning('broadcast hosts still running at the deadline: '
+                           '{}'.format(', '.join(pending)))
+        if len(results) >= self.quorum:
+            return
+        if errors:
+            raise errors[min(errors, key=self.hosts.index)]
+        raise DeadlineExceededException(
+            'broadcast quorum of {} not reached before the deadline, '
+            '{} hosts succeeded'.format(self.quorum, len(results)))
+
+
+class Result(object):
+    """
+    Results of all hosts of a call, replacing the parsed response.
+    """
+
+    def __init__(self, broadcast, results, errors, pending=()):
+        self.broadcast = broadcast
+        self.results = results
+        self.errors = errors
+        self.pending = list(pending)
+
+    def result(self):
+        return self.broadcast.properties(self.results, self.errors,
+                                         self.pending)
+
+
+def run(broadcast, func, deadline=_timeouts.NO_DEADLINE):
+    """
+    Call func(host) for all hosts at the same time and wait for all of
+    them until the deadline. Returns dicts of results and errors by host
+    and the list of hosts still running. Raises the error of the first
+    failed host (in order of hosts) when the quorum wasn't reached.
+    """
+    done = queue.Queue()
+
+    def _run(host):
+        try:
+            done.put((host, True, func(host)))
+        except Exception as e:
+            done.put((host, False, e))
+
+    for host in broadcast.hosts:
+        thread = threading.Thread(target=_run, args=(host,))
+        thread.daemon = True
+        thread.start()
+    results, errors = {}, {}
+    pending = list(broadcast.hosts)
+    while pending:
+        remaining = deadline.remaining()
+        try:
+            host, succeeded, value = done.get(timeout=remaining) \
+                if remaining is not None else done.get()
+        except queue.Empty:
+            break
+        pending.remove(host)
+        if succeeded:
+            results[host] = value
+        else:
+            logger.info('broadcast to {} failed: {}'.format(host, value))
+            errors[host] = value
+    broadcast.check(results, errors, pending)
+    return results, errors, pending
+
+
+def _quorum(value, count):
+    if value == 'all':
+        return count
+    if value == 'majority':
+        return count // 2 + 1
+    try:
+        quorum = int(value)
+    except (TypeError, ValueError):
+        quorum = 0
+    if not 0 < quorum <= count:
+        raise WrongTemplateDataException(
+            'broadcast quorum has to be all, majority or a number from 1 '
+            'to {}, got {}'.format(count, value))
+    return quorum
@@ -0,0 +1,381 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Cache of GET responses, for calls with "cache" key:
+#
+#   cache:
+#     ttl: 300            # seconds the response is used without asking
+#                         # the server, default max-age of Cache-Control
+#                         # or 0
+#     revalidate: true    # after ttl ask with If-None-Match and
+#                         # If-Modified-Since, 304 keeps the entry
+#
+# Entries are kept in memory of the process and, with cache_dir in
+# request_props, on disk to be shared by operations. Both tiers are
+# bounded in bytes of bodies, least recently used entries are evicted.
+# Every entry also keeps results of response_translation, so a fresh or
+# revalidated entry is not parsed again by the same call.
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+
+from . import LOGGER_NAME
+from .exceptions import WrongTemplateDataException
+from .transport import build_response
+
+logger = logging.getLogger(LOGGER_NAME)
+
+DEFAULT_MEMORY_SIZE = 32 * 1024 * 1024
+DEFAULT_DISK_SIZE = 256 * 1024 * 1024
+
+# response headers kept in entries
+_KEPT_HEADERS = ('content-type', 'content-encoding', 'etag',
+                 'last-modified', 'cache-control', 'date')
+
+
+class Entry(object):
+
+    def __init__(self, url, status_code, headers, body, stored_at=None,
+                 results=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = dict((key.lower(), value)
+                            for key, value in headers.items()
+                            if key.lower() in _KEPT_HEADERS)
+        self.body = body
+        self.stored_at = stored_at if stored_at is not None else time.time()
+        # translation key -> runtime properties written by the call
+        self.results = results or {}
+
+    @classmethod
+    def from_response(cls, response):
+        return cls(response.url, response.status_code, response.headers,
+                   response.content)
+
+    @property
+    def size(self):
+        return len(self.body)
+
+    def response(self):
+        return build_response(self.status_code, 'OK', self.headers,
+                              self.body, self.url)
+
+    def fresh(self, ttl, now=None):
+        if ttl is None:
+            ttl = _max_age(self.headers.get('cache-control')) or 0
+        return (now or time.time()) - self.stored_at < ttl
+
+    def validators(self):
+        headers = {}
+        if self.headers.get('etag'):
+            headers['If-None-Match'] = self.headers['etag']
+        if self.headers.get('last-modified'):
+            headers['If-Modified-Since'] = self.headers['last-modified']
+        return headers
+
+    def revalidated(self, response):
+        """
+        Entry refreshed by a 304 response.
+        """
+        headers = dict(self.headers)
+        headers.update((key.lower(), value)
+                       for key, value in response.headers.items()
+                       if key.lower() in _KEPT_HEADERS)
+        return Entry(self.url, self.status_code, headers, self.body,
+                     results=self.results)
+
+    def to_meta(self):
+        return {'url': self.url, 'status_code': self.status_code,
+                'headers': self.headers, 'stored_at': self.stored_at,
+                'results': self.results}
+
+    @classmethod
+    def from_meta(cls, meta, body):
+        return cls(meta['url'], meta['status_code'], meta['headers'], body,
+                   meta['stored_at'], meta.get('results'))
+
+
+class _MemoryTier(object):
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._entries[key] = entry
+        return entry
+
+    def put(self, key, entry):
+        self.delete(key)
+        if entry.size > self.max_size:
+            return
+        self._entries[key] = entry
+        self.size += entry.size
+        while self.size > self.max_size:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.size
+
+    def delete(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+
+class _DiskTier(object):
+    # <key>.json with metadata and results, <key>.body with the body,
+    # access time is the mtime of the metadata file
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, key + suffix)
+
+    def get(self, key):
+        try:
+            with open(self._path(key, '.json')) as f:
+                meta = json.load(f)
+            with open(self._path(key, '.body'), 'rb') as f:
+                body = f.read()
+            os.utime(self._path(key, '.json'), None)
+        except (IOError, OSError, ValueError):
+            return None
+        return Entry.from_meta(meta, body)
+
+    def put(self, key, entry):
+        if entry.size > self.max_size:
+            return
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        self._write(key, '.body', entry.body)
+        self._write(key, '.json', json.dumps(
+            entry.to_meta(), default=_json_default).encode('utf-8'))
+        self._evict()
+
+    def _write(self, key, suffix, data):
+        handle, temporary = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(handle, 'wb') as f:
+            f.write(data)
+        os.rename(temporary, self._path(key, suffix))
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for key in self._keys():
+            try:
+                used = os.path.getmtime(self._path(key, '.json'))
+                size = os.path.getsize(self._path(key, '.body'))
+            except OSError:
+                continue
+            entries.append((used, key, size))
+            total += size
+        for _, key, size in sorted(entries):
+            if total <= self.max_size:
+                break
+            self.delete(key)
+            total -= size
+
+    def delete(self, key):
+        for suffix in ('.json', '.body'):
+            try:
+                os.remove(self._path(key, suffix))
+            except OSError:
+                pass
+
+    def clear(self):
+        for key in self._keys():
+            self.delete(key)
+
+    def _keys(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return [name[:-len('.json')] for name in names
+                if name.endswith('.json')]
+
+
+class ResponseCache(object):
+
+    def __init__(self, directory=None, memory_size=DEFAULT_MEMORY_SIZE,
+                 disk_size=DEFAULT_DISK_SIZE):
+        """
+        :param directory: directory of the disk tier, None - memory only
+        :param memory_size: max bytes of bodies kept in memory
+        :param disk_size: max bytes of bodies kept on disk
+        """
+        self._lock = threading.Lock()
+        self._memory = _MemoryTier(memory_size)
+        self._disk = _DiskTier(directory, disk_size) if directory else None
+        self._counters = {'hits': 0, 'misses': 0, 'revalidated': 0,
+                          'stored': 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and self._disk is not None:
+                entry = self._disk.get(key)
+                if entry is not None:
+                    self._memory.put(key, entry)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._memory.put(key, entry)
+            if self._disk is not None:
+                self._disk.put(key, entry)
+
+    def count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.clear()
+            for counter in self._counters:
+                self._counters[counter] = 0
+
+    def statistics(self):
+        with self._lock:
+            statistics = dict(self._counters)
+            statistics['memory_bytes'] = self._memory.size
+            return statistics
+
+
+class Cached(object):
+    """
+    Runtime properties of a call answered from the cache, replacing the
+    parsed response.
+    """
+
+    def __init__(self, properties):
+        self.properties = properties
+
+    def result(self):
+        return self.properties
+
+
+class Policy(object):
+    """
+    cache options of a rendered call
+    """
+
+    def __init__(self, options, call):
+        if options is True:
+            options = {}
+        if not isinstance(options, dict):
+            raise WrongTemplateDataException(
+                "cache had to be dict. Type {} not supported. ".format(
+                    type(options)))
+        if str(call['method']).upper() != 'GET':
+            raise WrongTemplateDataException(
+                'cache can be used only by GET calls')
+        if call.get('poll') or call.get('pagination') or \
+                call.get('download'):
+            raise WrongTemplateDataException(
+                'cache can not be used with poll, pagination or download')
+        unknown = set(options) - set(['ttl', 'revalidate'])
+        if unknown:
+            raise WrongTemplateDataException(
+                'Unknown cache options: {}'.format(
+                    ', '.join(sorted(unknown))))
+        try:
+            self.ttl = float(options['ttl']) \
+                if options.get('ttl') is not None else None
+        except (TypeError, ValueError):
+            raise WrongTemplateDataException(
+                'cache ttl has to be a number of seconds, got {}'.format(
+                    options['ttl']))
+        self.revalidate = options.get('revalidate', True)
+        self.key = _digest([call['path'],
+                            call.get('hosts') or [call['host']],
+                            call['port'], call['ssl'], call.get('auth'),
+                            sorted((call.get('headers') or {}).items())])
+        self.translation = _digest([
+            call.get('response_format', 'json'),
+            call.get('response_expectation'),
+            call.get('response_unexpectation'),
+            call.get('response_translation')])
+
+
+def cacheable(response):
+    if response.status_code != 200:
+        return False
+    directives = response.headers.get('Cache-Control', '').lower()
+    return 'no-store' not in directives
+
+
+def _max_age(cache_control):
+    for directive in (cache_control or '').lower().split(','):
+        name, _, value = directive.strip().partition('=')
+        if name == 'max-age' and value.strip().isdigit():
+            return int(value.strip())
+    return None
+
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(
+        value, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _json_default(value):
+    # numbers of streamed json responses
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    return str(value)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(directory=None):
+    """
+    Cache shared by the process, one for every disk directory.
+    """
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = ResponseCache(directory)
+        return _caches[directory]
+
+
+def clear():
+    with _caches_lock:
+        for cache in _caches.values():
+            cache.clear()
@@ -0,0 +1,119 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Transports recording exchanges of process() into a cassette file and
+# replaying them without network access.
+#
+#   recorder = RecordingTransport('calls.json')
+#   process(params, template, request_props, transport=recorder)
+#   recorder.save()
+#
+#   process(params, template, request_props,
+#           transport=ReplayTransport('calls.json'))
+
+import base64
+import json
+import threading
+from collections import defaultdict
+
+import requests
+
+from . import transport as _transport
+from .exceptions import CassetteMissException
+
+VERSION = 1
+
+
+class RecordingTransport(object):
+    """
+    Forward requests to a transport (by default the shared session pool)
+    and remember every response and connection error.
+    """
+
+    def __init__(self, path, transport=None):
+        self.path = path
+        self.transport = transport or _transport.get_default_pool()
+        self.interactions = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        try:
+            response = self.transport.request(method, url, **kwargs)
+        except requests.exceptions.ConnectionError:
+            self._record(method, url, {'error': 'connection'})
+            raise
+        self._record(method, url, {'response': {
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': dict(response.headers),
+            # whole body is read, also for stream=True
+            'body': base64.b64encode(response.content).decode('ascii')}})
+        return response
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump({'version': VERSION,
+                       'interactions': self.interactions}, f, indent=1,
+                      sort_keys=True)
+
+    def _record(self, method, url, result):
+        interaction = {'request': {'method': method.upper(), 'url': url}}
+        interaction.update(result)
+        with self._lock:
+            self.interactions.append(interaction)
+
+
+class ReplayTransport(object):
+    """
+    Answer requests from a cassette. Requests are matched by method and
+    url, requests with the same method and url get recorded responses in
+    recording order. With repeat the responses start over when all of
+    them were used, so the cassette can be replayed any number of times.
+    """
+
+    def __init__(self, path, repeat=True):
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') != VERSION:
+            raise ValueError('Unsupported cassette version {}'.format(
+                data.get('version')))
+        self.repeat = repeat
+        self._interactions = defaultdict(list)
+        for interaction in data['interactions']:
+            request = interaction['request']
+            self._interactions[(request['method'], request['url'])].append(
+                interaction)
+        self._positions = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        key = (method.upper(), url)
+        with self._lock:
+            recorded = self._interactions.get(key)
+            position = self._positions[key]
+            if recorded and position >= len(recorded) and self.repeat:
+                position = 0
+            if not recorded or position >= len(recorded):
+                raise CassetteMissException(
+                    'No recorded response for {} {}'.format(method, url))
+            self._positions[key] = position + 1
+        interaction = recorded[position]
+        if 'error' in interaction:
+            raise requests.exceptions.ConnectionError(
+                'Recorded connection error for {}'.format(url))
+        response = interaction['response']
+        return _transport.build_response(
+            response['status'], response['reason'], response['headers'],
+            base64.b64decode(response['body']), url)
@@ -0,0 +1,143 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Body of a "response_format: raw" call written to a file. download (per
+# call):
+#
+#   download:
+#     path: images/disk.qcow2   # target file, relative to download_dir
+#                               # (node property, a directory of the
+#                               # deployment) when not absolute
+#     digest: sha256            # hashlib algorithm of the digest
+#     chunk_size: 1048576       # bytes read from the connection at once
+#
+# The body is streamed to a temporary file next to the target, which is
+# renamed when the whole body arrived, so memory use doesn't depend on the
+# size of the file. Instead of the body the call gets a response of path,
+# size, digest, algorithm, status_code and headers, used by
+# response_expectation and response_translation:
+#
+#   response_expectation:
+#     - [digest, 9f86d081884c7d65...]
+#   response_translation:
+#     - [[path], [image, path]]
+#     - [[digest], [image, sha256]]
+
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+from . import LOGGER_NAME
+from .exceptions import WrongTemplateDataException
+
+logger = logging.getLogger(LOGGER_NAME)
+
+DEFAULTS = {
+    'path': None,
+    'digest': 'sha256',
+    'chunk_size': 1024 * 1024,
+}
+
+
+def default_directory():
+    import tempfile
+    return os.path.join(tempfile.gettempdir(), 'rest-downloads')
+
+
+class Download(object):
+    """
+    download options of a rendered call.
+    """
+
+    def __init__(self, options, call):
+        if not isinstance(options, dict):
+            raise WrongTemplateDataException(
+                "download had to be dict. Type {} not supported. ".format(
+                    type(options)))
+        unknown = set(options) - set(DEFAULTS)
+        if unknown:
+            raise WrongTemplateDataException(
+                'Unknown download options: {}'.format(
+                    ', '.join(sorted(unknown))))
+        if str(call.get('response_format', 'json')).upper() != 'RAW':
+            raise WrongTemplateDataException(
+                'download can be used only with response_format raw')
+        if call.get('cache') or call.get('pagination'):
+            raise WrongTemplateDataException(
+                'download can not be used with cache or pagination')
+        values = dict(DEFAULTS, **options)
+        if not values['path']:
+            raise WrongTemplateDataException('download requires path')
+        self.path = os.path.join(
+            call.get('download_dir') or default_directory(), values['path'])
+        self.algorithm = values['digest']
+        try:
+            hashlib.new(self.algorithm)
+            self.chunk_size = int(values['chunk_size'])
+        except (TypeError, ValueError) as e:
+            raise WrongTemplateDataException(
+                'Wrong download option value: {}'.format(e))
+        if self.chunk_size <= 0:
+            raise WrongTemplateDataException(
+                'download chunk_size has to be positive')
+
+    def save(self, response, check=None):
+        """
+        Write the body of response to path, returns the response used by
+        expectations and translation. check(result) is called before the
+        file is moved to path, a file it rejects is removed.
+        """
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # created by a parallel call
+                if not os.path.isdir(directory):
+                    raise
+        # unique, parallel calls may download to the same path
+        fd, partial = tempfile.mkstemp(
+            prefix=os.path.basename(self.path) + '.', suffix='.part',
+            dir=directory or '.')
+        digest = hashlib.new(self.algorithm)
+        size = 0
+        started = time.time()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(self.chunk_size):
+                    if chunk:
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+            result = {'path': self.path,
+                      'size': size,
+                      'digest': digest.hexdigest(),
+                      'algorithm': self.algorithm,
+                      'status_code': response.status_code,
+                      'headers': dict(response.headers)}
+            if check is not None:
+                check(result)
+            os.rename(partial, self.path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        finally:
+            response.close()
+        logger.info('{} bytes saved to {} in {:.1f}s'.format(
+            size, self.path, time.time() - started))
+        return result
@@ -15,7 +15,8 @@
 
 
 class RestSdkException(Exception):
-    pass
+    # seconds from Retry-After header of the response which caused it
+    retry_after = None
 
 
 class ExpectationException(RestSdkException):
@@ -32,3 +33,11 @@ class RecoverebleStatusCodeCodeException(RestSdkException):
 
 class WrongTemplateDataException(RestSdkException):
     pass
+
+
+class CassetteMissException(RestSdkException):
+    pass
+
+
+class DeadlineExceededException(RestSdkException):
+    pass
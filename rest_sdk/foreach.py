@@ -0,0 +1,218 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Sending a call with "foreach" key once for every element of a list:
+#
+#   foreach:
+#     path: [items]       # list in params or runtime properties written
+#                         # by earlier calls
+#     items: [a, b]       # or the list itself
+#     as: item            # name of the element in jinja expressions of
+#                         # the call, its position is item_index
+#     concurrency: 10     # calls sent at the same time
+#     save_as: details    # runtime property, list of response_translation
+#                         # results of the elements in order of the list
+#     on_error: fail      # fail - stop on the first failed element
+#                         # continue - failed elements are None
+#     max_failures: 5     # continue: fail after more elements failed
+#     errors_as: failed   # continue: runtime property with index and
+#                         # error of failed elements
+#
+# Without save_as the results of all elements are merged, lists are
+# concatenated.
+
+import logging
+import threading
+
+from . import LOGGER_NAME
+from .exceptions import WrongTemplateDataException
+from .pagination import merge
+
+logger = logging.getLogger(LOGGER_NAME)
+
+FAIL = 'fail'
+CONTINUE = 'continue'
+ON_ERROR = (FAIL, CONTINUE)
+
+DEFAULTS = {
+    'path': None,
+    'items': None,
+    'as': 'item',
+    'concurrency': 1,
+    'save_as': None,
+    'on_error': FAIL,
+    'max_failures': None,
+    'errors_as': None,
+}
+
+
+class Foreach(object):
+
+    def __init__(self, index, options, params):
+        """
+        :param index: index of the call in the template
+        :param options: rendered foreach block of the call
+        :param params: params the elements are rendered with
+        """
+        if not isinstance(options, dict):
+            raise WrongTemplateDataException(
+                "foreach had to be dict. Type {} not supported. ".format(
+                    type(options)))
+        unknown = set(options) - set(DEFAULTS)
+        if unknown:
+            raise WrongTemplateDataException(
+                'Unknown foreach options: {}'.format(
+                    ', '.join(sorted(unknown))))
+        values = dict(DEFAULTS, **options)
+        self.index = index
+        self.name = values['as']
+        self.save_as = values['save_as']
+        self.errors_as = values['errors_as']
+        self.on_error = values['on_error']
+        if self.on_error not in ON_ERROR:
+            raise WrongTemplateDataException(
+                'foreach on_error {} is not supported, use one of: {}'.format(
+                    self.on_error, ', '.join(ON_ERROR)))
+        try:
+            self.concurrency = max(int(values['concurrency']), 1)
+            self.max_failures = int(values['max_failures']) \
+                if values['max_failures'] is not None else None
+        except (TypeError, ValueError) as e:
+            raise WrongTemplateDataException(
+                'Wrong foreach option value: {}'.format(e))
+        self.items = _items(values, params)
+        self._params = dict(params)
+
+    def __len__(self):
+        return len(self.items)
+
+    def params(self, position):
+        """
+        params of the element at position
+        """
+        params = dict(self._params)
+        params[self.name] = self.items[position]
+        params[self.name + '_index'] = position
+        return params
+
+    def failed(self, errors):
+        # True when errors stop all the other elements
+        return bool(errors) and (
+            self.on_error == FAIL or
+            self.max_failures is not None and
+            len(errors) > self.max_failures)
+
+    def properties(self, results, errors):
+        """
+        runtime properties written by the call
+        """
+        properties = {}
+        if self.save_as:
+            properties[self.save_as] = results
+        else:
+            for result in results:
+                if result:
+                    merge(properties, result, concat_lists=True)
+        if self.errors_as:
+            properties[self.errors_as] = [
+                {'index': position, 'error': str(error)}
+                for position, error in errors]
+        return properties
+
+
+class Result(object):
+    """
+    Results of all elements of a call, replacing the parsed response.
+    """
+
+    def __init__(self, each, results, errors):
+        self.each = each
+        self.results = results
+        self.errors = errors
+
+    def result(self):
+        return self.each.properties(self.results, self.errors)
+
+
+def run(each, func):
+    """
+    Call func(position) for every element of each, returns the list of
+    results (None for failed elements) and the sorted list of (position,
+    exception) of failed elements. Raises the first error when they stop
+    the other elements.
+    """
+    results = [None] * len(each)
+    errors = []
+    stopped = threading.Event()
+
+    def _run(position):
+        if stopped.is_set():
+            return position, False, None
+        try:
+            return position, True, func(position)
+        except Exception as e:
+            return position, False, e
+
+    def _collect(outcomes):
+        for position, succeeded, value in outcomes:
+            if succeeded:
+                results[position] = value
+            elif value is not None:
+                logger.info('foreach element {} failed: {}'.format(
+                    position, value))
+                errors.append((position, value))
+                if each.failed(errors):
+                    stopped.set()
+
+    concurrency = min(each.concurrency, len(each))
+    if concurrency <= 1:
+        _collect(_run(position) for position in range(len(each)))
+    else:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(concurrency)
+        try:
+            _collect(pool.imap_unordered(_run, range(len(each))))
+        finally:
+            pool.close()
+            pool.join()
+    errors.sort(key=lambda error: error[0])
+    if each.failed(errors):
+        raise errors[0][1]
+    return results, errors
+
+
+def _items(values, params):
+    if values['items'] is not None:
+        items = values['items']
+    elif values['path'] is not None:
+        if not isinstance(values['path'], list):
+            raise WrongTemplateDataException(
+                'foreach path had to be list. Type {} not supported. '.format(
+                    type(values['path'])))
+        items = params
+        try:
+            for key in values['path']:
+                items = items[key]
+        except (IndexError, KeyError, TypeError):
+            raise WrongTemplateDataException(
+                'foreach path {} not found'.format(values['path']))
+    else:
+        raise WrongTemplateDataException(
+            'foreach requires path or items')
+    if not isinstance(items, list):
+        raise WrongTemplateDataException(
+            'foreach items had to be list. Type {} not supported. '.format(
+                type(items)))
+    return items
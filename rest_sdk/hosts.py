@@ -0,0 +1,222 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Order in which hosts of a call are tried, based on results of earlier
+# calls made in the process. A host failing with ConnectionError
+# failure_threshold times in a row is skipped (tried only when all other
+# hosts failed) until reset_timeout passes, then a single call probes it.
+#
+# host_selection of a call:
+#   ordered - last host which answered first, then hosts in their order
+#   latency - hosts with lower average response time first
+#   race    - send to the first two hosts at the same time and use the
+#             first answer, only for GET, HEAD and OPTIONS calls
+
+import logging
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from . import LOGGER_NAME
+from .exceptions import WrongTemplateDataException
+
+logger = logging.getLogger(LOGGER_NAME)
+
+ORDERED = 'ordered'
+LATENCY = 'latency'
+RACE = 'race'
+STRATEGIES = (ORDERED, LATENCY, RACE)
+
+DEFAULT_FAILURE_THRESHOLD = 1
+DEFAULT_RESET_TIMEOUT = 30
+# weight of the last response time in the average
+LATENCY_ALPHA = 0.3
+
+
+class _Health(object):
+    __slots__ = ('failures', 'opened_at', 'probe_started', 'last_success',
+                 'latency')
+
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started = None
+        self.last_success = None
+        self.latency = None
+
+
+class HostSelector(object):
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT, clock=time.time):
+        """
+        :param failure_threshold: connection failures in a row opening
+                                  the circuit of a host
+        :param reset_timeout: seconds before a host with open circuit is
+                              probed again
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._health = {}
+
+    def configure(self, failure_threshold=None, reset_timeout=None):
+        with self._lock:
+            if failure_threshold is not None:
+                self.failure_threshold = failure_threshold
+            if reset_timeout is not None:
+                self.reset_timeout = reset_timeout
+
+    def order(self, hosts, strategy=ORDERED):
+        """
+        Return hosts in the order they should be tried.
+        """
+        if strategy not in STRATEGIES:
+            raise WrongTemplateDataException(
+                'host_selection {} is not supported, use one of: {}'.format(
+                    strategy, ', '.join(STRATEGIES)))
+        now = self._clock()
+        probes, available, tripped = [], [], []
+        with self._lock:
+            for host in hosts:
+                health = self._health.setdefault(host, _Health())
+                if health.opened_at is None:
+                    available.append(host)
+                elif now - health.opened_at >= self.reset_timeout and (
+                        health.probe_started is None or
+                        now - health.probe_started >= self.reset_timeout):
+                    # half open, this call probes the host
+                    health.probe_started = now
+                    probes.append(host)
+                else:
+                    tripped.append(host)
+            if strategy == LATENCY:
+                # hosts never measured first, to get their latency
+                available.sort(key=lambda host: self._health[host].latency
+                               or 0)
+            else:
+                known_good = [host for host in available
+                              if self._health[host].last_success]
+                if known_good:
+                    best = max(known_good, key=lambda host:
+                               self._health[host].last_success)
+                    available.remove(best)
+                    available.insert(0, best)
+            tripped.sort(key=lambda host: self._health[host].opened_at)
+        if tripped:
+            logger.debug('hosts with open circuit tried last: {}'.format(
+                tripped))
+        return probes + available + tripped
+
+    def success(self, host, latency=None):
+        with self._lock:
+            health = self._health.setdefault(host, _Health())
+            if health.opened_at is not None:
+                logger.info('host {} is available again'.format(host))
+            health.failures = 0
+            health.opened_at = None
+            health.probe_started = None
+            health.last_success = self._clock()
+            if latency is not None:
+                health.latency = latency if health.latency is None else \
+                    LATENCY_ALPHA * latency + \
+                    (1 - LATENCY_ALPHA) * health.latency
+
+    def failure(self, host):
+        with self._lock:
+            health = self._health.setdefault(host, _Health())
+            health.failures += 1
+            health.probe_started = None
+            if health.opened_at is not None or \
+                    health.failures >= self.failure_threshold:
+                if health.opened_at is None:
+                    logger.info('host {} skipped for {}s'.format(
+                        host, self.reset_timeout))
+                health.opened_at = self._clock()
+
+    def state(self, host):
+        """
+        closed, open or half-open (probe allowed)
+        """
+        with self._lock:
+            health = self._health.get(host)
+            if health is None or health.opened_at is None:
+                return 'closed'
+            if self._clock() - health.opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def reset(self):
+        with self._lock:
+            self._health.clear()
+
+
+def race(attempts):
+    """
+    Run attempts (callables) at the same time, return (index, result) of
+    the first one which succeeded. When all fail the exception of the
+    last one is raised. Results of the other attempts are closed.
+    """
+    results = queue.Queue()
+
+    def _run(index, attempt):
+        try:
+            results.put((index, True, attempt()))
+        except Exception as e:
+            results.put((index, False, e))
+
+    for index, attempt in enumerate(attempts):
+        thread = threading.Thread(target=_run, args=(index, attempt))
+        thread.daemon = True
+        thread.start()
+    error = None
+    for received in range(len(attempts)):
+        index, succeeded, result = results.get()
+        if succeeded:
+            _close_later(results, len(attempts) - received - 1)
+            return index, result
+        error = result
+    raise error
+
+
+def _close_later(results, count):
+    if not count:
+        return
+
+    def _close():
+        for _ in range(count):
+            _, succeeded, result = results.get()
+            if succeeded and hasattr(result, 'close'):
+                result.close()
+
+    thread = threading.Thread(target=_close)
+    thread.daemon = True
+    thread.start()
+
+
+_default_selector = HostSelector()
+
+
+def get_default_selector():
+    return _default_selector
+
+
+def configure(failure_threshold=None, reset_timeout=None):
+    _default_selector.configure(failure_threshold, reset_timeout)
@@ -0,0 +1,226 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Log records of calls and responses. A Message is formatted only when a
+# handler emits the record, every value is written up to a length limit
+# and headers and payload fields with secrets are hidden, so logging a
+# huge response costs the same as logging a small one. logging (node
+# property or per call):
+#
+#   logging:
+#     max_length: 4096    # characters of a value in a record, 0 - no
+#                         # limit
+#     redact: [X-Tenant]  # header and field names hidden in addition to
+#                         # REDACTED
+
+from .exceptions import WrongTemplateDataException
+
+try:
+    _text_type = unicode
+except NameError:
+    _text_type = str
+
+REDACTED = frozenset([
+    'authorization', 'proxy-authorization', 'cookie', 'set-cookie',
+    'x-auth-token', 'x-api-key', 'api_key', 'apikey', 'password', 'secret',
+    'client_secret', 'token', 'access_token', 'refresh_token'])
+
+MASK = '***'
+TRUNCATED = '...[truncated]'
+
+DEFAULTS = {
+    'max_length': 4096,
+    'redact': [],
+}
+
+
+class Options(object):
+
+    def __init__(self, options=None):
+        options = {} if options is None else options
+        if not isinstance(options, dict):
+            raise WrongTemplateDataException(
+                "logging had to be dict. Type {} not supported. ".format(
+                    type(options)))
+        unknown = set(options) - set(DEFAULTS)
+        if unknown:
+            raise WrongTemplateDataException(
+                'Unknown logging options: {}'.format(
+                    ', '.join(sorted(unknown))))
+        values = dict(DEFAULTS, **options)
+        try:
+            self.max_length = int(values['max_length'] or 0)
+        except (TypeError, ValueError) as e:
+            raise WrongTemplateDataException(
+                'Wrong logging option value: {}'.format(e))
+        if not isinstance(values['redact'], list):
+            raise WrongTemplateDataException(
+                "logging redact had to be list. Type {} not "
+                "supported. ".format(type(values['redact'])))
+        self.redact = REDACTED.union(
+            _text_type(name).lower() for name in values['redact'])
+
+
+_DEFAULT_OPTIONS = Options()
+
+
+def options(call):
+    """
+    Options of the logging key of call, defaults without it.
+    """
+    values = call.get('logging')
+    return Options(values) if values else _DEFAULT_OPTIONS
+
+
+class Body(object):
+    """
+    Body of a downloaded response as a Message argument, only the part
+    which fits the record is decoded.
+    """
+    __slots__ = ('response',)
+
+    def __init__(self, response):
+        self.response = response
+
+
+class Message(object):
+    """
+    Log message: fmt.format(*args) with every argument written by text()
+    when the record is emitted. fmt has plain {} fields only.
+    """
+    __slots__ = ('options', 'fmt', 'args')
+
+    def __init__(self, options, fmt, *args):
+        self.options = options
+        self.fmt = fmt
+        self.args = args
+
+    def __unicode__(self):
+        limit = self.options.max_length or None
+        return _decode(self.fmt).format(
+            *[text(arg, self.options, limit) for arg in self.args])
+
+    if _text_type is str:
+        __str__ = __unicode__
+    else:
+        def __str__(self):
+            return self.__unicode__().encode('utf-8')
+
+
+def text(value, options=_DEFAULT_OPTIONS, limit=None):
+    """
+    Value written for a log record: strings as they are, other values as
+    their repr with redacted fields, cut to limit characters.
+    """
+    writer = _Writer(limit)
+    try:
+        if isinstance(value, Body):
+            _write_body(writer, value.response)
+        elif isinstance(value, (bytes, _text_type)):
+            writer.write(_decode(value if limit is None else
+                                 value[:limit + 1]))
+        else:
+            _write(writer, value, options.redact)
+    except _Full:
+        pass
+    return writer.text()
+
+
+class _Full(Exception):
+    pass
+
+
+class _Writer(object):
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.size = 0
+        self.parts = []
+        self.full = False
+        self.total = None
+
+    def write(self, part):
+        if self.limit is not None and self.size + len(part) > self.limit:
+            self.parts.append(part[:self.limit - self.size])
+            self.full = True
+            raise _Full()
+        self.parts.append(part)
+        self.size += len(part)
+
+    def truncate(self, part, total):
+        # part of a value of total bytes
+        self.parts.append(part)
+        self.full = True
+        self.total = total
+        raise _Full()
+
+    def room(self):
+        return None if self.limit is None else self.limit - self.size
+
+    def text(self):
+        value = u''.join(self.parts)
+        if not self.full:
+            return value
+        if self.total is not None:
+            return value + TRUNCATED[:-1] + u', {} bytes]'.format(self.total)
+        return value + TRUNCATED
+
+
+def _write(writer, value, redact):
+    if isinstance(value, dict):
+        writer.write(u'{')
+        for position, (key, item) in enumerate(value.items()):
+            if position:
+                writer.write(u', ')
+            _write(writer, key, redact)
+            writer.write(u': ')
+            if isinstance(key, (bytes, _text_type)) and \
+                    _decode(key).lower() in redact and item:
+                writer.write(u"'{}'".format(MASK))
+            else:
+                _write(writer, item, redact)
+        writer.write(u'}')
+    elif isinstance(value, (list, tuple)):
+        writer.write(u'[' if isinstance(value, list) else u'(')
+        for position, item in enumerate(value):
+            if position:
+                writer.write(u', ')
+            _write(writer, item, redact)
+        writer.write(u']' if isinstance(value, list) else u')')
+    elif isinstance(value, (bytes, _text_type)):
+        room = writer.room()
+        # repr of the part which fits, not of the whole string
+        writer.write(_decode(repr(value if room is None else
+                                  value[:room + 1])))
+    else:
+        writer.write(_decode(repr(value)))
+
+
+def _write_body(writer, response):
+    content = response.content or b''
+    room = writer.room()
+    if room is not None and len(content) > room:
+        writer.truncate(_decode(content[:room], response.encoding),
+                        len(content))
+    writer.write(_decode(content, response.encoding))
+
+
+def _decode(value, encoding=None):
+    if isinstance(value, bytes):
+        try:
+            return value.decode(encoding or 'utf-8', 'replace')
+        except LookupError:
+            return value.decode('utf-8', 'replace')
+    return value
@@ -0,0 +1,184 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Timings of rest calls. Every call processed by process() produces a
+# CallMetrics passed to the sink given to process() and to all sinks
+# registered with register_sink(). Sinks are called from the thread which
+# sent the call, with parallel calls that is a worker thread.
+#
+# Phases (seconds):
+#   render     - jinja rendering of the call
+#   connect    - DNS lookup and TCP connect of new connections
+#   tls        - TLS handshake of new connections
+#   ttfb       - request sent until response headers received
+#   download   - response body download (streamed bodies are downloaded
+#                while parsed, so it is included in parse)
+#   parse      - json/xml parsing, response_expectation checks
+#   translate  - response_translation
+#   wait       - sleeping between poll attempts
+#   throttle   - waiting for rate_limit of the host
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from . import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+PHASES = ('render', 'connect', 'tls', 'ttfb', 'download', 'parse',
+          'translate', 'wait', 'throttle')
+
+_sinks = []
+_local = threading.local()
+
+
+class CallMetrics(object):
+
+    def __init__(self, index, method=None, path=None):
+        self.index = index
+        self.method = method
+        self.path = path
+        self.started = time.time()
+        self.duration = None
+        self.phases = {}
+        self.hosts = []
+        self.failovers = 0
+        self.retries = 0
+        self.status_code = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.error = None
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+    @contextmanager
+    def measure(self, phase):
+        started = time.time()
+        try:
+            yield
+        finally:
+            self.add(phase, time.time() - started)
+
+    def merge(self, other):
+        """
+        Add counters of other, like metrics of foreach elements.
+        """
+        for phase, seconds in other.phases.items():
+            self.add(phase, seconds)
+        self.hosts.extend(other.hosts)
+        self.failovers += other.failovers
+        self.retries += other.retries
+        self.status_code = other.status_code or self.status_code
+        self.bytes_sent += other.bytes_sent
+        self.bytes_received += other.bytes_received
+
+    def finish(self, error=None):
+        self.duration = time.time() - self.started
+        if error is not None:
+            self.error = type(error).__name__
+
+    def to_dict(self):
+        return {'index': self.index, 'method': self.method,
+                'path': self.path, 'duration': self.duration,
+                'phases': dict(self.phases), 'hosts': list(self.hosts),
+                'failovers': self.failovers, 'retries': self.retries,
+                'status_code': self.status_code,
+                'bytes_sent': self.bytes_sent,
+                'bytes_received': self.bytes_received, 'error': self.error}
+
+
+class Collector(object):
+    """
+    Sink keeping metrics of all calls of an execution.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, call_metrics):
+        with self._lock:
+            self.calls.append(call_metrics)
+
+    def summary(self):
+        """
+        Compact summary: totals of all calls and the slowest call.
+        """
+        with self._lock:
+            calls = sorted(self.calls, key=lambda item: item.index)
+        phases = {}
+        for call in calls:
+            for phase, seconds in call.phases.items():
+                phases[phase] = round(phases.get(phase, 0) + seconds, 6)
+        slowest = max(calls, key=lambda item: item.duration or 0) \
+            if calls else None
+        return {
+            'calls': len(calls),
+            'errors': sum(1 for call in calls if call.error),
+            'duration': round(sum(call.duration or 0 for call in calls), 6),
+            'phases': phases,
+            'bytes_sent': sum(call.bytes_sent for call in calls),
+            'bytes_received': sum(call.bytes_received for call in calls),
+            'failovers': sum(call.failovers for call in calls),
+            'retries': sum(call.retries for call in calls),
+            'slowest': {'index': slowest.index, 'path': slowest.path,
+                        'duration': round(slowest.duration or 0, 6)}
+            if slowest else None}
+
+
+def register_sink(sink):
+    """
+    :param sink: callable getting CallMetrics of every finished call
+    """
+    _sinks.append(sink)
+
+
+def unregister_sink(sink):
+    _sinks.remove(sink)
+
+
+def emit(call_metrics, sink=None):
+    for target in ([sink] if sink is not None else []) + _sinks:
+        try:
+            target(call_metrics)
+        except Exception as e:
+            logger.warning('metrics sink {} failed: {}'.format(target, e))
+
+
+@contextmanager
+def activate(call_metrics):
+    """
+    Make call_metrics the target of add() in this thread, used by code
+    with no reference to the call, like connections of the transport.
+    """
+    previous = getattr(_local, 'current', None)
+    _local.current = call_metrics
+    try:
+        yield call_metrics
+    finally:
+        _local.current = previous
+
+
+def current():
+    return getattr(_local, 'current', None)
+
+
+def add(phase, seconds):
+    call_metrics = current()
+    if call_metrics is not None:
+        call_metrics.add(phase, seconds)
@@ -0,0 +1,265 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Following pages of a call with "pagination" key:
+#
+#   pagination:
+#     type: link          # link - rel="next" of the Link header
+#                         # next - url or cursor in the response
+#                         # offset - offset and limit query parameters
+#     next: [meta, next]  # next: path of the url or cursor in the response
+#     cursor_param: page  # next: query parameter for a cursor
+#     offset_param: offset
+#     limit_param: limit
+#     limit: 100          # offset: page size, the last page is shorter
+#     items: [data]       # path of the list of items in a page
+#     save_as: users      # runtime property with items of all pages
+#     max_pages: 1000
+#     prefetch: 1         # pages requested while earlier ones are processed
+#
+# response_expectation is checked for every page and response_translation
+# is applied to every page: lists are concatenated, other values are the
+# ones of the last page. Pages are dropped as soon as they are processed.
+
+import threading
+
+from requests.compat import urlencode, urljoin, urlparse
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from .exceptions import WrongTemplateDataException
+
+LINK = 'link'
+NEXT = 'next'
+OFFSET = 'offset'
+TYPES = (LINK, NEXT, OFFSET)
+
+DEFAULTS = {
+    'type': LINK,
+    'next': None,
+    'cursor_param': 'cursor',
+    'offset_param': 'offset',
+    'limit_param': 'limit',
+    'limit': 100,
+    'items': None,
+    'save_as': None,
+    'max_pages': 1000,
+    'prefetch': 0,
+}
+
+
+class Pagination(object):
+
+    def __init__(self, options):
+        if not isinstance(options, dict):
+            raise WrongTemplateDataException(
+                "pagination had to be dict. Type {} not supported. ".format(
+                    type(options)))
+        unknown = set(options) - set(DEFAULTS)
+        if unknown:
+            raise WrongTemplateDataException(
+                'Unknown pagination options: {}'.format(
+                    ', '.join(sorted(unknown))))
+        values = dict(DEFAULTS, **options)
+        self.type = values['type']
+        if self.type not in TYPES:
+            raise WrongTemplateDataException(
+                'pagination type {} is not supported, use one of: {}'.format(
+                    self.type, ', '.join(TYPES)))
+        self.next = _path(values['next'], 'next')
+        self.items = _path(values['items'], 'items')
+        if self.type == NEXT and self.next is None:
+            raise WrongTemplateDataException(
+                'pagination type next requires next path')
+        if self.type == OFFSET and self.items is None:
+            raise WrongTemplateDataException(
+                'pagination type offset requires items path')
+        if values['save_as'] and self.items is None:
+            raise WrongTemplateDataException(
+                'pagination save_as requires items path')
+        self.cursor_param = values['cursor_param']
+        self.offset_param = values['offset_param']
+        self.limit_param = values['limit_param']
+        self.save_as = values['save_as']
+        try:
+            self.limit = int(values['limit'])
+            self.max_pages = int(values['max_pages'])
+            self.prefetch = int(values['prefetch'] or 0)
+        except (TypeError, ValueError) as e:
+            raise WrongTemplateDataException(
+                'Wrong pagination option value: {}'.format(e))
+
+    def first_path(self, path):
+        if self.type == OFFSET:
+            return _with_query(path, {self.offset_param: 0,
+                                      self.limit_param: self.limit})
+        return path
+
+    def next_path(self, path, url, response, json, page):
+        """
+        Path of the page after page number page (0 based), None for the
+        last page. url is the full url of the page, path the path of the
+        call it was sent for.
+        """
+        if page + 1 >= self.max_pages:
+            return None
+        if self.type == OFFSET:
+            if len(self.page_items(json)) < self.limit:
+                return None
+            return _with_query(path, {
+                self.offset_param: (page + 1) * self.limit,
+                self.limit_param: self.limit})
+        if self.type == LINK:
+            next_url = response.links.get('next', {}).get('url')
+        else:
+            next_url = _get(json, self.next)
+            if next_url in (None, '', False):
+                return None
+            next_url = str(next_url)
+            if not ('://' in next_url or next_url.startswith('/')):
+                # cursor
+                return _with_query(path, {self.cursor_param: next_url})
+        if not next_url:
+            return None
+        parsed = urlparse(urljoin(url, next_url))
+        return parsed.path + ('?' + parsed.query if parsed.query else '')
+
+    def page_items(self, json):
+        items = _get(json, self.items) or []
+        if not isinstance(items, list):
+            # single element lists of xml documents
+            items = [items]
+        return items
+
+
+class Pages(object):
+    """
+    Results of all pages of a call, replacing the parsed response.
+    """
+
+    def __init__(self, pagination):
+        self.pagination = pagination
+        self.properties = {}
+        self.items = []
+        self.count = 0
+
+    def add(self, json, properties):
+        self.count += 1
+        merge(self.properties, properties, concat_lists=True)
+        if self.pagination.save_as:
+            self.items.extend(self.pagination.page_items(json))
+
+    def result(self):
+        properties = dict(self.properties)
+        if self.pagination.save_as:
+            properties[self.pagination.save_as] = self.items
+        return properties
+
+
+def iterate(fetch, path, prefetch=0):
+    """
+    Yield pages starting from path. fetch(path, page) returns the page
+    and the path of the next one (None after the last page). With
+    prefetch pages are fetched in another thread, at most prefetch of
+    them waiting to be consumed.
+    """
+    if prefetch <= 0:
+        page = 0
+        while path is not None:
+            value, path = fetch(path, page)
+            yield value
+            page += 1
+        return
+    pages = queue.Queue(maxsize=prefetch)
+    stopped = threading.Event()
+
+    def _put(item):
+        while not stopped.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _produce(path):
+        page = 0
+        try:
+            while path is not None and not stopped.is_set():
+                value, path = fetch(path, page)
+                _put((True, value))
+                page += 1
+            _put(_DONE)
+        except Exception as e:
+            _put((False, e))
+
+    thread = threading.Thread(target=_produce, args=(path,))
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            item = pages.get()
+            if item is _DONE:
+                return
+            succeeded, value = item
+            if not succeeded:
+                raise value
+            yield value
+    finally:
+        stopped.set()
+
+
+_DONE = object()
+
+
+def merge(target, source, concat_lists=False):
+    for key, value in source.items():
+        current = target.get(key)
+        if isinstance(current, dict) and isinstance(value, dict):
+            merge(current, value, concat_lists)
+        elif concat_lists and isinstance(current, list) and \
+                isinstance(value, list):
+            current.extend(value)
+        else:
+            target[key] = value
+
+
+def _path(value, name):
+    if value is None:
+        return None
+    if not isinstance(value, list):
+        raise WrongTemplateDataException(
+            'pagination {} had to be list. Type {} not supported. '.format(
+                name, type(value)))
+    return value
+
+
+def _get(json, path):
+    try:
+        for key in path:
+            json = json[key]
+    except (IndexError, KeyError, TypeError):
+        return None
+    return json
+
+
+def _with_query(path, params):
+    parsed = urlparse(path)
+    query = [part for part in parsed.query.split('&')
+             if part and part.split('=')[0] not in params]
+    query.append(urlencode(sorted(params.items())))
+    return parsed.path + '?' + '&'.join(query)
@@ -0,0 +1,240 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import logging
+import sys
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from . import LOGGER_NAME
+from .template import is_templated
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# calls with any other method change state on the server side, they are
+# started only after all earlier calls succeeded and nothing later is
+# started before they finish
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# (capture, activate) pairs carrying thread local state of the caller,
+# like the cloudify ctx used for logging, to worker threads
+_context_propagators = []
+
+
+def register_context_propagator(capture, activate):
+    """
+    :param capture: called in the calling thread, returns state to carry
+    :param activate: called in a worker thread with the captured state,
+                     returns context manager active while a call runs
+    """
+    _context_propagators.append((capture, activate))
+
+
+def _capture_contexts():
+    return [(activate, capture())
+            for capture, activate in _context_propagators]
+
+
+def _run_in_contexts(contexts, func, *args):
+    if not contexts:
+        return func(*args)
+    (activate, state), rest = contexts[0], contexts[1:]
+    with activate(state):
+        return _run_in_contexts(rest, func, *args)
+
+
+def bind_context(func):
+    """
+    Return func which runs in the context of the calling thread, to be
+    called in another thread.
+    """
+    contexts = _capture_contexts()
+
+    def _bound(*args):
+        return _run_in_contexts(contexts, func, *args)
+    return _bound
+
+
+def call_dependencies(compiled_template):
+    """
+    For every call return the set of indexes of earlier calls which have
+    to be finished before the call can be rendered and sent.
+    A call depends on every earlier call whose response_translation
+    writes a runtime property the call reads, on every earlier call with
+    unknown (templated) writes and on the last non-safe call.
+    """
+    dependencies = []
+    writers = []
+    last_barrier = None
+    for index, call in enumerate(compiled_template.calls):
+        reads = set(compiled_template.variables(index)) | call_reads(call)
+        if not _is_safe(call):
+            current = set(range(index))
+            last_barrier = index
+        else:
+            current = set()
+            if last_barrier is not None:
+                current.add(last_barrier)
+            for writer, keys in writers:
+                if keys is None or keys & reads:
+                    current.add(writer)
+        dependencies.append(current)
+        writers.append((index, call_writes(call)))
+    return dependencies
+
+
+def call_writes(call):
+    """
+    Top level runtime property keys written by the call, None if they
+    can't be known before the call is rendered.
+    """
+    writes = translation_writes(call.get('response_translation'))
+    if writes is None:
+        return None
+    for key, option in (('pagination', 'save_as'), ('foreach', 'save_as'),
+                        ('foreach', 'errors_as'), ('broadcast', 'save_as'),
+                        ('broadcast', 'errors_as')):
+        block = call.get(key)
+        if is_templated(block):
+            return None
+        name = block.get(option) if isinstance(block, dict) else None
+        if is_templated(name):
+            return None
+        if name:
+            writes.add(name)
+    return writes
+
+
+def call_reads(call):
+    """
+    Top level runtime property keys read by the call other than through
+    jinja expressions.
+    """
+    block = call.get('foreach')
+    path = block.get('path') if isinstance(block, dict) else None
+    if isinstance(path, list) and path and not is_templated(path[0]):
+        return set([path[0]])
+    return set()
+
+
+def translation_writes(translation):
+    # local import, utility depends on this module
+    from .utility import _check_if_v2
+    if not translation:
+        return set()
+    if is_templated(translation):
+        return None
+    if _check_if_v2(translation):
+        keys = set()
+        for _, runtime_path in translation:
+            if not runtime_path:
+                continue
+            if is_templated(runtime_path[0]) or \
+                    isinstance(runtime_path[0], (list, dict)):
+                return None
+            keys.add(runtime_path[0])
+        return keys
+    keys = set()
+    stack = [translation]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            if node and not isinstance(node[0], (list, dict)):
+                if is_templated(node[0]):
+                    return None
+                keys.add(node[0])
+            else:
+                stack.extend(node)
+        elif is_templated(node):
+            return None
+    return keys
+
+
+def _is_safe(call):
+    method = call.get('method')
+    return not is_templated(method) and \
+        str(method).upper() in SAFE_METHODS
+
+
+def execute(dependencies, max_workers, prepare, run, commit, start=0):
+    """
+    Run calls on a pool of max_workers threads.
+
+    prepare(index) is called in the calling thread as soon as all
+    dependencies of the call are committed and returns a job,
+    run(job) is called in a worker thread and
+    commit(index, job, result) is called in the calling thread strictly
+    in call order. The exception raised is the one of the first failing
+    call in order, calls after it are not committed, so the outcome is the
+    same as for sequential processing. Calls before start are treated
+    as already committed.
+    """
+    count = len(dependencies)
+    done = queue.Queue()
+    finished = {}
+    jobs = {}
+    dispatched = set()
+    committed = start
+    first_failure = count
+    window = 2 * max_workers
+    contexts = _capture_contexts()
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(max_workers)
+
+    def _run(index, job):
+        try:
+            done.put((index, True, _run_in_contexts(contexts, run, job)))
+        except Exception:
+            done.put((index, False, sys.exc_info()[1]))
+
+    try:
+        while committed < count:
+            for index in range(committed, first_failure):
+                # dispatched holds calls of this run only, the ones
+                # before start were committed earlier
+                if index > committed and \
+                        len(dispatched) - (committed - start) >= window:
+                    break
+                if index in dispatched or \
+                        any(dep >= committed for dep in dependencies[index]):
+                    continue
+                dispatched.add(index)
+                try:
+                    jobs[index] = prepare(index)
+                except Exception as e:
+                    finished[index] = (False, e)
+                    first_failure = min(first_failure, index)
+                    continue
+                logger.debug('call {} started'.format(index))
+                pool.apply_async(_run, (index, jobs[index]))
+            if committed not in finished:
+                index, succeeded, result = done.get()
+                finished[index] = (succeeded, result)
+                if not succeeded:
+                    first_failure = min(first_failure, index)
+            while committed in finished:
+                succeeded, result = finished.pop(committed)
+                if not succeeded:
+                    raise result
+                commit(committed, jobs.pop(committed), result)
+                committed += 1
+    finally:
+        pool.close()
+        pool.join()
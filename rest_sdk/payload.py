@@ -0,0 +1,242 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Request body of a call. Besides payload (payload_format json - rendered
+# structure serialized to JSON, raw - text sent as is) a call can have
+# (all optional):
+#
+#   payload_format: json_text   # payload is a JSON text already, e.g.
+#                               # "{{ items | tojson }}", sent as it is
+#                               # with Content-Type application/json
+#   payload_file:               # instead of payload, a file read and sent
+#     path: data/items.json     # in chunks (chunked transfer encoding):
+#                               # absolute path of a file or a blueprint
+#                               # resource
+#     chunk_size: 65536
+#     content_type: application/json
+#   payload_encoding: gzip      # or deflate - body compressed (while sent
+#                               # for payload_file), Content-Encoding set
+#
+# Headers of the call win over Content-Type and Content-Encoding set here.
+
+import contextlib
+import json
+import os
+import zlib
+
+from requests.compat import urlencode
+
+from .exceptions import WrongTemplateDataException
+
+try:
+    _string_types = (str, unicode)
+except NameError:
+    _string_types = (str,)
+
+JSON = 'json'
+JSON_TEXT = 'json_text'
+FORM = 'application/x-www-form-urlencoded'
+
+# window bits of zlib for the Content-Encoding
+ENCODINGS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS,
+}
+
+DEFAULTS = {
+    'path': None,
+    'chunk_size': 64 * 1024,
+    'content_type': None,
+}
+
+_resource_resolver = None
+
+
+def set_resource_resolver(resolver):
+    """
+    resolver(path) returns a local copy of a blueprint resource, used for
+    relative payload_file paths and removed when the call was sent. Without
+    it they are relative to the working directory.
+    """
+    global _resource_resolver
+    _resource_resolver = resolver
+
+
+@contextlib.contextmanager
+def resolved(call):
+    """
+    call with a relative payload_file path resolved once for all attempts
+    of the call (failover, throttling, poll, pages), the copy of the
+    resource is removed afterwards.
+    """
+    options = call.get('payload_file')
+    if not isinstance(options, dict) or not options.get('path') or \
+            os.path.isabs(options['path']) or _resource_resolver is None:
+        yield call
+        return
+    path = _resource_resolver(options['path'])
+    try:
+        yield dict(call, payload_file=dict(options, path=path))
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def request_body(call):
+    """
+    data, json and headers of the request of a rendered call.
+    """
+    encoding = call.get('payload_encoding')
+    if encoding and encoding not in ENCODINGS:
+        raise WrongTemplateDataException(
+            'Unknown payload_encoding: {}'.format(encoding))
+    payload = call.get('payload', None)
+    payload_format = call.get('payload_format', JSON)
+    headers = {}
+    data, json_payload = None, None
+    if call.get('payload_file'):
+        if payload is not None:
+            raise WrongTemplateDataException(
+                'payload_file can not be used with payload')
+        data = Body(call['payload_file'], encoding)
+        if data.content_type:
+            headers['Content-Type'] = data.content_type
+    elif payload is None:
+        return None, None, call.get('headers', None)
+    elif payload_format == JSON_TEXT:
+        data = _encode(payload)
+        headers['Content-Type'] = 'application/json'
+    elif payload_format != JSON:
+        data = payload
+        if encoding:
+            # form encoded like requests does without compression
+            if isinstance(data, (dict, list)):
+                data = urlencode(data, doseq=True)
+                headers['Content-Type'] = FORM
+            data = _encode(data)
+    elif encoding:
+        data = json.dumps(payload).encode('utf-8')
+        headers['Content-Type'] = 'application/json'
+    else:
+        json_payload = payload
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        if not isinstance(data, Body):
+            data = _compress(data, encoding)
+    return data, json_payload, _headers(call, headers)
+
+
+class Body(object):
+    """
+    File sent as the request body, read in chunks (and compressed) while
+    it is sent. Every iteration reads the file again, so the call can be
+    sent again on failover, throttling or poll.
+    """
+
+    def __init__(self, options, encoding=None):
+        if not isinstance(options, dict):
+            raise WrongTemplateDataException(
+                "payload_file had to be dict. Type {} not supported. "
+                .format(type(options)))
+        unknown = set(options) - set(DEFAULTS)
+        if unknown:
+            raise WrongTemplateDataException(
+                'Unknown payload_file options: {}'.format(
+                    ', '.join(sorted(unknown))))
+        values = dict(DEFAULTS, **options)
+        if not values['path']:
+            raise WrongTemplateDataException('payload_file requires path')
+        try:
+            self.chunk_size = int(values['chunk_size'])
+        except (TypeError, ValueError) as e:
+            raise WrongTemplateDataException(
+                'Wrong payload_file option value: {}'.format(e))
+        if self.chunk_size <= 0:
+            raise WrongTemplateDataException(
+                'payload_file chunk_size has to be positive')
+        self.path = _resolve(values['path'])
+        if not os.path.isfile(self.path):
+            raise WrongTemplateDataException(
+                'payload_file {} is not a file'.format(values['path']))
+        self.content_type = values['content_type']
+        self.encoding = encoding
+        # bytes sent by the last iteration
+        self.sent = 0
+
+    def __iter__(self):
+        self.sent = 0
+        compressor = zlib.compressobj(
+            zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED,
+            ENCODINGS[self.encoding]) if self.encoding else None
+        with open(self.path, 'rb') as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                if compressor is not None:
+                    chunk = compressor.compress(chunk)
+                    if not chunk:
+                        continue
+                self.sent += len(chunk)
+                yield chunk
+        if compressor is not None:
+            chunk = compressor.flush()
+            self.sent += len(chunk)
+            yield chunk
+
+    def read_all(self):
+        """
+        Whole body, for transports which can't stream it. Not read(),
+        which would make it a file to urllib3.
+        """
+        return b''.join(self)
+
+    def __repr__(self):
+        return '<payload_file {}>'.format(self.path)
+
+
+def _resolve(path):
+    if os.path.isabs(path) or _resource_resolver is None:
+        return path
+    return _resource_resolver(path)
+
+
+def _encode(payload):
+    if isinstance(payload, bytes):
+        return payload
+    if not isinstance(payload, _string_types):
+        payload = json.dumps(payload)
+    return payload.encode('utf-8')
+
+
+def _compress(data, encoding):
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED,
+                                  ENCODINGS[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+
+def _headers(call, added):
+    # headers of the call win over the added ones, whatever their case
+    headers = call.get('headers', None)
+    if not added:
+        return headers
+    headers = dict(headers or {})
+    names = set(name.lower() for name in headers)
+    for name, value in added.items():
+        if name.lower() not in names:
+            headers[name] = value
+    return headers
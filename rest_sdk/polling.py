@@ -0,0 +1,125 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Re-sending a call until its expectation holds, configured by the "poll"
+# key of a call:
+#
+#   poll:
+#     timeout: 300       # seconds to keep polling
+#     interval: 2        # seconds before the first retry
+#     backoff: 2         # interval multiplier for every next retry
+#     max_interval: 30   # upper limit of interval
+#     jitter: 0.1        # interval randomized by +/- this fraction
+#     retry_after: true  # wait as long as Retry-After response header says
+
+import random
+import time
+from email.utils import parsedate_tz, mktime_tz
+
+from .exceptions import ExpectationException, \
+    RecoverebleStatusCodeCodeException, WrongTemplateDataException
+
+# failures which are retried, others are raised at once
+RETRIED_EXCEPTIONS = (ExpectationException,
+                      RecoverebleStatusCodeCodeException)
+
+DEFAULTS = {
+    'timeout': 60,
+    'interval': 1,
+    'backoff': 2,
+    'max_interval': 30,
+    'jitter': 0.1,
+    'retry_after': True,
+}
+
+
+class Poll(object):
+    """
+    Delays between attempts of one polled call.
+    """
+
+    def __init__(self, options, clock=time.time):
+        if not isinstance(options, dict):
+            raise WrongTemplateDataException(
+                "poll had to be dict. Type {} not supported. ".format(
+                    type(options)))
+        unknown = set(options) - set(DEFAULTS)
+        if unknown:
+            raise WrongTemplateDataException(
+                'Unknown poll options: {}'.format(', '.join(sorted(unknown))))
+        values = dict(DEFAULTS, **options)
+        try:
+            self.timeout = float(values['timeout'])
+            self.interval = float(values['interval'])
+            self.backoff = float(values['backoff'])
+            self.max_interval = float(values['max_interval'])
+            self.jitter = float(values['jitter'])
+        except (TypeError, ValueError) as e:
+            raise WrongTemplateDataException(
+                'Wrong poll option value: {}'.format(e))
+        self.retry_after = bool(values['retry_after'])
+        self._clock = clock
+        self._deadline = clock() + self.timeout
+        self._next_interval = self.interval
+        self.attempts = 0
+
+    def next_delay(self, exception):
+        """
+        Seconds to wait before the next attempt after the exception,
+        None when the exception has to be raised.
+        """
+        self.attempts += 1
+        if not isinstance(exception, RETRIED_EXCEPTIONS):
+            return None
+        remaining = self._deadline - self._clock()
+        if remaining <= 0:
+            return None
+        delay = self._next_interval
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        retry_after = getattr(exception, 'retry_after', None)
+        if self.retry_after and retry_after is not None:
+            delay = max(delay, retry_after)
+        self._next_interval = min(self._next_interval * self.backoff,
+                                  self.max_interval)
+        # last attempt is made at the deadline
+        return max(0, min(delay, remaining))
+
+
+def retry_after(response):
+    """
+    Seconds from Retry-After header (delay or HTTP date) of the response,
+    None if there is no valid header.
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(0, mktime_tz(parsed) - time.time())
+
+
+def call_poll(call):
+    """
+    Poll of the call, None if the call is sent once.
+    """
+    options = call.get('poll')
+    if options is None:
+        return None
+    return Poll(options)
@@ -0,0 +1,220 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Rate limiting of requests to a host, shared by all executions in the
+# process. rate_limit (node property or per call):
+#
+#   rate_limit:
+#     rate: 10            # requests per second, 0 - unlimited
+#     burst: 20           # requests sent at once after a quiet period,
+#                         # default rate
+#     max_in_flight: 5    # requests waiting for response, 0 - unlimited
+#     retries: 3          # 429 and 503 responses sent again
+#     max_wait: 60        # longest Retry-After waited for
+#
+# A 429 or 503 response stops requests to the host for Retry-After
+# seconds (1 second without the header) and halves its rate, every
+# successful response brings the rate back by a tenth of the configured
+# one. Calls to a host with different rate_limit options have limiters of
+# their own.
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from . import LOGGER_NAME
+from .exceptions import DeadlineExceededException, \
+    WrongTemplateDataException
+
+logger = logging.getLogger(LOGGER_NAME)
+
+THROTTLED = (429, 503)
+DEFAULT_PAUSE = 1
+# lowest rate after 429 responses, part of the configured one
+MIN_RATE_FACTOR = 1 / 16.0
+# seconds between checks of try_acquire callers waiting for a request
+# to finish
+IN_FLIGHT_POLL = 0.05
+# limiters kept, the least recently used are dropped
+MAX_LIMITERS = 1024
+
+DEFAULTS = {
+    'rate': 0,
+    'burst': None,
+    'max_in_flight': 0,
+    'retries': 3,
+    'max_wait': 60,
+}
+
+
+class Options(object):
+
+    def __init__(self, options):
+        if not isinstance(options, dict):
+            raise WrongTemplateDataException(
+                "rate_limit had to be dict. Type {} not supported. ".format(
+                    type(options)))
+        unknown = set(options) - set(DEFAULTS)
+        if unknown:
+            raise WrongTemplateDataException(
+                'Unknown rate_limit options: {}'.format(
+                    ', '.join(sorted(unknown))))
+        values = dict(DEFAULTS, **options)
+        try:
+            self.rate = float(values['rate'] or 0)
+            self.burst = max(float(values['burst'] or self.rate), 1)
+            self.max_in_flight = int(values['max_in_flight'] or 0)
+            self.retries = int(values['retries'] or 0)
+            self.max_wait = float(values['max_wait'])
+        except (TypeError, ValueError) as e:
+            raise WrongTemplateDataException(
+                'Wrong rate_limit option value: {}'.format(e))
+        if min(self.rate, self.max_in_flight, self.retries,
+               self.max_wait) < 0:
+            raise WrongTemplateDataException(
+                'rate_limit options can not be negative')
+
+    def key(self):
+        return (self.rate, self.burst, self.max_in_flight, self.max_wait)
+
+
+class Limiter(object):
+    """
+    Token bucket and in flight limit of a host.
+    """
+
+    def __init__(self, options, clock=time.time):
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._paused_until = 0
+        self.configure(options)
+
+    def configure(self, options):
+        with self._condition:
+            self.rate = options.rate
+            self.burst = options.burst
+            self.max_in_flight = options.max_in_flight
+            self.max_wait = options.max_wait
+            self.current_rate = options.rate
+            self._tokens = options.burst
+            self._updated = self._clock()
+            self._condition.notify_all()
+
+    def acquire(self, deadline=None):
+        """
+        Wait until a request can be sent, returns seconds waited.
+        """
+        started = self._clock()
+        with self._condition:
+            while True:
+                wait = self._acquire(deadline)
+                if wait == 0:
+                    return self._clock() - started
+                self._condition.wait(wait)
+
+    def try_acquire(self, deadline=None):
+        """
+        acquire without blocking, for event loops: 0 when the request can
+        be sent, else seconds to wait before trying again.
+        """
+        with self._condition:
+            wait = self._acquire(deadline)
+            return IN_FLIGHT_POLL if wait is None else wait
+
+    def _acquire(self, deadline):
+        # 0 - acquired, else seconds to wait (None until a request
+        # finishes), cut to the deadline
+        wait = self._wait()
+        if wait == 0:
+            self._in_flight += 1
+            return 0
+        remaining = deadline.remaining() if deadline else None
+        if remaining is not None:
+            if remaining <= 0 or wait is not None and wait > remaining:
+                raise DeadlineExceededException(
+                    'Deadline of {}s exceeded waiting for rate '
+                    'limit'.format(deadline.seconds))
+            if wait is None:
+                wait = remaining
+        return wait
+
+    def _wait(self):
+        # seconds to wait, None until a request finishes, 0 - send now
+        now = self._clock()
+        if self._paused_until > now:
+            return self._paused_until - now
+        if self.max_in_flight and self._in_flight >= self.max_in_flight:
+            return None
+        if not self.current_rate:
+            return 0
+        self._tokens = min(self.burst, self._tokens +
+                           (now - self._updated) * self.current_rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.current_rate
+
+    def release(self, status_code=None, retry_after=None):
+        """
+        Request finished, status_code None when no response came.
+        """
+        with self._condition:
+            self._in_flight = max(self._in_flight - 1, 0)
+            if status_code in THROTTLED:
+                pause = min(retry_after if retry_after is not None else
+                            DEFAULT_PAUSE, self.max_wait)
+                self._paused_until = max(self._paused_until,
+                                         self._clock() + pause)
+                if self.rate:
+                    self.current_rate = max(self.current_rate / 2,
+                                            self.rate * MIN_RATE_FACTOR)
+                logger.info('host throttled, paused for {}s, rate {:.2f}/s'
+                            .format(pause, self.current_rate))
+            elif status_code is not None and status_code < 400 and \
+                    self.current_rate < self.rate:
+                self.current_rate = min(self.rate,
+                                        self.current_rate + self.rate / 10)
+            self._condition.notify_all()
+
+
+_limiters = OrderedDict()
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(host, options):
+    """
+    Limiter of the host (scheme://host:port) and options, None without
+    options.
+    """
+    if not options:
+        return None
+    options = Options(options)
+    key = (host, options.key())
+    with _limiters_lock:
+        limiter = _limiters.pop(key, None)
+        if limiter is None:
+            limiter = Limiter(options)
+        _limiters[key] = limiter
+        while len(_limiters) > MAX_LIMITERS:
+            _limiters.popitem(last=False)
+        return limiter
+
+
+def clear():
+    with _limiters_lock:
+        _limiters.clear()
@@ -0,0 +1,402 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Streaming parsing of responses for calls with "stream_response: true".
+# Only the parts of a response used by response_expectation,
+# response_unexpectation and response_translation are materialized.
+
+import codecs
+import logging
+from collections import OrderedDict
+from decimal import Decimal
+from xml.parsers import expat
+
+from . import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+CHUNK_SIZE = 64 * 1024
+
+_ijson = []
+
+
+def get_ijson():
+    """
+    ijson module, None when it is not installed. Imported with the first
+    streamed JSON response.
+    """
+    if not _ijson:
+        try:
+            import ijson
+        except ImportError:
+            ijson = None
+        _ijson.append(ijson)
+    return _ijson[0]
+
+
+# selector matching a whole subtree
+ALL = True
+
+
+class _Wildcard(object):
+
+    def __repr__(self):
+        return '*'
+
+
+# selector key matching every element of a list
+WILDCARD = _Wildcard()
+
+
+def response_selectors(call):
+    """
+    Compile paths read by the call into a selector tree: dict of
+    key/index/WILDCARD -> selector, ALL for a subtree used as a whole.
+    Returns ALL when the paths can't be determined.
+    """
+    # local import, utility depends on this module
+    from .utility import _check_if_v2
+    selector = {}
+    try:
+        for expectation in (call.get('response_expectation'),
+                            call.get('response_unexpectation')):
+            for path in _expectation_paths(expectation):
+                selector = _merge(selector, path)
+        translation = call.get('response_translation')
+        if translation:
+            if _check_if_v2(translation):
+                for source, _ in translation:
+                    selector = _merge(selector, _v2_path(source))
+            else:
+                selector = _v1_paths(translation, [], selector)
+        pagination = call.get('pagination')
+        if not isinstance(pagination, dict):
+            pagination = {}
+        for key in ('next', 'items'):
+            if pagination.get(key) is not None:
+                selector = _merge(selector, list(pagination[key]))
+        return _normalize(selector)
+    except (TypeError, ValueError, IndexError):
+        return ALL
+
+
+def _expectation_paths(expectation):
+    if not expectation:
+        return []
+    if not isinstance(expectation, list):
+        raise ValueError(expectation)
+    if isinstance(expectation[0], list):
+        return [item[:-1] for item in expectation]
+    return [expectation[:-1]]
+
+
+def _v1_paths(translation, path, selector):
+    if isinstance(translation, list):
+        if translation and not isinstance(translation[0], (list, dict)):
+            return _merge(selector, path)
+        for idx, val in enumerate(translation):
+            selector = _v1_paths(val, path + [idx], selector)
+    elif isinstance(translation, dict):
+        for key, value in translation.items():
+            selector = _v1_paths(value, path + [key], selector)
+    return selector
+
+
+def _v2_path(source):
+    path = []
+    for key in source:
+        if isinstance(key, list):
+            path.extend([WILDCARD, key[0]])
+        else:
+            path.append(key)
+    return path
+
+
+def _merge(selector, path):
+    if selector is ALL or not path:
+        return ALL
+    key = path[0]
+    selector[key] = _merge(selector.get(key, {}), path[1:])
+    return selector
+
+
+def _union(first, second):
+    if first is None:
+        return second
+    if second is None:
+        return first
+    if first is ALL or second is ALL:
+        return ALL
+    result = dict(first)
+    for key, value in second.items():
+        result[key] = _union(result.get(key), value)
+    return result
+
+
+def _normalize(selector):
+    # list elements selected by index also get what the wildcard selects
+    if selector is ALL:
+        return ALL
+    wildcard = selector.get(WILDCARD)
+    for key, value in list(selector.items()):
+        if key is not WILDCARD and isinstance(key, int) and \
+                wildcard is not None:
+            value = _union(value, wildcard)
+        selector[key] = _normalize(value)
+    return selector
+
+
+class _ChunkReader(object):
+    """
+    File like object over an iterator of byte chunks.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def parse_json(response, call):
+    """
+    Parse JSON body of a streamed response materializing only selected
+    parts. Falls back to response.json() when ijson is not installed or
+    the whole document is needed.
+    """
+    selector = response_selectors(call)
+    ijson = get_ijson()
+    if ijson is None or selector is ALL:
+        logger.debug('streaming parser not used, ijson available: {}'.format(
+            ijson is not None))
+        return response.json()
+    try:
+        if not selector:
+            return {}
+        return parse_selected(response.iter_content(CHUNK_SIZE), selector)
+    finally:
+        response.close()
+
+
+def parse_selected(chunks, selector):
+    events = get_ijson().basic_parse(_ChunkReader(chunks))
+    event, value = next(events)
+    return _value(events, event, value, selector)
+
+
+def _value(events, event, value, selector):
+    if event == 'start_map':
+        result = {}
+        for event, value in events:
+            if event == 'end_map':
+                return result
+            key = value
+            child = selector if selector is ALL else selector.get(key)
+            event, value = next(events)
+            if child is None:
+                _skip(events, event)
+            else:
+                result[key] = _value(events, event, value, child)
+    elif event == 'start_array':
+        result = []
+        if selector is ALL or WILDCARD in selector:
+            limit = None
+        else:
+            limit = max([key for key in selector if isinstance(key, int)] or
+                        [-1])
+        index = 0
+        for event, value in events:
+            if event == 'end_array':
+                return result
+            if selector is ALL:
+                child = ALL
+            else:
+                child = selector.get(index, selector.get(WILDCARD))
+            if child is None:
+                _skip(events, event)
+                if limit is None or index <= limit:
+                    # keep indexes of selected elements
+                    result.append(None)
+            else:
+                result.append(_value(events, event, value, child))
+            index += 1
+    elif isinstance(value, Decimal):
+        # same types as json.loads
+        return float(value)
+    else:
+        return value
+
+
+def _skip(events, event):
+    if event not in ('start_map', 'start_array'):
+        return
+    depth = 1
+    for event, _ in events:
+        if event in ('start_map', 'start_array'):
+            depth += 1
+        elif event in ('end_map', 'end_array'):
+            depth -= 1
+            if not depth:
+                return
+
+
+def xml_selectors(selector):
+    """
+    Selector of element names (and @attribute, #text keys) from a
+    response selector. Repeated elements form lists in xmltodict output,
+    list levels are dropped and every occurrence of a selected element is
+    built, which keeps list indexes the same as for the whole document.
+    """
+    if selector is ALL:
+        return ALL
+    result = {}
+    for key, child in selector.items():
+        if key is WILDCARD or isinstance(key, int):
+            result = _union(result, xml_selectors(child))
+        else:
+            result = _union(result, {key: xml_selectors(child)})
+    return result
+
+
+def parse_xml(response, call):
+    """
+    Parse XML body of a streamed response the way xmltodict.parse does,
+    building only the selected elements.
+    """
+    selector = xml_selectors(response_selectors(call))
+    try:
+        if not selector:
+            return {}
+        return parse_selected_xml(response.iter_content(CHUNK_SIZE),
+                                  selector, response.encoding)
+    finally:
+        response.close()
+
+
+def parse_selected_xml(chunks, selector, encoding=None):
+    handler = _SelectiveXmlHandler(selector)
+    if encoding and codecs.lookup(encoding).name != 'utf-8':
+        # like xmltodict.parse(response.text), decode using the encoding
+        # from headers and parse as utf-8
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        chunks = (decoder.decode(chunk).encode('utf-8') for chunk in chunks)
+        parser = expat.ParserCreate('utf-8')
+    elif encoding:
+        parser = expat.ParserCreate('utf-8')
+    else:
+        parser = expat.ParserCreate()
+    parser.ordered_attributes = True
+    parser.buffer_text = True
+    parser.StartElementHandler = handler.start_element
+    parser.EndElementHandler = handler.end_element
+    parser.CharacterDataHandler = handler.characters
+    # same as xmltodict disable_entities
+    parser.DefaultHandler = lambda data: None
+    parser.ExternalEntityRefHandler = lambda *args: 1
+    for chunk in chunks:
+        parser.Parse(chunk, False)
+    parser.Parse(b'', True)
+    return handler.result()
+
+
+class _XmlFrame(object):
+    __slots__ = ('selector', 'item', 'data', 'has_attrs', 'has_children')
+
+    def __init__(self, selector, item=None, has_attrs=False):
+        self.selector = selector
+        self.item = item
+        self.data = []
+        self.has_attrs = has_attrs
+        self.has_children = False
+
+
+class _SelectiveXmlHandler(object):
+    """
+    Subset of xmltodict._DictSAXHandler with default options, elements
+    outside of the selector are only counted, never built.
+    """
+
+    def __init__(self, selector):
+        self.stack = [_XmlFrame(selector)]
+
+    def result(self):
+        return self.stack[0].item or OrderedDict()
+
+    def start_element(self, name, attrs):
+        parent = self.stack[-1]
+        if parent.selector is None:
+            self.stack.append(_XmlFrame(None))
+            return
+        parent.has_children = True
+        selector = ALL if parent.selector is ALL else \
+            parent.selector.get(name)
+        if selector is None:
+            self.stack.append(_XmlFrame(None))
+            return
+        items = [('@' + key, value)
+                 for key, value in zip(attrs[0::2], attrs[1::2])
+                 if selector is ALL or '@' + key in selector]
+        self.stack.append(_XmlFrame(selector, OrderedDict(items) or None,
+                                    bool(attrs)))
+
+    def characters(self, data):
+        frame = self.stack[-1]
+        if frame.selector is None:
+            return
+        if frame.has_children and frame.selector is not ALL and \
+                '#text' not in frame.selector:
+            return
+        frame.data.append(data)
+
+    def end_element(self, name):
+        frame = self.stack.pop()
+        if frame.selector is None:
+            return
+        parent = self.stack[-1]
+        data = ''.join(frame.data).strip() or None if frame.data else None
+        item = frame.item
+        if item is None and (frame.has_attrs or frame.has_children):
+            item = OrderedDict()
+        if item is not None:
+            if data and (frame.selector is ALL or
+                         '#text' in frame.selector):
+                _push_data(item, '#text', data)
+            parent.item = _push_data(parent.item, name, item)
+        else:
+            parent.item = _push_data(parent.item, name, data)
+
+
+def _push_data(item, key, data):
+    if item is None:
+        item = OrderedDict()
+    if key in item:
+        value = item[key]
+        if isinstance(value, list):
+            value.append(data)
+        else:
+            item[key] = [value, data]
+    else:
+        item[key] = data
+    return item
@@ -0,0 +1,223 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import yaml
+
+from .accessors import CallAccessors
+
+try:
+    _string_types = (str, unicode)
+except NameError:
+    _string_types = (str,)
+
+_Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+_environment = None
+
+_JINJA_MARKERS = ('{{', '{%', '{#')
+
+_RESPONSE_KEYS = ('response_expectation', 'response_unexpectation',
+                  'response_translation')
+
+DEFAULT_CACHE_SIZE = 128
+
+
+class _Expression(object):
+    __slots__ = ('source', 'template', 'variables')
+
+    def __init__(self, source):
+        from jinja2 import meta
+        environment = _get_environment()
+        self.source = source
+        self.template = environment.from_string(source)
+        self.variables = frozenset(meta.find_undeclared_variables(
+            environment.parse(source)))
+
+    def render(self, params):
+        return self.template.render(params)
+
+
+class CompiledTemplate(object):
+    """
+    Template parsed once, with jinja expressions of every templated
+    string (values and keys) compiled in place. Rendering a call walks
+    the structure and only evaluates templated leaves, everything else
+    is copied as is, so the caller is free to modify the result.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.digest = _digest(source)
+        self.data = yaml.load(source, Loader=_Loader)
+        self.calls = [_compile(call) for call in self.data['rest_calls']]
+        self._accessors = [
+            CallAccessors(call)
+            if not any(_templated(call.get(key)) for key in _RESPONSE_KEYS)
+            else None
+            for call in self.calls]
+
+    def __len__(self):
+        return len(self.calls)
+
+    def render_call(self, index, params):
+        return _render(self.calls[index], params)
+
+    def variables(self, index):
+        """
+        Names of the params read by jinja expressions of the call.
+        """
+        return _variables(self.calls[index])
+
+    def accessors(self, index):
+        """
+        Accessors of the call shared by all executions, None when they
+        depend on params and have to be compiled from the rendered call.
+        """
+        return self._accessors[index]
+
+
+def _get_environment():
+    # jinja is imported with the first templated string, calls without
+    # expressions don't pay for it
+    global _environment
+    if _environment is None:
+        from jinja2 import Environment
+        # keep_trailing_newline - folded scalars like "payload: >" end with
+        # a new line which has to survive rendering
+        _environment = Environment(keep_trailing_newline=True)
+    return _environment
+
+
+def is_templated(node):
+    return isinstance(node, _Expression)
+
+
+def _compile(node):
+    if isinstance(node, dict):
+        return dict((_compile(key), _compile(value))
+                    for key, value in node.items())
+    if isinstance(node, list):
+        return [_compile(item) for item in node]
+    if isinstance(node, _string_types) and \
+            any(marker in node for marker in _JINJA_MARKERS):
+        return _Expression(node)
+    return node
+
+
+def _render(node, params):
+    if isinstance(node, _Expression):
+        return node.render(params)
+    if isinstance(node, dict):
+        return dict((_render(key, params), _render(value, params))
+                    for key, value in node.items())
+    if isinstance(node, list):
+        return [_render(item, params) for item in node]
+    return node
+
+
+def _templated(node):
+    if isinstance(node, _Expression):
+        return True
+    if isinstance(node, dict):
+        return any(_templated(key) or _templated(value)
+                   for key, value in node.items())
+    if isinstance(node, list):
+        return any(_templated(item) for item in node)
+    return False
+
+
+def _variables(node):
+    if isinstance(node, _Expression):
+        return node.variables
+    names = set()
+    if isinstance(node, dict):
+        for key, value in node.items():
+            names.update(_variables(key))
+            names.update(_variables(value))
+    elif isinstance(node, list):
+        for item in node:
+            names.update(_variables(item))
+    return names
+
+
+class _LRUCache(object):
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key, factory):
+        with self._lock:
+            value = self._items.pop(key, None)
+            if value is not None:
+                self.hits += 1
+                self._items[key] = value
+                return value
+            self.misses += 1
+        value = factory()
+        with self._lock:
+            self._items[key] = value
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': len(self._items), 'maxsize': self.maxsize}
+
+
+_cache = _LRUCache(DEFAULT_CACHE_SIZE)
+
+
+def get_compiled(template):
+    """
+    Return the compiled form of template text. Templates with the same
+    content share one compiled object.
+    """
+    if isinstance(template, CompiledTemplate):
+        return template
+    return _cache.get(_digest(template), lambda: CompiledTemplate(template))
+
+
+def _digest(template):
+    data = template if isinstance(template, bytes) else \
+        template.encode('utf-8')
+    return hashlib.sha1(data).hexdigest()
+
+
+def set_cache_size(maxsize):
+    _cache.maxsize = maxsize
+
+
+def cache_info():
+    return _cache.info()
+
+
+def clear_cache():
+    _cache.clear()
@@ -0,0 +1,78 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# python 3 only helpers of test_aio, kept apart so the python 2 test run
+# can still import test_aio and skip it
+import asyncio
+
+from aiohttp import web
+
+from rest_sdk import aio
+
+
+async def start_server(state, xml):
+
+    async def _get(request):
+        state['gets'] = state.get('gets', 0) + 1
+        return web.json_response({'id': 'abc', 'status': 'active'})
+
+    async def _xml(request):
+        return web.Response(text=xml, content_type='application/xml')
+
+    async def _post(request):
+        state['posted'].append(await request.json())
+        return web.Response(text='done', status=state['post_status'])
+
+    async def _pages(request):
+        offset = int(request.query['offset'])
+        return web.json_response(list(range(offset, min(offset + 2, 5))))
+
+    async def _token(request):
+        state['tokens'] += 1
+        return web.json_response({'access_token': 't{}'.format(
+            state['tokens']), 'expires_in': 3600})
+
+    async def _secure(request):
+        state['authorization'].append(request.headers.get('Authorization'))
+        if request.headers.get('Authorization') != state['accepted']:
+            return web.Response(status=401)
+        return web.json_response({'count': 2})
+
+    async def _throttled(request):
+        state['throttled'] += 1
+        if state['throttled'] == 1:
+            return web.Response(status=429, headers={'Retry-After': '0'})
+        return web.json_response({'count': state['throttled']})
+
+    app = web.Application()
+    app.router.add_get('/get', _get)
+    app.router.add_get('/xml/abc', _xml)
+    app.router.add_post('/post', _post)
+    app.router.add_get('/pages', _pages)
+    app.router.add_post('/token', _token)
+    app.router.add_get('/secure', _secure)
+    app.router.add_get('/throttled', _throttled)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    return runner
+
+
+async def process_many(count, template, request_props, **transport_kwargs):
+    async with aio.AsyncTransport(**transport_kwargs) as transport:
+        return await asyncio.gather(*[
+            aio.process_async({}, template, dict(request_props), transport)
+            for _ in range(count)])
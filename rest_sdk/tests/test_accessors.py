@@ -0,0 +1,110 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import copy
+import json
+import os
+import unittest
+
+from rest_sdk import accessors, utility
+from rest_sdk.exceptions import ExpectationException, \
+    UnExpectationException, WrongTemplateDataException
+
+__location__ = os.path.realpath(
+    os.path.join(os.path.dirname(__file__), '..', '..', 'rest_plugin',
+                 'tests'))
+
+V1_TRANSLATION = {
+    'items': [
+        {'colour': ['owner0', 'colour'], 'name': ['owner0', 'name']},
+        {},
+        {'colour': ['owner2', 'colour'], 'name': ['owner2', 'name']}],
+    'owners': [[], ['owner1', 'id'], ['owner2', 'id']]}
+
+PAGES = {
+    'id': '6857017661',
+    'payload': {
+        'pages': [
+            {'page_name': 'marvin', 'properties': {'color': 'blue'}},
+            {'page_name': 'cool_wool', 'properties': {'color': 'red'}}]}}
+
+
+class TestAccessors(unittest.TestCase):
+
+    def _compare(self, response, translation):
+        expected = {}
+        utility._translate_and_save(response, copy.deepcopy(translation),
+                                    expected)
+        result = {}
+        original = copy.deepcopy(translation)
+        accessors.compile_translation(translation).apply(response, result)
+        self.assertEqual(result, expected)
+        self.assertEqual(translation, original)
+        return result
+
+    def test_v1_same_as_translate_and_save(self):
+        with open(os.path.join(__location__, 'get_response2.json')) as f:
+            response = json.load(f)
+        self._compare(response, V1_TRANSLATION)
+
+    def test_v2_same_as_translate_and_save(self):
+        self._compare(PAGES, [[['id'], ['params', 'id']]])
+        self._compare(PAGES, [[['payload', 'pages', ['page_name']],
+                               ['pages', ['page_name']]]])
+        self.assertEqual(
+            self._compare(PAGES, [[['payload', 'pages', ['properties'],
+                                    'color'], ['colors']]]),
+            {'colors': ['blue', 'red']})
+
+    def test_v2_nested_lists(self):
+        result = {}
+        accessors.compile_translation(
+            [[['a', ['b']], ['out', ['values']]]]).apply(
+            {'a': [{'b': [1, 2]}, {'b': [3]}]}, result)
+        self.assertEqual(result, {'out': [{'values': [1, 2]},
+                                          {'values': [3]}]})
+
+    def test_v2_translations_after_list(self):
+        # _translate_and_save_v2 returned after the first list translation
+        result = {}
+        accessors.compile_translation([
+            [['payload', 'pages', ['page_name']], ['names']],
+            [['id'], ['id']]]).apply(PAGES, result)
+        self.assertEqual(result, {'names': ['marvin', 'cool_wool'],
+                                  'id': '6857017661'})
+
+    def test_v1_missing_key_raises(self):
+        with self.assertRaises(IndexError):
+            accessors.compile_translation(V1_TRANSLATION).apply(
+                {'items': [{'colour': 'a', 'name': 'b'}], 'owners': []}, {})
+
+    def test_expectation(self):
+        expectation = accessors.Expectation([[0, 'status', 'active|ready'],
+                                             [1, 'status', 'activating']])
+        expectation.check([{'status': 'ready'}, {'status': 'activating'}])
+        with self.assertRaises(ExpectationException) as context:
+            expectation.check([{'status': 'ready'}, {'state': 'x'}])
+        self.assertIn('No key or index status', str(context.exception))
+        with self.assertRaises(ExpectationException):
+            expectation.check([{'status': 'failed'}, {'status': 'x'}])
+
+    def test_unexpectation(self):
+        unexpectation = accessors.Expectation(['error', 'code', '.*'], True)
+        unexpectation.check({'status': 'ok'})
+        with self.assertRaises(UnExpectationException):
+            unexpectation.check({'error': {'code': 500}})
+
+    def test_expectation_has_to_be_list(self):
+        with self.assertRaises(WrongTemplateDataException):
+            accessors.Expectation({'status': 'ok'})
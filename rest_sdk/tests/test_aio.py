@@ -0,0 +1,196 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import os
+import sys
+import time
+import unittest
+
+from rest_sdk.exceptions import (ExpectationException,
+                                 RecoverebleStatusCodeCodeException)
+
+try:
+    import aiohttp  # noqa
+    _skip = sys.version_info < (3, 5)
+except ImportError:
+    _skip = True
+
+__location__ = os.path.realpath(
+    os.path.join(os.path.dirname(__file__), '..', '..', 'rest_plugin',
+                 'tests'))
+
+TEMPLATE = '''
+rest_calls:
+  - path: /get
+    method: GET
+    response_translation:
+      id: [item_id]
+    response_expectation: [status, active]
+  - path: /xml/{{item_id}}
+    method: GET
+    response_format: xml
+    response_translation:
+      response:
+        result:
+          system:
+            vm-uuid: [UUID]
+  - path: /post
+    method: POST
+    payload:
+      id: "{{item_id}}"
+    response_format: raw
+    recoverable_codes: [477]
+'''
+
+
+@unittest.skipIf(_skip, 'requires python 3.5+ and aiohttp')
+class TestProcessAsync(unittest.TestCase):
+
+    def setUp(self):
+        import asyncio
+        from rest_sdk.tests import aio_helpers
+        self.loop = asyncio.new_event_loop()
+        from rest_sdk import auth, cache, hosts, ratelimit
+        auth.clear()
+        cache.clear()
+        ratelimit.clear()
+        hosts.get_default_selector().reset()
+        self.state = {'posted': [], 'post_status': 200, 'tokens': 0,
+                      'authorization': [], 'accepted': 'Bearer t2',
+                      'throttled': 0}
+        with open(os.path.join(__location__, 'get_response5.xml')) as f:
+            xml = f.read()
+        self.runner = self.loop.run_until_complete(
+            aio_helpers.start_server(self.state, xml))
+        self.port = self.runner.addresses[0][1]
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.runner.cleanup())
+        self.loop.close()
+
+    def _process(self, hosts, transport=None, template=TEMPLATE,
+                 **request_props):
+        from rest_sdk import aio
+        request_props.update({'hosts': hosts, 'port': self.port,
+                              'ssl': False, 'verify': True})
+        return self.loop.run_until_complete(aio.process_async(
+            {}, template, request_props, transport))
+
+    def test_process_async(self):
+        self.assertEqual(self._process(['127.0.0.1']),
+                         {'item_id': 'abc',
+                          'UUID': '111111111111111111111111111111'})
+        self.assertEqual(self.state['posted'], [{'id': 'abc'}])
+
+    def test_failover_to_next_host(self):
+        self.assertEqual(self._process(['127.0.0.2', '127.0.0.1'])['item_id'],
+                         'abc')
+
+    def test_recoverable_code(self):
+        self.state['post_status'] = 477
+        with self.assertRaises(RecoverebleStatusCodeCodeException):
+            self._process(['127.0.0.1'])
+
+    def test_expectation(self):
+        with self.assertRaises(ExpectationException):
+            self._process(['127.0.0.1'], template=TEMPLATE.replace(
+                '[status, active]', '[status, failed]'))
+
+    def test_pagination(self):
+        self.assertEqual(self._process(['127.0.0.1'], template='''
+rest_calls:
+  - path: /pages
+    method: GET
+    pagination:
+      type: offset
+      limit: 2
+      items: []
+      save_as: numbers
+'''), {'numbers': [0, 1, 2, 3, 4]})
+
+    def test_foreach(self):
+        self.assertEqual(self._process(['127.0.0.1'], template='''
+rest_calls:
+  - path: /pages?offset={{item}}
+    method: GET
+    foreach:
+      items: [0, 4]
+      concurrency: 2
+      save_as: pages
+    response_translation:
+      - [[], [numbers]]
+'''), {'pages': [{'numbers': [0, 1]}, {'numbers': [4]}]})
+
+    def test_shared_transport_many_executions(self):
+        from rest_sdk.tests import aio_helpers
+        results = self.loop.run_until_complete(aio_helpers.process_many(
+            20, TEMPLATE, {'host': '127.0.0.1', 'port': self.port,
+                           'ssl': False, 'verify': True},
+            limit=5, max_in_flight=3))
+        self.assertEqual(len(results), 20)
+        self.assertEqual(len(self.state['posted']), 20)
+
+    def test_auth_renewed_on_401(self):
+        template = '''
+rest_calls:
+  - path: /secure
+    method: GET
+    response_translation:
+      - [[count], [count]]
+'''
+        auth = {'type': 'client_credentials',
+                'token_url': 'http://127.0.0.1:{}/token'.format(self.port),
+                'client_id': 'plugin', 'client_secret': 'secret'}
+        self.assertEqual(self._process(['127.0.0.1'], template=template,
+                                       auth=auth), {'count': 2})
+        self.assertEqual(self.state['tokens'], 2)
+        self.assertEqual(self.state['authorization'],
+                         ['Bearer t1', 'Bearer t2'])
+
+    def test_rate_limit(self):
+        template = '''
+rest_calls:
+  - path: /throttled
+    method: GET
+    foreach:
+      items: [0, 1, 2, 3, 4]
+      concurrency: 5
+      save_as: counts
+    response_translation:
+      - [[count], [count]]
+'''
+        started = time.time()
+        result = self._process(['127.0.0.1'], template=template,
+                               rate_limit={'rate': 20, 'burst': 1})
+        # 429 answered to the first request was sent again, six requests
+        # at 20 per second
+        self.assertGreaterEqual(time.time() - started, 0.2)
+        self.assertEqual(self.state['throttled'], 6)
+        self.assertEqual(sorted(item['count'] for item in result['counts']),
+                         [2, 3, 4, 5, 6])
+
+    def test_cache(self):
+        template = '''
+rest_calls:
+  - path: /get
+    method: GET
+    cache:
+      ttl: 300
+    response_translation:
+      id: [item_id]
+'''
+        for _ in range(3):
+            self.assertEqual(self._process(['127.0.0.1'], template=template),
+                             {'item_id': 'abc'})
+        self.assertEqual(self.state['gets'], 1)
@@ -0,0 +1,162 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import unittest
+
+import requests
+import requests_mock
+
+from rest_sdk import auth, hosts, utility
+from rest_sdk.exceptions import WrongTemplateDataException
+from rest_sdk.transport import build_response
+
+CLIENT_CREDENTIALS = {'type': 'client_credentials',
+                      'token_url': 'http://idp.test/token',
+                      'client_id': 'plugin', 'client_secret': 'secret'}
+
+REQUEST_PROPS = {'host': 'test.test', 'port': -1, 'ssl': False,
+                 'verify': True, 'auth': CLIENT_CREDENTIALS}
+
+TEMPLATE = '''
+rest_calls:
+  - path: /vms
+    method: GET
+    response_translation:
+      - [[count], [count]]
+'''
+
+
+def _tokens():
+    issued = []
+
+    def _token(request, context):
+        issued.append(request.text)
+        return {'access_token': 't{}'.format(len(issued)),
+                'expires_in': 3600}
+    return issued, _token
+
+
+class TestAuth(unittest.TestCase):
+
+    def setUp(self):
+        hosts.get_default_selector().reset()
+        auth.clear()
+
+    def test_token_shared_by_instances(self):
+        issued, token = _tokens()
+        with requests_mock.mock() as m:
+            m.post('http://idp.test/token', json=token)
+            m.get('http://test.test:80/vms', json={'count': 2})
+            for _ in range(3):
+                utility.process({}, TEMPLATE, dict(REQUEST_PROPS))
+        self.assertEqual(len(issued), 1)
+        self.assertIn('grant_type=client_credentials', issued[0])
+        self.assertEqual(m.request_history[-1].headers['Authorization'],
+                         'Bearer t1')
+
+    def test_renewed_once_on_401(self):
+        issued, token = _tokens()
+        with requests_mock.mock() as m:
+            m.post('http://idp.test/token', json=token)
+            m.get('http://test.test:80/vms', [
+                {'status_code': 401}, {'json': {'count': 2}},
+                {'status_code': 401}, {'status_code': 401}])
+            self.assertEqual(utility.process({}, TEMPLATE,
+                                             dict(REQUEST_PROPS)),
+                             {'count': 2})
+            self.assertEqual(len(issued), 2)
+            self.assertEqual(m.request_history[-1].headers['Authorization'],
+                             'Bearer t2')
+            with self.assertRaises(requests.exceptions.HTTPError):
+                utility.process({}, TEMPLATE, dict(REQUEST_PROPS))
+        self.assertEqual(len(issued), 3)
+
+    def test_login_and_call_override(self):
+        with requests_mock.mock() as m:
+            m.post('http://test.test/login', json={'data': {'key': 'k'}})
+            m.get('http://test.test:80/vms', json={'count': 2})
+            m.get('http://test.test:80/public', json={'count': 0})
+            utility.process({}, TEMPLATE + '''
+  - path: /public
+    method: GET
+    auth: {}
+''', dict(REQUEST_PROPS, auth={
+                'type': 'login', 'token_url': 'http://test.test/login',
+                'username': 'admin', 'password': 'pass',
+                'token_path': ['data', 'key'], 'scheme': '',
+                'header': 'X-Auth-Token'}))
+        login, vms, public = m.request_history
+        self.assertEqual(login.headers['Authorization'],
+                         'Basic YWRtaW46cGFzcw==')
+        self.assertEqual(vms.headers['X-Auth-Token'], 'k')
+        self.assertNotIn('X-Auth-Token', public.headers)
+
+    def test_refreshed_before_expiry(self):
+        now = [0]
+        authenticator = auth.Authenticator(
+            dict(CLIENT_CREDENTIALS, refresh_before=60),
+            clock=lambda: now[0])
+        issued = []
+
+        def _fetch(method, url, **kwargs):
+            issued.append(url)
+            return build_response(200, 'OK', {}, b'{"access_token": "t", '
+                                  b'"expires_in": 600}', url)
+        authenticator.token(_fetch)
+        now[0] = 539
+        authenticator.token(_fetch)
+        self.assertEqual(len(issued), 1)
+        now[0] = 540
+        authenticator.token(_fetch)
+        self.assertEqual(len(issued), 2)
+
+    def test_cached_headers(self):
+        now = [0]
+        authenticator = auth.Authenticator(CLIENT_CREDENTIALS,
+                                           clock=lambda: now[0])
+
+        def _fetch(method, url, **kwargs):
+            return build_response(200, 'OK', {}, b'{"access_token": "t", '
+                                  b'"expires_in": 600}', url)
+        self.assertIsNone(authenticator.cached_headers())
+        authenticator.token(_fetch)
+        self.assertEqual(authenticator.cached_headers(),
+                         {'Authorization': 'Bearer t'})
+        now[0] = 600
+        self.assertIsNone(authenticator.cached_headers())
+        self.assertEqual(auth.Authenticator({'type': 'bearer',
+                                             'token': 'abc'})
+                         .cached_headers(), {'Authorization': 'Bearer abc'})
+
+    def test_authenticators_bounded(self):
+        for i in range(auth.MAX_AUTHENTICATORS + 10):
+            auth.get_authenticator({'type': 'bearer', 'token': str(i)})
+        self.assertEqual(len(auth._authenticators), auth.MAX_AUTHENTICATORS)
+        self.assertIs(auth.get_authenticator({'type': 'bearer',
+                                              'token': '1000'}),
+                      auth.get_authenticator({'type': 'bearer',
+                                              'token': '1000'}))
+
+    def test_redacted(self):
+        call = {'path': '/', 'auth': CLIENT_CREDENTIALS}
+        self.assertEqual(auth.redacted(call)['auth']['client_secret'],
+                         '***')
+        self.assertEqual(call['auth']['client_secret'], 'secret')
+
+    def test_wrong_options(self):
+        with self.assertRaises(WrongTemplateDataException):
+            auth.Authenticator({'type': 'client_credentials'})
+        with self.assertRaises(WrongTemplateDataException):
+            auth.Authenticator({'type': 'kerberos'})
+        self.assertIsNone(auth.get_authenticator({}))
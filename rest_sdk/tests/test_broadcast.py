@@ -0,0 +1,148 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import json
+import time
+import unittest
+
+import requests
+import requests_mock
+
+from rest_sdk import broadcast, hosts, timeouts, utility
+from rest_sdk.exceptions import DeadlineExceededException, \
+    ExpectationException, WrongTemplateDataException
+from rest_sdk.transport import build_response
+
+HOSTS = ['a.test', 'b.test', 'c.test']
+
+REQUEST_PROPS = {'hosts': HOSTS, 'port': -1, 'ssl': False, 'verify': True,
+                 'host_mode': 'failover'}
+
+TEMPLATE = '''
+rest_calls:
+  - path: /config
+    method: PUT
+    payload:
+      level: debug
+    host_mode: broadcast
+    broadcast:
+      quorum: {quorum}
+      save_as: by_host
+      errors_as: failed
+    response_expectation:
+      - [applied, 'yes']
+    response_translation:
+      - [[version], [version]]
+'''
+
+
+def _slow(version, delay=0.2):
+    def _answer(request, context):
+        time.sleep(delay)
+        return {'applied': 'yes', 'version': version}
+    return _answer
+
+
+class _Transport(object):
+    # requests_mock sends one request at a time
+
+    def request(self, method, url, **kwargs):
+        time.sleep(0.2)
+        version = HOSTS.index(url.split('/')[2].split(':')[0])
+        return build_response(200, 'OK', {}, json.dumps(
+            {'applied': 'yes', 'version': version}).encode('utf-8'), url)
+
+
+class TestBroadcast(unittest.TestCase):
+
+    def setUp(self):
+        hosts.get_default_selector().reset()
+
+    def test_all_hosts_at_once(self):
+        started = time.time()
+        result = utility.process({}, TEMPLATE.format(quorum='all'),
+                                 dict(REQUEST_PROPS), _Transport())
+        self.assertLess(time.time() - started, 0.5)
+        self.assertEqual(result, {'by_host': {'a.test': {'version': 0},
+                                              'b.test': {'version': 1},
+                                              'c.test': {'version': 2}},
+                                  'failed': {}})
+
+    def test_quorum(self):
+        with requests_mock.mock() as m:
+            m.put('http://a.test:80/config', json=_slow(0, 0))
+            m.put('http://b.test:80/config', json={'applied': 'no'})
+            m.put('http://c.test:80/config', json=_slow(2, 0.1))
+            result = utility.process(
+                {}, TEMPLATE.format(quorum='majority'), dict(REQUEST_PROPS))
+        self.assertEqual(result['by_host'], {'a.test': {'version': 0},
+                                             'c.test': {'version': 2}})
+        self.assertEqual(list(result['failed']), ['b.test'])
+
+    def test_pending_at_deadline(self):
+        def _push(host):
+            if host == 'c.test':
+                time.sleep(2)
+            return {'version': host}
+
+        options = broadcast.Broadcast(
+            {'quorum': 2, 'save_as': 'by_host', 'errors_as': 'failed'},
+            HOSTS)
+        results, errors, pending = broadcast.run(
+            options, _push, timeouts.Deadline(0.3))
+        self.assertEqual(pending, ['c.test'])
+        self.assertEqual(
+            broadcast.Result(options, results, errors, pending).result(),
+            {'by_host': {'a.test': {'version': 'a.test'},
+                         'b.test': {'version': 'b.test'}},
+             'failed': {'c.test': broadcast.PENDING}})
+        with self.assertRaises(DeadlineExceededException):
+            broadcast.run(broadcast.Broadcast({}, HOSTS), _push,
+                          timeouts.Deadline(0.3))
+
+    def test_quorum_not_reached(self):
+        with requests_mock.mock() as m:
+            m.put('http://a.test:80/config', json=_slow(0, 0))
+            m.put('http://b.test:80/config', json={'applied': 'no'})
+            m.put('http://c.test:80/config', status_code=500)
+            with self.assertRaises(ExpectationException):
+                utility.process({}, TEMPLATE.format(quorum=2),
+                                dict(REQUEST_PROPS))
+            with self.assertRaises(requests.exceptions.HTTPError):
+                utility.process({}, TEMPLATE.format(quorum=1).replace(
+                    "host_mode: broadcast\n", "host_mode: broadcast\n"
+                    "    hosts: [c.test]\n"), dict(REQUEST_PROPS))
+
+    def test_merged_without_save_as(self):
+        with requests_mock.mock() as m:
+            for host in HOSTS:
+                m.get('http://{}:80/peers'.format(host),
+                      json={'peers': [host]})
+            result = utility.process({}, '''
+rest_calls:
+  - path: /peers
+    method: GET
+    response_translation:
+      - [[peers], [peers]]
+''', dict(REQUEST_PROPS, host_mode='broadcast'))
+        self.assertEqual(result, {'peers': HOSTS})
+
+    def test_wrong_options(self):
+        with self.assertRaises(WrongTemplateDataException):
+            broadcast.is_broadcast({'host_mode': 'all'})
+        with self.assertRaises(WrongTemplateDataException):
+            broadcast.Broadcast({'quorum': 4}, HOSTS)
+        with self.assertRaises(WrongTemplateDataException):
+            broadcast.Broadcast({'wait': 1}, HOSTS)
+        self.assertEqual(broadcast.Broadcast({}, HOSTS).quorum, 3)
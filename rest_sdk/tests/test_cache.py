@@ -0,0 +1,129 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import shutil
+import tempfile
+import unittest
+
+import requests_mock
+from mock import patch
+
+from rest_sdk import cache, hosts, utility
+from rest_sdk.exceptions import WrongTemplateDataException
+
+REQUEST_PROPS = {'host': 'test.test', 'port': -1, 'ssl': False,
+                 'verify': True}
+
+TEMPLATE = '''
+rest_calls:
+  - path: /catalog
+    method: GET
+    cache:
+      ttl: {ttl}
+    response_translation:
+      - [[[name]], [names]]
+'''
+
+CATALOG = [{'name': 'small'}, {'name': 'large'}]
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        hosts.get_default_selector().reset()
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        cache.clear()
+        shutil.rmtree(self.directory)
+
+    def _process(self, ttl, request_props=REQUEST_PROPS):
+        return utility.process({}, TEMPLATE.format(ttl=ttl),
+                               dict(request_props))
+
+    def test_fresh_entry_not_requested(self):
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/catalog', json=CATALOG)
+            first = self._process(60)
+            first['names'].append('changed by caller')
+            with patch('rest_sdk.utility._parse_and_check_response') as parse:
+                second = self._process(60)
+        self.assertEqual(second, {'names': ['small', 'large']})
+        self.assertEqual(m.call_count, 1)
+        self.assertFalse(parse.called)
+        self.assertEqual(cache.get_cache().statistics()['hits'], 1)
+
+    def test_revalidation(self):
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/catalog', [
+                {'json': CATALOG, 'headers': {'ETag': '"v1"'}},
+                {'status_code': 304, 'headers': {'ETag': '"v1"'}},
+                {'json': CATALOG[:1], 'headers': {'ETag': '"v2"'}}])
+            self._process(0)
+            with patch('rest_sdk.utility._parse_and_check_response') as parse:
+                self.assertEqual(self._process(0),
+                                 {'names': ['small', 'large']})
+            self.assertFalse(parse.called)
+            self.assertEqual(m.request_history[1].headers['If-None-Match'],
+                             '"v1"')
+            self.assertEqual(self._process(0), {'names': ['small']})
+            self.assertEqual(m.request_history[2].headers['If-None-Match'],
+                             '"v1"')
+        statistics = cache.get_cache().statistics()
+        self.assertEqual((statistics['misses'], statistics['revalidated']),
+                         (2, 1))
+
+    def test_no_store(self):
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/catalog', json=CATALOG,
+                  headers={'Cache-Control': 'no-store'})
+            self._process(60)
+            self._process(60)
+        self.assertEqual(m.call_count, 2)
+
+    def test_disk_shared_by_processes(self):
+        props = dict(REQUEST_PROPS, cache_dir=self.directory)
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/catalog', json=CATALOG,
+                  headers={'Last-Modified': 'Mon, 01 Jan 2018 00:00:00 GMT'})
+            self._process(60, props)
+            # new agent process
+            cache.get_cache(self.directory).clear_memory()
+            self.assertEqual(self._process(60, props),
+                             {'names': ['small', 'large']})
+        self.assertEqual(m.call_count, 1)
+
+    def test_memory_eviction(self):
+        responses = cache.ResponseCache(memory_size=10)
+        for key in ('a', 'b', 'c'):
+            responses.put(key, cache.Entry('http://x/', 200, {}, b'12345'))
+        self.assertIsNone(responses.get('a'))
+        self.assertIsNotNone(responses.get('c'))
+        self.assertEqual(responses.statistics()['memory_bytes'], 10)
+
+    def test_disk_eviction(self):
+        responses = cache.ResponseCache(self.directory, memory_size=0,
+                                        disk_size=10)
+        for key in ('a', 'b', 'c'):
+            responses.put(key, cache.Entry('http://x/', 200, {}, b'12345'))
+        self.assertIsNone(responses.get('a'))
+        self.assertEqual(responses.get('c').body, b'12345')
+
+    def test_wrong_options(self):
+        with self.assertRaises(WrongTemplateDataException):
+            cache.Policy({}, dict(REQUEST_PROPS, method='POST', path='/'))
+        with self.assertRaises(WrongTemplateDataException):
+            cache.Policy({'ttl': 'x'}, dict(REQUEST_PROPS, method='GET',
+                                            path='/'))
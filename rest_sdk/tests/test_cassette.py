@@ -0,0 +1,95 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+import requests_mock
+
+from rest_sdk import cassette, hosts, transport, utility
+from rest_sdk.exceptions import CassetteMissException
+
+TEMPLATE = '''
+rest_calls:
+  - path: /items
+    method: GET
+    response_translation: [[[items, [name]], [names]]]
+  - path: /file
+    method: GET
+    response_format: raw
+  - path: /status
+    method: GET
+    stream_response: true
+    response_translation: [[[state], [state]]]
+'''
+
+REQUEST_PROPS = {'hosts': ['down.test', 'test.test'], 'port': -1,
+                 'ssl': False, 'verify': True}
+
+
+class TestCassette(unittest.TestCase):
+
+    def setUp(self):
+        hosts.get_default_selector().reset()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cassette.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _record(self):
+        recorder = cassette.RecordingTransport(self.path,
+                                               transport.SessionPool())
+        with requests_mock.mock() as m:
+            m.get('http://down.test:80/items',
+                  exc=requests.exceptions.ConnectionError)
+            m.get('http://test.test:80/items',
+                  json={'items': [{'name': 'a'}, {'name': 'b'}]})
+            m.get('http://down.test:80/file',
+                  exc=requests.exceptions.ConnectionError)
+            m.get('http://test.test:80/file', content=b'raw data')
+            m.get('http://down.test:80/status',
+                  exc=requests.exceptions.ConnectionError)
+            m.get('http://test.test:80/status', json={'state': 'ready'},
+                  headers={'X-Test': '1'})
+            result = utility.process({}, TEMPLATE, dict(REQUEST_PROPS),
+                                     recorder)
+        recorder.save()
+        return result
+
+    def test_replay_same_as_recorded(self):
+        recorded = self._record()
+        self.assertEqual(recorded, {'names': ['a', 'b'], 'state': 'ready'})
+        replay = cassette.ReplayTransport(self.path)
+        for _ in range(2):
+            self.assertEqual(
+                utility.process({}, TEMPLATE, dict(REQUEST_PROPS), replay),
+                recorded)
+        response = replay.request('GET', 'http://test.test:80/status')
+        self.assertEqual(response.headers['x-test'], '1')
+        self.assertEqual(
+            replay.request('GET', 'http://test.test:80/file').content,
+            b'raw data')
+
+    def test_replay_miss(self):
+        self._record()
+        replay = cassette.ReplayTransport(self.path, repeat=False)
+        with self.assertRaises(CassetteMissException):
+            replay.request('POST', 'http://test.test:80/items')
+        replay.request('GET', 'http://test.test:80/items')
+        with self.assertRaises(CassetteMissException):
+            replay.request('GET', 'http://test.test:80/items')
@@ -0,0 +1,166 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import requests_mock
+
+from rest_sdk import download, hosts, parallel, utility
+from rest_sdk.exceptions import ExpectationException, \
+    WrongTemplateDataException
+from rest_sdk.transport import build_response
+
+BODY = os.urandom(3 * 1024 * 1024 + 17)
+
+TEMPLATE = '''
+rest_calls:
+  - path: /images/disk
+    method: GET
+    response_format: raw
+    download:
+      path: images/disk.qcow2
+      chunk_size: 65536
+    response_expectation:
+      - [digest, "{digest}"]
+    response_translation:
+      - [[path], [image, path]]
+      - [[size], [image, size]]
+      - [[digest], [image, sha256]]
+      - [[headers, Content-Type], [image, type]]
+'''
+
+
+class _Transport(object):
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.stream = None
+
+    def request(self, method, url, **kwargs):
+        self.stream = kwargs.get('stream')
+        response = build_response(
+            200, 'OK', {'Content-Type': 'application/octet-stream'}, BODY,
+            url)
+        if self.fail:
+            def _broken(chunk_size):
+                yield BODY[:chunk_size]
+                raise IOError('connection reset')
+            response.iter_content = _broken
+        return response
+
+
+class TestDownload(unittest.TestCase):
+
+    def setUp(self):
+        hosts.get_default_selector().reset()
+        self.directory = tempfile.mkdtemp()
+        self.request_props = {'host': 'test.test', 'port': -1, 'ssl': False,
+                              'verify': True, 'download_dir': self.directory}
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_body_saved_with_digest(self):
+        digest = hashlib.sha256(BODY).hexdigest()
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/images/disk', content=BODY,
+                  headers={'Content-Type': 'application/octet-stream'})
+            result = utility.process(
+                {}, TEMPLATE.format(digest=digest), self.request_props)
+        path = os.path.join(self.directory, 'images', 'disk.qcow2')
+        self.assertEqual(result, {'image': {
+            'path': path, 'size': len(BODY), 'sha256': digest,
+            'type': 'application/octet-stream'}})
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), BODY)
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['disk.qcow2'])
+
+    def test_streamed(self):
+        transport = _Transport()
+        utility.process({}, TEMPLATE.format(
+            digest=hashlib.sha256(BODY).hexdigest()), self.request_props,
+            transport)
+        self.assertTrue(transport.stream)
+
+    def test_digest_expectation(self):
+        path = os.path.join(self.directory, 'images', 'disk.qcow2')
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(b'previous')
+        with self.assertRaises(ExpectationException):
+            utility.process({}, TEMPLATE.format(digest='0' * 64),
+                            self.request_props, _Transport())
+        # the rejected body doesn't replace the file
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['disk.qcow2'])
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'previous')
+
+    def test_partial_file_removed(self):
+        with self.assertRaises(IOError):
+            utility.process({}, TEMPLATE.format(digest='0' * 64),
+                            self.request_props, _Transport(fail=True))
+        self.assertEqual(os.listdir(os.path.join(self.directory, 'images')),
+                         [])
+
+    def test_parallel_downloads_to_one_path(self):
+        call = dict(self.request_props, response_format='raw')
+        bodies = [b'a' * 100000, b'b' * 100000]
+        results, errors = [None, None], []
+
+        def _save(index):
+            response = build_response(200, 'OK', {}, bodies[index], 'url')
+
+            def _chunks(chunk_size):
+                for start in range(0, len(bodies[index]), chunk_size):
+                    time.sleep(0.001)
+                    yield bodies[index][start:start + chunk_size]
+            response.iter_content = _chunks
+            try:
+                results[index] = download.Download(
+                    {'path': 'disk', 'chunk_size': 4096}, call).save(
+                        response)
+            except Exception as e:
+                errors.append(e)
+        # with the context of the caller, like threads of the plugin
+        threads = [threading.Thread(target=parallel.bind_context(_save),
+                                    args=(i,))
+                   for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(errors, [])
+        for body, result in zip(bodies, results):
+            self.assertEqual(result['digest'],
+                             hashlib.sha256(body).hexdigest())
+        with open(os.path.join(self.directory, 'disk'), 'rb') as f:
+            self.assertIn(f.read(), bodies)
+        self.assertEqual(os.listdir(self.directory), ['disk'])
+
+    def test_wrong_options(self):
+        call = {'response_format': 'raw'}
+        with self.assertRaises(WrongTemplateDataException):
+            download.Download({'path': 'a'}, {'response_format': 'json'})
+        with self.assertRaises(WrongTemplateDataException):
+            download.Download({'path': 'a', 'digest': 'crc'}, call)
+        with self.assertRaises(WrongTemplateDataException):
+            download.Download({'path': 'a', 'mode': 644}, call)
+        with self.assertRaises(WrongTemplateDataException):
+            download.Download({}, call)
@@ -0,0 +1,142 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import unittest
+
+import requests
+import requests_mock
+
+from rest_sdk import foreach, hosts, metrics, parallel, template, utility
+from rest_sdk.exceptions import WrongTemplateDataException
+
+REQUEST_PROPS = {'host': 'test.test', 'port': -1, 'ssl': False,
+                 'verify': True}
+
+TEMPLATE = '''
+rest_calls:
+  - path: /items
+    method: GET
+    response_translation:
+      - [[[id]], [ids]]
+  - path: /items/{{id}}
+    method: GET
+    foreach:
+      path: [ids]
+      as: id
+      concurrency: 4
+      save_as: details
+      on_error: {on_error}
+      errors_as: failed
+    response_translation:
+      - [[name], [name]]
+      - [[tags], [tags]]
+'''
+
+
+class TestForeach(unittest.TestCase):
+
+    def setUp(self):
+        hosts.get_default_selector().reset()
+
+    def _mock(self, m, failing=()):
+        m.get('http://test.test:80/items',
+              json=[{'id': index} for index in range(10)])
+        for index in range(10):
+            if index in failing:
+                m.get('http://test.test:80/items/{}'.format(index),
+                      status_code=500)
+            else:
+                m.get('http://test.test:80/items/{}'.format(index),
+                      json={'name': 'item{}'.format(index),
+                            'tags': [index]})
+
+    def test_results_in_order(self):
+        collector = metrics.Collector()
+        with requests_mock.mock() as m:
+            self._mock(m)
+            result = utility.process(
+                {}, TEMPLATE.replace('{on_error}', 'fail'),
+                dict(REQUEST_PROPS), metrics_sink=collector)
+        self.assertEqual(result['details'], [
+            {'name': 'item{}'.format(index), 'tags': [index]}
+            for index in range(10)])
+        self.assertEqual(result['failed'], [])
+        self.assertEqual(m.call_count, 11)
+        self.assertEqual(len(collector.calls[1].hosts), 10)
+
+    def test_merged_without_save_as(self):
+        with requests_mock.mock() as m:
+            self._mock(m)
+            result = utility.process({}, '''
+rest_calls:
+  - path: /items/{{item}}
+    method: GET
+    foreach:
+      items: [1, 2, 3]
+    response_translation:
+      - [[tags], [tags]]
+''', dict(REQUEST_PROPS))
+        self.assertEqual(result, {'tags': [1, 2, 3]})
+
+    def test_continue(self):
+        with requests_mock.mock() as m:
+            self._mock(m, failing=(3, 7))
+            result = utility.process(
+                {}, TEMPLATE.replace('{on_error}', 'continue'),
+                dict(REQUEST_PROPS))
+        self.assertIsNone(result['details'][3])
+        self.assertIsNone(result['details'][7])
+        self.assertEqual(result['details'][4]['name'], 'item4')
+        self.assertEqual([error['index'] for error in result['failed']],
+                         [3, 7])
+
+    def test_max_failures(self):
+        with requests_mock.mock() as m:
+            self._mock(m, failing=(3, 7))
+            with self.assertRaises(requests.exceptions.HTTPError):
+                utility.process({}, TEMPLATE.replace(
+                    '{on_error}', 'continue\n      max_failures: 1'),
+                    dict(REQUEST_PROPS))
+
+    def test_fail_stops_other_elements(self):
+        with requests_mock.mock() as m:
+            self._mock(m, failing=(1,))
+            with self.assertRaises(requests.exceptions.HTTPError):
+                utility.process({}, TEMPLATE.replace(
+                    '{on_error}', 'fail').replace('concurrency: 4',
+                                                  'concurrency: 1'),
+                    dict(REQUEST_PROPS))
+        # listing and the first two elements
+        self.assertEqual(m.call_count, 3)
+
+    def test_wrong_options(self):
+        with self.assertRaises(WrongTemplateDataException):
+            foreach.Foreach(0, {'path': ['missing']}, {})
+        with self.assertRaises(WrongTemplateDataException):
+            foreach.Foreach(0, {'path': ['name']}, {'name': 'x'})
+        with self.assertRaises(WrongTemplateDataException):
+            foreach.Foreach(0, {'items': [], 'on_error': 'ignore'}, {})
+        with self.assertRaises(WrongTemplateDataException):
+            foreach.Foreach(0, {}, {})
+
+    def test_dependencies(self):
+        compiled = template.CompiledTemplate(
+            TEMPLATE.replace('{on_error}', 'fail') + '''
+  - path: /other
+    method: GET
+  - path: /items/{{details[0].name}}
+    method: GET
+''')
+        self.assertEqual(parallel.call_dependencies(compiled),
+                         [set(), set([0]), set(), set([1])])
@@ -0,0 +1,127 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import threading
+import time
+import unittest
+
+import requests
+
+from rest_sdk import hosts, utility
+from rest_sdk.exceptions import WrongTemplateDataException
+from rest_sdk.transport import build_response
+
+
+class _Transport(object):
+    # hosts from down fail, others answer after delay seconds
+
+    def __init__(self, down=(), delays=None):
+        self.down = down
+        self.delays = delays or {}
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        host = url.split('/')[2].split(':')[0]
+        with self._lock:
+            self.sent.append(host)
+        if host in self.down:
+            raise requests.exceptions.ConnectionError(host)
+        time.sleep(self.delays.get(host, 0))
+        return build_response(200, 'OK', {}, host.encode('utf-8'), url)
+
+
+def _call(hosts_list, host_selection=None, method='GET'):
+    return {'hosts': hosts_list, 'port': 80, 'ssl': False, 'verify': True,
+            'path': '/', 'method': method, 'response_format': 'raw',
+            'host_selection': host_selection}
+
+
+class TestHostSelector(unittest.TestCase):
+
+    def setUp(self):
+        self.now = [0]
+        self.selector = hosts.HostSelector(failure_threshold=2,
+                                           reset_timeout=30,
+                                           clock=lambda: self.now[0])
+
+    def test_circuit_breaker(self):
+        self.selector.failure('a')
+        self.assertEqual(self.selector.order(['a', 'b']), ['a', 'b'])
+        self.selector.failure('a')
+        self.assertEqual(self.selector.state('a'), 'open')
+        self.assertEqual(self.selector.order(['a', 'b']), ['b', 'a'])
+        self.now[0] = 30
+        self.assertEqual(self.selector.state('a'), 'half-open')
+        # only one call probes the host
+        self.assertEqual(self.selector.order(['a', 'b']), ['a', 'b'])
+        self.assertEqual(self.selector.order(['a', 'b']), ['b', 'a'])
+        self.selector.failure('a')
+        self.assertEqual(self.selector.state('a'), 'open')
+        self.now[0] = 60
+        self.assertEqual(self.selector.order(['a', 'b']), ['a', 'b'])
+        self.selector.success('a')
+        self.assertEqual(self.selector.state('a'), 'closed')
+
+    def test_last_known_good_first(self):
+        self.selector.success('b')
+        self.now[0] = 1
+        self.selector.success('c')
+        self.assertEqual(self.selector.order(['a', 'b', 'c']),
+                         ['c', 'a', 'b'])
+
+    def test_latency(self):
+        self.selector.success('a', 0.5)
+        self.selector.success('b', 0.1)
+        self.assertEqual(self.selector.order(['a', 'b', 'c'], hosts.LATENCY),
+                         ['c', 'b', 'a'])
+
+    def test_wrong_strategy(self):
+        with self.assertRaises(WrongTemplateDataException):
+            self.selector.order(['a'], 'random')
+
+
+class TestSendRequest(unittest.TestCase):
+
+    def test_dead_host_skipped(self):
+        selector = hosts.HostSelector()
+        transport = _Transport(down=('a',))
+        for _ in range(3):
+            response = utility._send_request(_call(['a', 'b']), transport,
+                                             selector)
+            self.assertEqual(response.content, b'b')
+        self.assertEqual(transport.sent, ['a', 'b', 'b', 'b'])
+
+    def test_race(self):
+        selector = hosts.HostSelector()
+        transport = _Transport(delays={'a': 0.5})
+        response = utility._send_request(_call(['a', 'b'], hosts.RACE),
+                                         transport, selector)
+        self.assertEqual(response.content, b'b')
+        self.assertEqual(sorted(transport.sent), ['a', 'b'])
+
+    def test_race_not_used_for_unsafe_methods(self):
+        transport = _Transport(down=('a',))
+        response = utility._send_request(
+            _call(['a', 'b', 'c'], hosts.RACE, 'POST'), transport,
+            hosts.HostSelector())
+        self.assertEqual(response.content, b'b')
+        self.assertEqual(transport.sent, ['a', 'b'])
+
+    def test_race_all_down(self):
+        transport = _Transport(down=('a', 'b', 'c'))
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            utility._send_request(_call(['a', 'b', 'c'], hosts.RACE),
+                                  transport, hosts.HostSelector())
+        self.assertEqual(sorted(transport.sent), ['a', 'b', 'c'])
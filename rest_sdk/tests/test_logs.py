@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import logging
+import unittest
+
+import requests_mock
+
+from rest_sdk import LOGGER_NAME, hosts, logs, utility
+from rest_sdk.exceptions import WrongTemplateDataException
+from rest_sdk.transport import build_response
+
+REQUEST_PROPS = {'host': 'test.test', 'port': -1, 'ssl': False,
+                 'verify': True}
+
+
+class _Records(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self, logging.DEBUG)
+        self.records = []
+        self.messages = []
+
+    def emit(self, record):
+        self.records.append(record)
+        self.messages.append(record.getMessage())
+
+
+class TestLogs(unittest.TestCase):
+
+    def setUp(self):
+        hosts.get_default_selector().reset()
+        self.handler = _Records()
+        self.logger = logging.getLogger(LOGGER_NAME)
+        self.level = self.logger.level
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.logger.setLevel(self.level)
+
+    def test_body_cut_to_max_length(self):
+        response = build_response(200, 'OK', {}, b'x' * 1000000,
+                                  'http://test.test/')
+        message = str(logs.Message(logs.Options({'max_length': 100}),
+                                   'text:{} status:{}', logs.Body(response),
+                                   200))
+        self.assertEqual(message, 'text:' + 'x' * 100 +
+                         '...[truncated, 1000000 bytes] status:200')
+        self.assertEqual(logs.text(b'x' * 10, limit=100), 'x' * 10)
+
+    def test_structure_cut_to_max_length(self):
+        value = {'items': list(range(1000000))}
+        self.assertEqual(logs.text(value, limit=20),
+                         "{'items': [0, 1, 2, ...[truncated]")
+
+    def test_redacted(self):
+        call = {'headers': {'Authorization': 'Bearer t', 'X-Tenant': 'a'},
+                'payload': {'user': {'name': 'admin', 'password': 'p'}}}
+        text = logs.text(call, logs.Options({'redact': ['x-tenant']}))
+        self.assertIn("'Authorization': '***'", text)
+        self.assertIn("'X-Tenant': '***'", text)
+        self.assertIn("'password': '***'", text)
+        self.assertIn("'name': 'admin'", text)
+
+    def test_process_logs(self):
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/vms',
+                  content=u'{"name": "zażółć"}'.encode('utf-8'),
+                  headers={'Content-Type': 'application/json; '
+                                           'charset=utf-8'})
+            utility.process({}, '''
+rest_calls:
+  - path: /vms
+    method: GET
+    headers:
+      X-Api-Key: secret-key
+    response_translation:
+      - [[name], [name]]
+''', dict(REQUEST_PROPS, logging={'max_length': 10000}))
+        text = u'\n'.join(logs._decode(message)
+                          for message in self.handler.messages)
+        self.assertIn(u'zażółć', text)
+        self.assertNotIn('secret-key', text)
+        summary = [record.rest_call for record in self.handler.records
+                   if hasattr(record, 'rest_call')]
+        self.assertEqual(len(summary), 1)
+        self.assertEqual((summary[0]['path'], summary[0]['status_code']),
+                         ('/vms', 200))
+
+    def test_wrong_options(self):
+        with self.assertRaises(WrongTemplateDataException):
+            logs.Options({'max_length': 'long'})
+        with self.assertRaises(WrongTemplateDataException):
+            logs.Options({'redact': 'Authorization'})
+        with self.assertRaises(WrongTemplateDataException):
+            logs.Options({'level': 'debug'})
@@ -0,0 +1,126 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import threading
+import unittest
+from wsgiref.simple_server import make_server, WSGIRequestHandler
+
+import requests
+import requests_mock
+from mock import patch
+
+from rest_sdk import hosts, metrics, transport, utility
+from rest_sdk.exceptions import ExpectationException
+
+TEMPLATE = '''
+rest_calls:
+  - path: /items
+    method: POST
+    payload: {name: a}
+    response_translation: [[[id], [id]]]
+  - path: /items/{{id}}
+    method: GET
+    response_expectation: [state, ready]
+    poll: {interval: 0, jitter: 0}
+'''
+
+
+def _application(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'application/json')])
+    return [b'{}']
+
+
+class _QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        # order of hosts depends on failures in other tests
+        hosts.get_default_selector().reset()
+
+    @patch('rest_sdk.utility.time.sleep')
+    def test_process_metrics(self, _):
+        collector = metrics.Collector()
+        with requests_mock.mock() as m:
+            m.post('http://down.test:80/items',
+                   exc=requests.exceptions.ConnectionError)
+            m.post('http://test.test:80/items', json={'id': 'abc'})
+            m.get('http://test.test:80/items/abc', [
+                {'json': {'state': 'pending'}},
+                {'json': {'state': 'ready'}}])
+            utility.process({}, TEMPLATE, {
+                'hosts': ['down.test', 'test.test'], 'port': -1,
+                'ssl': False, 'verify': True},
+                transport=transport.SessionPool(), metrics_sink=collector)
+        first, second = collector.calls
+        self.assertEqual(first.hosts, ['down.test', 'test.test'])
+        self.assertEqual(first.failovers, 1)
+        self.assertEqual(first.bytes_sent, len(b'{"name": "a"}'))
+        self.assertEqual(first.bytes_received, len(b'{"id": "abc"}'))
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue({'render', 'ttfb', 'download', 'parse',
+                         'translate'} <= set(first.phases))
+        self.assertEqual(second.retries, 1)
+        # down.test is skipped after the first failure
+        self.assertNotIn('down.test', second.hosts)
+        self.assertEqual(second.path, '/items/abc')
+        summary = collector.summary()
+        self.assertEqual((summary['calls'], summary['errors'],
+                          summary['failovers'], summary['retries']),
+                         (2, 0, 1, 1))
+
+    def test_failed_call_metrics(self):
+        collector = metrics.Collector()
+        metrics.register_sink(collector)
+        try:
+            with requests_mock.mock() as m:
+                m.get('http://test.test:80/status', json={'state': 'x'})
+                with self.assertRaises(ExpectationException):
+                    utility.process({}, '''
+rest_calls:
+  - path: /status
+    method: GET
+    response_expectation: [state, ready]
+''', {'host': 'test.test', 'port': -1, 'ssl': False, 'verify': True})
+        finally:
+            metrics.unregister_sink(collector)
+        self.assertEqual(collector.calls[0].error, 'ExpectationException')
+        self.assertEqual(collector.summary()['errors'], 1)
+
+    def test_connect_time(self):
+        server = make_server('127.0.0.1', 0, _application,
+                             handler_class=_QuietHandler)
+        # handle_request gives up when the request never arrives
+        server.timeout = 10
+        thread = threading.Thread(target=server.handle_request)
+        thread.daemon = True
+        thread.start()
+        call_metrics = metrics.CallMetrics(0)
+        pool = transport.SessionPool()
+        try:
+            with metrics.activate(call_metrics):
+                pool.request(
+                    'GET', 'http://127.0.0.1:{}/'.format(server.server_port),
+                    timeout=10)
+        finally:
+            pool.close()
+            thread.join(15)
+            server.server_close()
+        self.assertFalse(thread.is_alive(), 'server thread did not finish')
+        self.assertIn('connect', call_metrics.phases)
+        self.assertNotIn('tls', call_metrics.phases)
@@ -0,0 +1,152 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import unittest
+
+import requests_mock
+
+from rest_sdk import hosts, pagination, parallel, template, utility
+from rest_sdk.exceptions import ExpectationException, \
+    WrongTemplateDataException
+
+REQUEST_PROPS = {'host': 'test.test', 'port': -1, 'ssl': False,
+                 'verify': True}
+
+
+class TestPagination(unittest.TestCase):
+
+    def setUp(self):
+        hosts.get_default_selector().reset()
+
+    def test_link(self):
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/users', json={'users': [1, 2],
+                                                     'total': 3},
+                  headers={'Link': '</users?page=2>; rel="next"'})
+            m.get('http://test.test:80/users?page=2',
+                  json={'users': [3], 'total': 3},
+                  headers={'Link': '</users>; rel="first"'})
+            result = utility.process({}, '''
+rest_calls:
+  - path: /users
+    method: GET
+    pagination:
+      type: link
+    response_translation:
+      - [[users], [users]]
+      - [[total], [total]]
+''', dict(REQUEST_PROPS))
+        self.assertEqual(result, {'users': [1, 2, 3], 'total': 3})
+        self.assertEqual(m.call_count, 2)
+
+    def test_next_cursor_and_url(self):
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/items?kind=a',
+                  json={'data': [{'id': 1}], 'meta': {'next': 'c2'}})
+            m.get('http://test.test:80/items?kind=a&cursor=c2',
+                  json={'data': [{'id': 2}],
+                        'meta': {'next': 'http://test.test/items?p=3'}})
+            m.get('http://test.test:80/items?p=3',
+                  json={'data': [{'id': 3}], 'meta': {'next': None}})
+            result = utility.process({}, '''
+rest_calls:
+  - path: /items?kind=a
+    method: GET
+    pagination:
+      type: next
+      next: [meta, next]
+      items: [data]
+      save_as: items
+      prefetch: 1
+''', dict(REQUEST_PROPS))
+        self.assertEqual(result, {'items': [{'id': 1}, {'id': 2},
+                                            {'id': 3}]})
+
+    def test_offset(self):
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/vms?limit=2&offset=0',
+                  json=[{'name': 'a'}, {'name': 'b'}])
+            m.get('http://test.test:80/vms?limit=2&offset=2',
+                  json=[{'name': 'c'}])
+            result = utility.process({}, '''
+rest_calls:
+  - path: /vms
+    method: GET
+    pagination:
+      type: offset
+      limit: 2
+      items: []
+    response_translation:
+      - [[[name]], [names]]
+''', dict(REQUEST_PROPS))
+        self.assertEqual(result, {'names': ['a', 'b', 'c']})
+        self.assertEqual(m.call_count, 2)
+
+    def test_max_pages(self):
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/loop', json={'items': [1]},
+                  headers={'Link': '</loop>; rel="next"'})
+            result = utility.process({}, '''
+rest_calls:
+  - path: /loop
+    method: GET
+    pagination:
+      items: [items]
+      save_as: all
+      max_pages: 3
+      prefetch: 2
+''', dict(REQUEST_PROPS))
+        self.assertEqual(result, {'all': [1, 1, 1]})
+        self.assertEqual(m.call_count, 3)
+
+    def test_expectation_checked_on_every_page(self):
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/users', json={'ok': 'yes'},
+                  headers={'Link': '</users?page=2>; rel="next"'})
+            m.get('http://test.test:80/users?page=2', json={'ok': 'no'})
+            for prefetch in (0, 1):
+                with self.assertRaises(ExpectationException):
+                    utility.process({}, '''
+rest_calls:
+  - path: /users
+    method: GET
+    pagination:
+      prefetch: {}
+    response_expectation:
+      - [ok, 'yes']
+'''.format(prefetch), dict(REQUEST_PROPS))
+
+    def test_wrong_options(self):
+        with self.assertRaises(WrongTemplateDataException):
+            pagination.Pagination({'type': 'pages'})
+        with self.assertRaises(WrongTemplateDataException):
+            pagination.Pagination({'type': 'next'})
+        with self.assertRaises(WrongTemplateDataException):
+            pagination.Pagination({'save_as': 'x'})
+        with self.assertRaises(WrongTemplateDataException):
+            pagination.Pagination({'size': 1})
+
+    def test_save_as_dependency(self):
+        compiled = template.CompiledTemplate('''
+rest_calls:
+  - path: /users
+    method: GET
+    pagination:
+      items: [users]
+      save_as: users
+  - path: /users/{{users[0]}}
+    method: GET
+''')
+        self.assertEqual(parallel.call_dependencies(compiled),
+                         [set(), set([0])])
@@ -0,0 +1,152 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import threading
+import unittest
+
+import requests_mock
+
+from rest_sdk import parallel, template, utility
+from rest_sdk.exceptions import ExpectationException
+
+TEMPLATE = '''
+rest_calls:
+  - path: /first
+    method: GET
+    response_translation:
+      id: [first_id]
+  - path: /second
+    method: GET
+    response_translation: [[[id], [second_id]]]
+  - path: /items/{{first_id}}
+    method: GET
+    response_translation:
+      id: [third_id]
+  - path: /update/{{USER}}
+    method: PUT
+    response_format: raw
+  - path: /fifth
+    method: GET
+'''
+
+
+class TestParallel(unittest.TestCase):
+
+    def test_call_dependencies(self):
+        self.assertEqual(
+            parallel.call_dependencies(template.get_compiled(TEMPLATE)),
+            [set(), set(), set([0]), set([0, 1, 2]), set([3])])
+
+    def test_translation_writes_templated_key(self):
+        compiled = template.get_compiled(
+            'rest_calls:\n'
+            '  - response_translation:\n'
+            '      id: ["{{key}}"]\n')
+        self.assertIsNone(parallel.call_writes(compiled.calls[0]))
+
+    def test_execute_commits_in_order(self):
+        committed = []
+        release = threading.Event()
+
+        def _run(index):
+            # first call finishes last
+            if index == 0:
+                release.wait(5)
+            else:
+                release.set()
+            return index * 10
+
+        parallel.execute([set(), set(), set()], 3, lambda index: index,
+                         _run, lambda index, job, result:
+                         committed.append((index, result)))
+        self.assertEqual(committed, [(0, 0), (1, 10), (2, 20)])
+
+    def test_execute_raises_first_failure_in_order(self):
+        committed = []
+
+        def _run(index):
+            if index in (1, 2):
+                raise ValueError(index)
+            return index
+
+        with self.assertRaises(ValueError) as context:
+            parallel.execute([set(), set(), set(), set()], 4,
+                             lambda index: index, _run,
+                             lambda index, job, result:
+                             committed.append(index))
+        self.assertEqual(context.exception.args, (1,))
+        self.assertEqual(committed, [0])
+
+    def test_execute_from_start(self):
+        committed = []
+        parallel.execute([set(), {0}, {0, 1}], 2, lambda index: index,
+                         lambda index: index,
+                         lambda index, job, result: committed.append(index),
+                         start=1)
+        self.assertEqual(committed, [1, 2])
+
+    def test_execute_from_start_keeps_window(self):
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def _prepare(index):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            return index
+
+        def _commit(index, job, result):
+            with lock:
+                in_flight[0] -= 1
+
+        # one worker, at most 2 calls prepared and not committed
+        parallel.execute([set()] * 30, 1, _prepare, lambda index: index,
+                         _commit, start=10)
+        self.assertEqual(in_flight, [0, 2])
+
+    def test_process_parallel_same_as_sequential(self):
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/first', json={'id': 'a1'})
+            m.get('http://test.test:80/second', json={'id': 'b2'})
+            m.get('http://test.test:80/items/a1', json={'id': 'c3'})
+            m.put('http://test.test:80/update/user', text='ok')
+            m.get('http://test.test:80/fifth', text='{}')
+            request_props = {'host': 'test.test', 'port': -1, 'ssl': False,
+                             'verify': True}
+            sequential = utility.process({'USER': 'user'}, TEMPLATE,
+                                         dict(request_props))
+            request_props['max_parallel_calls'] = 4
+            self.assertEqual(
+                utility.process({'USER': 'user'}, TEMPLATE, request_props),
+                sequential)
+        self.assertEqual(sequential, {'first_id': 'a1', 'second_id': 'b2',
+                                      'third_id': 'c3'})
+
+    def test_process_parallel_stops_before_unsafe_call(self):
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/first', json={'id': 'a1'})
+            m.get('http://test.test:80/second', json={'id': 'b2'})
+            m.get('http://test.test:80/items/a1', json={'id': 'c3'})
+            update = m.put('http://test.test:80/update/user', text='ok')
+            broken = template.get_compiled(
+                TEMPLATE.replace('method: GET\n    response_translation:\n'
+                                 '      id: [third_id]',
+                                 'method: GET\n    response_expectation:'
+                                 ' [id, "xx"]'))
+            with self.assertRaises(ExpectationException):
+                utility.process({'USER': 'user'}, broken,
+                                {'host': 'test.test', 'port': -1,
+                                 'ssl': False, 'verify': True,
+                                 'max_parallel_calls': 4})
+            self.assertFalse(update.called)
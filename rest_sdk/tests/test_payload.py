@@ -0,0 +1,203 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import zlib
+
+from rest_sdk import hosts, payload, utility
+from rest_sdk.exceptions import WrongTemplateDataException
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+ITEMS = [{'id': i, 'name': 'item-{}'.format(i)} for i in range(20000)]
+
+
+class _EchoHandler(BaseHTTPRequestHandler):
+    # answers with what arrived: body decoded by Content-Encoding
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        chunked = self.headers.get('Transfer-Encoding') == 'chunked'
+        if chunked:
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+                if not size:
+                    break
+            body = b''.join(chunks)
+        else:
+            body = self.rfile.read(int(self.headers['Content-Length']))
+        encoding = self.headers.get('Content-Encoding')
+        if encoding:
+            body = zlib.decompress(body, payload.ENCODINGS[encoding])
+        answer = json.dumps({
+            'chunked': chunked,
+            'encoding': encoding,
+            'content_type': self.headers.get('Content-Type'),
+            'items': json.loads(body.decode('utf-8'))}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(answer)))
+        # keep-alive connections of the shared pool would block shutdown
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(answer)
+
+    def log_message(self, *args):
+        pass
+
+
+def _template(call):
+    return '''
+rest_calls:
+  - path: /items
+    method: POST
+{}
+    response_translation:
+      - [[chunked], [chunked]]
+      - [[encoding], [encoding]]
+      - [[content_type], [content_type]]
+      - [[items], [items]]
+'''.format(call)
+
+
+class TestPayload(unittest.TestCase):
+
+    def setUp(self):
+        hosts.get_default_selector().reset()
+        self.server = HTTPServer(('127.0.0.1', 0), _EchoHandler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.request_props = {'host': '127.0.0.1',
+                              'port': self.server.server_address[1],
+                              'ssl': False, 'verify': True}
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'items.json')
+        with open(self.path, 'w') as f:
+            json.dump(ITEMS, f)
+
+    def tearDown(self):
+        payload.set_resource_resolver(None)
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def test_file_streamed_compressed(self):
+        for encoding in ('gzip', 'deflate'):
+            result = utility.process({'path': self.path}, _template('''
+    payload_file:
+      path: "{{path}}"
+      chunk_size: 4096
+      content_type: application/json
+    payload_encoding: %s''' % encoding), self.request_props)
+            self.assertEqual(result, {'chunked': True, 'encoding': encoding,
+                                      'content_type': 'application/json',
+                                      'items': ITEMS})
+
+    def test_blueprint_resource(self):
+        copies = []
+
+        def _resolver(path):
+            # a copy, like ctx.download_resource
+            copies.append(os.path.join(self.directory,
+                                       'copy-{}'.format(len(copies))))
+            shutil.copy(os.path.join(self.directory, path), copies[-1])
+            return copies[-1]
+
+        payload.set_resource_resolver(_resolver)
+        result = utility.process({}, _template('''
+    payload_file:
+      path: items.json
+    pagination:
+      type: offset
+      limit: 1
+      items: [items]
+      max_pages: 3'''), self.request_props)
+        self.assertEqual(result['items'], ITEMS * 3)
+        self.assertTrue(result['chunked'])
+        # resolved once for all pages, the copy removed
+        self.assertEqual(len(copies), 1)
+        self.assertFalse(os.path.exists(copies[0]))
+
+    def test_json_text(self):
+        result = utility.process({'items': ITEMS}, _template('''
+    payload_format: json_text
+    payload: "{{ items | tojson }}"
+    payload_encoding: gzip'''), self.request_props)
+        self.assertEqual(result, {'chunked': False, 'encoding': 'gzip',
+                                  'content_type': 'application/json',
+                                  'items': ITEMS})
+
+    def test_json_compressed(self):
+        result = utility.process({}, _template('''
+    payload: [{id: 1}]
+    payload_encoding: deflate'''), self.request_props)
+        self.assertEqual(result['items'], [{'id': 1}])
+        self.assertEqual(result['encoding'], 'deflate')
+
+    def test_request_body(self):
+        call = {'payload': {'id': 1}}
+        self.assertEqual(payload.request_body(call),
+                         (None, {'id': 1}, None))
+        call = {'payload': 'a=1', 'payload_format': 'raw',
+                'headers': {'X-Id': '1'}}
+        self.assertEqual(payload.request_body(call),
+                         ('a=1', None, {'X-Id': '1'}))
+        call = {'payload': '[1]', 'payload_format': 'json_text',
+                'headers': {'content-type': 'application/vnd.api+json'}}
+        self.assertEqual(payload.request_body(call), (
+            b'[1]', None, {'content-type': 'application/vnd.api+json'}))
+
+    def test_form_compressed(self):
+        data, _, headers = payload.request_body({
+            'payload': {'name': 'vm', 'tags': ['a', 'b']},
+            'payload_format': 'raw', 'payload_encoding': 'gzip'})
+        self.assertEqual(headers, {'Content-Type': payload.FORM,
+                                   'Content-Encoding': 'gzip'})
+        self.assertEqual(
+            sorted(zlib.decompress(data, payload.ENCODINGS['gzip'])
+                   .split(b'&')),
+            [b'name=vm', b'tags=a', b'tags=b'])
+
+    def test_file_sent_again(self):
+        body = payload.Body({'path': self.path, 'chunk_size': 1000}, 'gzip')
+        first = b''.join(body)
+        self.assertEqual(body.read_all(), first)
+        self.assertEqual(body.sent, len(first))
+        self.assertEqual(json.loads(zlib.decompress(
+            first, payload.ENCODINGS['gzip']).decode('utf-8')), ITEMS)
+
+    def test_wrong_options(self):
+        with self.assertRaises(WrongTemplateDataException):
+            payload.request_body({'payload': {}, 'payload_encoding': 'br'})
+        with self.assertRaises(WrongTemplateDataException):
+            payload.request_body({'payload': {},
+                                  'payload_file': {'path': self.path}})
+        with self.assertRaises(WrongTemplateDataException):
+            payload.Body({'path': self.path, 'mode': 'r'})
+        with self.assertRaises(WrongTemplateDataException):
+            payload.Body({'path': self.path, 'chunk_size': 0})
+        with self.assertRaises(WrongTemplateDataException):
+            payload.Body({'path': os.path.join(self.directory, 'missing')})
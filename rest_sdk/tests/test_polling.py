@@ -0,0 +1,93 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import unittest
+
+import requests_mock
+from mock import patch
+
+from rest_sdk import polling, utility
+from rest_sdk.exceptions import ExpectationException, \
+    UnExpectationException, WrongTemplateDataException
+
+REQUEST_PROPS = {'host': 'test.test', 'port': -1, 'ssl': False,
+                 'verify': True}
+
+TEMPLATE = '''
+rest_calls:
+  - path: /status
+    method: GET
+    response_expectation: [state, ready]
+    response_translation: [[[state], [state]]]
+    poll:
+      timeout: 10
+      interval: 1
+      jitter: 0
+'''
+
+
+class TestPoll(unittest.TestCase):
+
+    def test_backoff(self):
+        now = [0]
+        poll = polling.Poll({'timeout': 10, 'interval': 1, 'backoff': 2,
+                             'max_interval': 3, 'jitter': 0},
+                            clock=lambda: now[0])
+        delays = []
+        while True:
+            delay = poll.next_delay(ExpectationException())
+            if delay is None:
+                break
+            delays.append(delay)
+            now[0] += delay
+        self.assertEqual(delays, [1, 2, 3, 3, 1])
+
+    def test_retry_after_and_not_retried_exceptions(self):
+        poll = polling.Poll({'interval': 1, 'jitter': 0})
+        exception = ExpectationException()
+        exception.retry_after = 5
+        self.assertEqual(poll.next_delay(exception), 5)
+        self.assertIsNone(poll.next_delay(UnExpectationException()))
+
+    def test_wrong_options(self):
+        with self.assertRaises(WrongTemplateDataException):
+            polling.Poll({'timeuot': 10})
+        with self.assertRaises(WrongTemplateDataException):
+            polling.Poll({'interval': 'fast'})
+
+    @patch('rest_sdk.utility.time.sleep')
+    def test_process_polls_until_expectation_holds(self, sleep):
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/status', [
+                {'json': {'state': 'pending'},
+                 'headers': {'Retry-After': '3'}},
+                {'json': {'state': 'pending'}},
+                {'json': {'state': 'ready'}}])
+            self.assertEqual(
+                utility.process({}, TEMPLATE, REQUEST_PROPS),
+                {'state': 'ready'})
+            self.assertEqual(m.call_count, 3)
+        self.assertEqual([args[0] for args, _ in sleep.call_args_list],
+                         [3, 2])
+
+    @patch('rest_sdk.utility.time.sleep')
+    def test_process_raises_after_timeout(self, sleep):
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/status', json={'state': 'pending'})
+            with self.assertRaises(ExpectationException):
+                utility.process({}, TEMPLATE.replace('timeout: 10',
+                                                     'timeout: 0'),
+                                REQUEST_PROPS)
+            self.assertEqual(m.call_count, 1)
+        self.assertFalse(sleep.called)
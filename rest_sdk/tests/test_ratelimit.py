@@ -0,0 +1,145 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import threading
+import time
+import unittest
+
+import requests_mock
+
+from rest_sdk import hosts, ratelimit, timeouts, utility
+from rest_sdk.exceptions import DeadlineExceededException, \
+    RecoverebleStatusCodeCodeException, WrongTemplateDataException
+from rest_sdk.transport import build_response
+
+REQUEST_PROPS = {'host': 'test.test', 'port': -1, 'ssl': False,
+                 'verify': True}
+
+TEMPLATE = '''
+rest_calls:
+  - path: /vms
+    method: GET
+    recoverable_codes: [429]
+    response_translation:
+      - [[count], [count]]
+'''
+
+
+class _Transport(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def request(self, method, url, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+        return build_response(200, 'OK', {}, b'{}', url)
+
+
+class TestRateLimit(unittest.TestCase):
+
+    def setUp(self):
+        hosts.get_default_selector().reset()
+        ratelimit.clear()
+
+    def test_rate(self):
+        limiter = ratelimit.Limiter(ratelimit.Options({'rate': 20}))
+        started = time.time()
+        for _ in range(25):
+            limiter.acquire()
+            limiter.release(200)
+        # 20 from the bucket, then one every 50ms
+        self.assertGreater(time.time() - started, 0.2)
+
+    def test_max_in_flight(self):
+        transport = _Transport()
+        utility.process({}, '''
+rest_calls:
+  - path: /vms/{{item}}
+    method: GET
+    foreach:
+      items: [1, 2, 3, 4, 5, 6]
+      concurrency: 6
+''', dict(REQUEST_PROPS, rate_limit={'max_in_flight': 2}), transport)
+        self.assertEqual(transport.max_in_flight, 2)
+
+    def test_throttled_response_sent_again(self):
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/vms', [
+                {'status_code': 429, 'headers': {'Retry-After': '0'}},
+                {'status_code': 503, 'headers': {'Retry-After': '0'}},
+                {'json': {'count': 1}}])
+            self.assertEqual(utility.process(
+                {}, TEMPLATE, dict(REQUEST_PROPS, rate_limit={'rate': 100})),
+                {'count': 1})
+        self.assertEqual(m.call_count, 3)
+        limiter = ratelimit.get_limiter('http://test.test:80',
+                                        {'rate': 100})
+        # halved twice, then brought back by a tenth
+        self.assertAlmostEqual(limiter.current_rate, 35)
+
+    def test_retries_exhausted(self):
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/vms', status_code=429,
+                  headers={'Retry-After': '0'})
+            with self.assertRaises(RecoverebleStatusCodeCodeException):
+                utility.process({}, TEMPLATE, dict(
+                    REQUEST_PROPS, rate_limit={'retries': 2}))
+        self.assertEqual(m.call_count, 3)
+
+    def test_retry_after_longer_than_max_wait(self):
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/vms', status_code=429,
+                  headers={'Retry-After': '120'})
+            with self.assertRaises(RecoverebleStatusCodeCodeException):
+                utility.process({}, TEMPLATE, dict(
+                    REQUEST_PROPS, rate_limit={'max_wait': 0.1}))
+        self.assertEqual(m.call_count, 1)
+
+    def test_limiter_per_options(self):
+        first = ratelimit.get_limiter('http://test.test:80', {'rate': 1})
+        first.acquire()
+        second = ratelimit.get_limiter('http://test.test:80', {'rate': 2})
+        self.assertIsNot(first, second)
+        # not reset to full burst by the other options
+        self.assertIs(ratelimit.get_limiter('http://test.test:80',
+                                            {'rate': 1}), first)
+        self.assertLess(first._tokens, 1)
+
+    def test_limiters_bounded(self):
+        for i in range(ratelimit.MAX_LIMITERS + 10):
+            ratelimit.get_limiter('http://test{}.test:80'.format(i),
+                                  {'rate': 1})
+        self.assertEqual(len(ratelimit._limiters), ratelimit.MAX_LIMITERS)
+
+    def test_deadline(self):
+        limiter = ratelimit.Limiter(ratelimit.Options({'max_in_flight': 1}))
+        limiter.acquire()
+        with self.assertRaises(DeadlineExceededException):
+            limiter.acquire(timeouts.Deadline(0.05))
+
+    def test_wrong_options(self):
+        with self.assertRaises(WrongTemplateDataException):
+            ratelimit.Options({'rate': 'fast'})
+        with self.assertRaises(WrongTemplateDataException):
+            ratelimit.Options({'rate': -1})
+        with self.assertRaises(WrongTemplateDataException):
+            ratelimit.Options({'per_host': 1})
+        self.assertIsNone(ratelimit.get_limiter('http://x:80', {}))
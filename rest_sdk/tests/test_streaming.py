@@ -0,0 +1,195 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import copy
+import json
+import os
+import unittest
+
+import requests_mock
+import xmltodict
+
+from rest_sdk import streaming, utility
+from rest_sdk.streaming import ALL, WILDCARD
+
+__location__ = os.path.realpath(
+    os.path.join(os.path.dirname(__file__), '..', '..', 'rest_plugin',
+                 'tests'))
+
+DOCUMENT = {
+    'id': '6857017661',
+    'big': ['x' * 100] * 100,
+    'payload': {
+        'pages': [
+            {'page_name': 'marvin', 'action': 'edited',
+             'properties': {'color': 'blue', 'size': 1.5}},
+            {'page_name': 'cool_wool', 'action': 'saved',
+             'properties': {'color': 'red', 'size': 2}},
+            {'page_name': 'third', 'action': 'saved',
+             'properties': {'color': 'green', 'size': 3}}]}}
+
+
+def _chunks(document, size=7):
+    data = json.dumps(document).encode('utf-8')
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestSelectors(unittest.TestCase):
+
+    def test_response_selectors(self):
+        self.assertEqual(
+            streaming.response_selectors({
+                'response_expectation': [['payload', 'pages', 0, 'action',
+                                          'edited']],
+                'response_translation': [
+                    [['id'], ['id']],
+                    [['payload', 'pages', ['properties'], 'color'],
+                     ['colors']]]}),
+            {'id': ALL,
+             'payload': {'pages': {
+                 0: {'action': ALL, 'properties': {'color': ALL}},
+                 WILDCARD: {'properties': {'color': ALL}}}}})
+
+    def test_response_selectors_v1(self):
+        self.assertEqual(
+            streaming.response_selectors({
+                'response_unexpectation': ['id', 'failed'],
+                'response_translation': {
+                    'payload': {'pages': [{}, {'page_name': ['name']}]}}}),
+            {'id': ALL, 'payload': {'pages': {1: {'page_name': ALL}}}})
+
+    def test_whole_document_selected(self):
+        self.assertIs(streaming.response_selectors(
+            {'response_expectation': ['.*']}), ALL)
+
+
+@unittest.skipIf(streaming.get_ijson() is None, 'requires ijson')
+class TestParseSelected(unittest.TestCase):
+
+    def test_parse_selected(self):
+        selector = {'id': ALL,
+                    'payload': {'pages': {1: {'properties': ALL}}}}
+        self.assertEqual(
+            streaming.parse_selected(_chunks(DOCUMENT), selector),
+            {'id': '6857017661',
+             'payload': {'pages': [None, {'properties': {'color': 'red',
+                                                         'size': 2}}]}})
+
+    def test_parse_wildcard_matches_json(self):
+        selector = {'payload': {'pages': {WILDCARD: {'properties': ALL}}}}
+        parsed = streaming.parse_selected(_chunks(DOCUMENT), selector)
+        self.assertEqual(
+            [page['properties'] for page in parsed['payload']['pages']],
+            [page['properties'] for page in DOCUMENT['payload']['pages']])
+        self.assertIsInstance(
+            parsed['payload']['pages'][0]['properties']['size'], float)
+
+    def test_process_stream_response(self):
+        template = '''
+rest_calls:
+  - path: /pages
+    method: GET
+    stream_response: true
+    response_expectation: [payload, pages, 0, action, edited]
+    response_translation:
+      - [[id], [page_id]]
+      - [[payload, pages, [page_name]], [names]]
+'''
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/pages', json=DOCUMENT)
+            streamed = utility.process({}, template, {
+                'host': 'test.test', 'port': -1, 'ssl': False,
+                'verify': True})
+            full = utility.process({}, template.replace(
+                'stream_response: true', 'stream_response: false'), {
+                'host': 'test.test', 'port': -1, 'ssl': False,
+                'verify': True})
+        self.assertEqual(streamed, full)
+        self.assertEqual(streamed['page_id'], '6857017661')
+
+
+XML_DOCUMENT = b'''<?xml version="1.0" encoding="UTF-8"?>
+<response status="ok">
+  <result>
+    <system>
+      <vm-uuid>111</vm-uuid>
+      <name lang="en">first <b>bold</b> tail</name>
+      <empty/>
+    </system>
+    <system>
+      <vm-uuid>222</vm-uuid>
+      <name>second</name>
+    </system>
+    <other><x>1</x><x>2</x></other>
+    text of result
+  </result>
+</response>
+'''
+
+
+class TestParseSelectedXml(unittest.TestCase):
+
+    def _parse(self, call, document=XML_DOCUMENT, encoding='utf-8'):
+        selector = streaming.xml_selectors(
+            streaming.response_selectors(call))
+        chunks = [document[i:i + 5] for i in range(0, len(document), 5)]
+        return streaming.parse_selected_xml(chunks, selector, encoding)
+
+    def test_whole_document_matches_xmltodict(self):
+        self.assertEqual(
+            self._parse({'response_expectation': ['.*']}),
+            xmltodict.parse(XML_DOCUMENT.decode('utf-8')))
+
+    def test_selected_paths_match_xmltodict(self):
+        call = {
+            'response_expectation': [
+                ['response', '@status', 'ok'],
+                ['response', 'result', '#text', 'text of result']],
+            'response_translation': [
+                [['response', 'result', 'system', ['name']], ['names']],
+                [['response', 'result', 'other', 'x', 1], ['x']]]}
+        expected = {}
+        utility._translate_and_save(
+            xmltodict.parse(XML_DOCUMENT.decode('utf-8')),
+            copy.deepcopy(call['response_translation']), expected)
+        parsed = self._parse(call)
+        utility._check_expectation(parsed, call['response_expectation'])
+        result = {}
+        utility._translate_and_save(parsed, call['response_translation'],
+                                    result)
+        self.assertEqual(result, expected)
+        self.assertNotIn('vm-uuid',
+                         parsed['response']['result']['system'][0])
+
+    def test_encoding_from_headers(self):
+        document = u'<a><b>za\u017c\xf3\u0142\u0107</b></a>'.encode(
+            'iso-8859-2')
+        self.assertEqual(
+            self._parse({'response_translation': {'a': {'b': ['b']}}},
+                        document, 'iso-8859-2'),
+            {'a': {'b': u'za\u017c\xf3\u0142\u0107'}})
+
+    def test_process_stream_response_xml(self):
+        with open(os.path.join(__location__, 'template5.yaml')) as f:
+            template = f.read() + '    stream_response: true\n'
+        with open(os.path.join(__location__, 'get_response5.xml')) as f:
+            xml = f.read()
+        with requests_mock.mock() as m:
+            m.get('http://test.test:80/v1/get_response5', text=xml)
+            self.assertEqual(
+                utility.process({}, template, {
+                    'host': 'test.test', 'port': -1, 'ssl': False,
+                    'verify': True}),
+                {'UUID': '111111111111111111111111111111',
+                 'CPUID': 'ABS:FFF222777'})
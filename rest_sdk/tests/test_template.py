@@ -0,0 +1,95 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import ast
+import os
+import subprocess
+import sys
+import unittest
+
+import yaml
+from jinja2 import Template
+
+from rest_sdk import template
+
+__location__ = os.path.realpath(
+    os.path.join(os.path.dirname(__file__), '..', '..', 'rest_plugin',
+                 'tests'))
+
+
+class TestCompiledTemplate(unittest.TestCase):
+
+    def setUp(self):
+        template.clear_cache()
+
+    def test_render_matches_literal_eval_rendering(self):
+        params = {'USER': 'testuser', 'id1': '101'}
+        with open(os.path.join(__location__, 'template1.yaml')) as f:
+            source = f.read()
+        compiled = template.get_compiled(source)
+        for index, call in enumerate(yaml.load(source,
+                                               Loader=yaml.SafeLoader)
+                                     ['rest_calls']):
+            expected = ast.literal_eval(Template(str(call)).render(params))
+            self.assertEqual(compiled.render_call(index, params), expected)
+
+    def test_templated_keys_and_trailing_newline(self):
+        compiled = template.get_compiled(
+            'rest_calls:\n'
+            '  - path: /{{path}}\n'
+            '    payload: >\n'
+            '      {{value}}\n'
+            '    response_translation:\n'
+            '      "{{key}}": [name]\n')
+        self.assertEqual(
+            compiled.render_call(0, {'path': 'a', 'value': 'b', 'key': 'c'}),
+            {'path': '/a', 'payload': 'b\n',
+             'response_translation': {'c': ['name']}})
+
+    def test_render_returns_copies(self):
+        compiled = template.get_compiled(
+            'rest_calls:\n'
+            '  - response_expectation: [status, ok]\n')
+        compiled.render_call(0, {})['response_expectation'].pop(-1)
+        self.assertEqual(compiled.render_call(0, {}),
+                         {'response_expectation': ['status', 'ok']})
+
+    def test_cache_shared_by_content(self):
+        source = 'rest_calls:\n  - path: /get\n'
+        self.assertIs(template.get_compiled(source),
+                      template.get_compiled(source[:]))
+        self.assertEqual(template.cache_info()['hits'], 1)
+        self.assertEqual(template.cache_info()['misses'], 1)
+
+    def test_cache_bounded(self):
+        template.set_cache_size(2)
+        try:
+            for path in ('a', 'b', 'c'):
+                template.get_compiled(
+                    'rest_calls:\n  - path: /{}\n'.format(path))
+            self.assertEqual(template.cache_info()['size'], 2)
+        finally:
+            template.set_cache_size(template.DEFAULT_CACHE_SIZE)
+
+    def test_optional_modules_not_imported(self):
+        # fresh interpreter, modules imported by the tests don't count
+        output = subprocess.check_output([sys.executable, '-c', """
+import sys
+from rest_sdk import template, utility
+template.get_compiled('rest_calls:\\n  - path: /vms\\n')
+print(' '.join(name for name in ('jinja2', 'xmltodict', 'ijson',
+                                 'multiprocessing.pool')
+               if name in sys.modules))
+"""], cwd=os.path.join(os.path.dirname(__file__), '..', '..'))
+        self.assertEqual(output.strip(), b'')
@@ -0,0 +1,129 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import time
+import unittest
+
+import requests
+
+from rest_sdk import auth, cache, hosts, timeouts, utility
+from rest_sdk.exceptions import DeadlineExceededException, \
+    WrongTemplateDataException
+from rest_sdk.transport import build_response
+
+REQUEST_PROPS = {'host': 'test.test', 'port': -1, 'ssl': False,
+                 'verify': True}
+
+
+class _Transport(object):
+    # answers after delay seconds, read timeout like requests
+
+    def __init__(self, delay=0, body=b'{"state": "pending"}'):
+        self.delay = delay
+        self.body = body
+        self.timeouts = []
+
+    def request(self, method, url, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        if timeout is not None and timeout[1] is not None and \
+                timeout[1] < self.delay:
+            time.sleep(timeout[1])
+            raise requests.exceptions.ReadTimeout(url)
+        time.sleep(self.delay)
+        return build_response(200, 'OK', {}, self.body, url)
+
+
+class TestTimeouts(unittest.TestCase):
+
+    def setUp(self):
+        hosts.get_default_selector().reset()
+        auth.clear()
+        cache.clear()
+
+    def test_request_timeout(self):
+        self.assertIsNone(timeouts.request_timeout({}))
+        self.assertEqual(
+            timeouts.request_timeout({'connect_timeout': 5,
+                                      'read_timeout': '60'}), (5, 60))
+        self.assertEqual(timeouts.request_timeout({'read_timeout': 0}),
+                         None)
+        now = [0]
+        deadline = timeouts.Deadline(10, clock=lambda: now[0])
+        now[0] = 8
+        self.assertEqual(
+            timeouts.request_timeout({'connect_timeout': 5}, deadline),
+            (2, 2))
+        now[0] = 11
+        with self.assertRaises(DeadlineExceededException):
+            deadline.check()
+        with self.assertRaises(WrongTemplateDataException):
+            timeouts.request_timeout({'read_timeout': 'long'})
+
+    def test_call_timeouts_passed_to_transport(self):
+        transport = _Transport(body=b'{}')
+        utility.process({}, '''
+rest_calls:
+  - path: /a
+    method: GET
+    connect_timeout: 2
+  - path: /b
+    method: GET
+''', dict(REQUEST_PROPS, read_timeout=30), transport)
+        self.assertEqual(transport.timeouts, [(2, 30), (None, 30)])
+
+    def test_deadline_cancels_remaining_calls(self):
+        transport = _Transport(delay=0.2, body=b'{}')
+        with self.assertRaises(DeadlineExceededException):
+            utility.process({}, '''
+rest_calls:
+  - path: /a
+    method: GET
+  - path: /b
+    method: GET
+  - path: /c
+    method: GET
+''', dict(REQUEST_PROPS, deadline=0.3), transport)
+        self.assertEqual(len(transport.timeouts), 2)
+        # read timeout of the second call cut to the time left
+        self.assertLess(transport.timeouts[1][1], 0.2)
+
+    def test_deadline_stops_polling(self):
+        transport = _Transport()
+        started = time.time()
+        with self.assertRaises(DeadlineExceededException) as context:
+            utility.process({}, '''
+rest_calls:
+  - path: /status
+    method: GET
+    response_expectation: [state, ready]
+    poll: {timeout: 60, interval: 0.1, backoff: 1, jitter: 0}
+''', dict(REQUEST_PROPS, deadline=0.35), transport)
+        self.assertLess(time.time() - started, 1)
+        self.assertIn('does not match', str(context.exception))
+
+    def test_deadline_of_cached_call_and_token(self):
+        for props in (True, False):
+            request_props = dict(REQUEST_PROPS, deadline=0.2)
+            if not props:
+                request_props['auth'] = {
+                    'type': 'client_credentials',
+                    'token_url': 'http://idp.test/token',
+                    'client_id': 'plugin', 'client_secret': 'secret'}
+            with self.assertRaises(DeadlineExceededException):
+                utility.process({}, '''
+rest_calls:
+  - path: /a
+    method: GET
+''' + ('    cache: {ttl: 60}\n' if props else ''), request_props,
+                                _Transport(delay=0.5))
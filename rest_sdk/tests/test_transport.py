@@ -0,0 +1,89 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+import threading
+import unittest
+
+from mock import patch
+
+from rest_sdk import transport
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"status": "ok"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Set-Cookie', 'session=secret')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSessionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), _KeepAliveHandler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.url = 'http://127.0.0.1:{}/get'.format(
+            self.server.server_address[1])
+        self.pool = transport.SessionPool()
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_reused(self):
+        for _ in range(5):
+            self.assertEqual(self.pool.request('GET', self.url).json(),
+                             {'status': 'ok'})
+        stats = self.pool.statistics()
+        self.assertEqual(stats['sessions_created'], 1)
+        self.assertEqual(stats['connections'], 1)
+        self.assertEqual(stats['requests'], 5)
+        self.assertEqual(stats['reused'], 4)
+
+    def test_sessions_keyed_by_verify(self):
+        self.assertIs(self.pool.session_for(self.url, True),
+                      self.pool.session_for(self.url + '?q=1', True))
+        self.assertIsNot(self.pool.session_for(self.url, True),
+                         self.pool.session_for(self.url, False))
+
+    def test_cookies_not_shared(self):
+        self.pool.request('GET', self.url)
+        self.assertEqual(len(self.pool.session_for(self.url).cookies), 0)
+
+    def test_idle_eviction_keeps_counters(self):
+        self.pool.configure(idle_timeout=10)
+        with patch('rest_sdk.transport.time.time', return_value=100):
+            self.pool.request('GET', self.url)
+        with patch('rest_sdk.transport.time.time', return_value=120):
+            self.pool.evict_idle()
+        stats = self.pool.statistics()
+        self.assertEqual(stats['sessions'], 0)
+        self.assertEqual(stats['sessions_evicted'], 1)
+        self.assertEqual(stats['requests'], 1)
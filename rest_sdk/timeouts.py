@@ -0,0 +1,97 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Timeouts of calls: connect_timeout and read_timeout of a call (seconds,
+# empty - no timeout) and deadline of the whole process() execution
+# (seconds from request_props, empty or 0 - no deadline). Timeouts of
+# every request are cut to the time left until the deadline.
+
+import time
+
+from .exceptions import DeadlineExceededException, \
+    WrongTemplateDataException
+
+
+MIN_TIMEOUT = 0.001
+
+
+class Deadline(object):
+
+    def __init__(self, seconds=None, clock=time.time):
+        self._clock = clock
+        self.seconds = _seconds(seconds, 'deadline') or None
+        self.expires = clock() + self.seconds if self.seconds else None
+
+    def remaining(self):
+        """
+        Seconds left, None without deadline.
+        """
+        if self.expires is None:
+            return None
+        return max(self.expires - self._clock(), 0)
+
+    def expired(self):
+        return self.expires is not None and self._clock() >= self.expires
+
+    def check(self, what='call'):
+        if self.expired():
+            raise DeadlineExceededException(
+                'Deadline of {}s exceeded, {} cancelled'.format(
+                    self.seconds, what))
+
+    def cap(self, seconds):
+        """
+        seconds limited to the time left
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return seconds
+        if seconds is None:
+            return remaining
+        return min(seconds, remaining)
+
+
+def request_timeout(call, deadline=None):
+    """
+    timeout argument of requests for the call: (connect, read) tuple or
+    None for no timeout.
+    """
+    deadline = deadline or NO_DEADLINE
+    connect = deadline.cap(_seconds(call.get('connect_timeout'),
+                                    'connect_timeout') or None)
+    read = deadline.cap(_seconds(call.get('read_timeout'),
+                                 'read_timeout') or None)
+    if connect is None and read is None:
+        return None
+    # 0 is not accepted by requests
+    return (max(connect, MIN_TIMEOUT) if connect is not None else None,
+            max(read, MIN_TIMEOUT) if read is not None else None)
+
+
+def _seconds(value, name):
+    if value is None or value == '':
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise WrongTemplateDataException(
+            '{} has to be a number of seconds, got {}'.format(name, value))
+    if value < 0:
+        raise WrongTemplateDataException(
+            '{} can not be negative'.format(name))
+    return value
+
+
+NO_DEADLINE = Deadline()
@@ -0,0 +1,240 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.compat import cookielib, urlparse
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3 import connectionpool
+
+from . import LOGGER_NAME
+from . import metrics as _metrics
+
+logger = logging.getLogger(LOGGER_NAME)
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_IDLE_TIMEOUT = 300
+
+
+class SessionPool(object):
+    """
+    Keep-alive transport shared by all calls made in the agent process.
+    One requests.Session is kept for every (scheme, host, port, verify),
+    so consecutive calls against the same API reuse open connections
+    instead of paying for a new TCP (and TLS) handshake.
+    """
+
+    def __init__(self, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        """
+        :param pool_connections: number of urllib3 pools cached per session
+        :param pool_maxsize: max connections kept open per pool
+        :param idle_timeout: seconds after which an unused session is closed
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._closed_counters = {'connections': 0, 'requests': 0}
+        self._counters = {'sessions_created': 0, 'sessions_evicted': 0}
+
+    def configure(self, pool_connections=None, pool_maxsize=None,
+                  idle_timeout=None):
+        """
+        Change pool settings. Sizes apply to sessions created afterwards.
+        """
+        with self._lock:
+            if pool_connections is not None:
+                self.pool_connections = pool_connections
+            if pool_maxsize is not None:
+                self.pool_maxsize = pool_maxsize
+            if idle_timeout is not None:
+                self.idle_timeout = idle_timeout
+
+    def request(self, method, url, verify=True, **kwargs):
+        return self.session_for(url, verify).request(method, url,
+                                                     verify=verify, **kwargs)
+
+    def session_for(self, url, verify=True):
+        parsed = urlparse(url)
+        key = (parsed.scheme, parsed.hostname, parsed.port, verify)
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._sessions.get(key)
+            if entry is None:
+                logger.debug('new session for {}'.format(key))
+                entry = [self._new_session(), now]
+                self._sessions[key] = entry
+                self._counters['sessions_created'] += 1
+            entry[1] = now
+            return entry[0]
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict_idle(time.time())
+
+    def close(self):
+        with self._lock:
+            for key in list(self._sessions):
+                self._close(key)
+
+    def statistics(self):
+        """
+        Connection reuse counters. "connections" is the number of
+        connections opened so far and "requests" the number of requests
+        sent through them, so "reused" is how many handshakes were saved.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats['sessions'] = len(self._sessions)
+            connections = self._closed_counters['connections']
+            sent = self._closed_counters['requests']
+            for session, _ in self._sessions.values():
+                pool_connections, pool_requests = _session_counters(session)
+                connections += pool_connections
+                sent += pool_requests
+        stats['connections'] = connections
+        stats['requests'] = sent
+        stats['reused'] = max(sent - connections, 0)
+        return stats
+
+    def _new_session(self):
+        session = requests.Session()
+        # sessions are shared by unrelated calls and node instances,
+        # cookies set by one of them must not leak into the others
+        session.cookies.set_policy(
+            cookielib.DefaultCookiePolicy(allowed_domains=[]))
+        adapter = _TimedHTTPAdapter(pool_connections=self.pool_connections,
+                                    pool_maxsize=self.pool_maxsize)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _evict_idle(self, now):
+        if not self.idle_timeout:
+            return
+        for key, (_, last_used) in list(self._sessions.items()):
+            if now - last_used > self.idle_timeout:
+                logger.debug('closing idle session {}'.format(key))
+                self._close(key)
+                self._counters['sessions_evicted'] += 1
+
+    def _close(self, key):
+        session, _ = self._sessions.pop(key)
+        pool_connections, pool_requests = _session_counters(session)
+        self._closed_counters['connections'] += pool_connections
+        self._closed_counters['requests'] += pool_requests
+        session.close()
+
+
+class _TimedConnectionMixin(object):
+    # reports connect and TLS handshake times of new connections to
+    # metrics of the call sent in this thread
+
+    def _new_conn(self):
+        started = time.time()
+        conn = super(_TimedConnectionMixin, self)._new_conn()
+        self._tcp_time = time.time() - started
+        return conn
+
+    def connect(self):
+        self._tcp_time = 0
+        started = time.time()
+        super(_TimedConnectionMixin, self).connect()
+        _metrics.add('connect', self._tcp_time)
+        tls_time = time.time() - started - self._tcp_time
+        if self.scheme == 'https':
+            _metrics.add('tls', tls_time)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin,
+                           connectionpool.HTTPConnection):
+    scheme = 'http'
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin,
+                            connectionpool.HTTPSConnection):
+    scheme = 'https'
+
+
+class _TimedHTTPConnectionPool(connectionpool.HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(connectionpool.HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(_TimedHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool}
+
+
+def _session_counters(session):
+    connections = 0
+    sent = 0
+    for adapter in set(session.adapters.values()):
+        pools = getattr(getattr(adapter, 'poolmanager', None), 'pools', None)
+        if pools is None:
+            continue
+        for pool_key in list(pools.keys()):
+            pool = pools.get(pool_key)
+            connections += getattr(pool, 'num_connections', 0)
+            sent += getattr(pool, 'num_requests', 0)
+    return connections, sent
+
+
+def build_response(status_code, reason, headers, body, url):
+    """
+    requests.Response with an already downloaded body, for transports not
+    based on requests. iter_content() works on it like on a streamed one.
+    """
+    response = requests.Response()
+    response.status_code = status_code
+    response.reason = reason
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = url
+    response._content = body
+    response._content_consumed = True
+    return response
+
+
+_default_pool = SessionPool()
+
+
+def get_default_pool():
+    return _default_pool
+
+
+def configure(pool_connections=None, pool_maxsize=None, idle_timeout=None):
+    _default_pool.configure(pool_connections, pool_maxsize, idle_timeout)
+
+
+def statistics():
+    return _default_pool.statistics()
@@ -13,127 +13,699 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
-import yaml
+import copy
 import logging
-import ast
 import re
-import xmltodict
-from jinja2 import Template
+import threading
+import time
 import requests
+from requests.compat import urlparse
 from . import LOGGER_NAME
-from .exceptions import RecoverebleStatusCodeCodeException, \
+from . import accessors as _accessors
+from . import auth as _auth
+from . import broadcast as _broadcast
+from . import cache as _cache
+from . import download as _download
+from . import foreach as _foreach
+from . import hosts as _hosts
+from . import logs as _logs
+from . import metrics as _metrics
+from . import pagination as _pagination
+from . import payload as _payload
+from . import parallel as _parallel
+from . import polling as _polling
+from . import ratelimit as _ratelimit
+from . import streaming as _streaming
+from . import template as _template
+from . import timeouts as _timeouts
+from . import transport as _transport
+from .exceptions import DeadlineExceededException, \
+    RecoverebleStatusCodeCodeException, \
     ExpectationException, UnExpectationException, WrongTemplateDataException
 
 logger = logging.getLogger(LOGGER_NAME)
 
 
-#  request_props (port, ssl, verify, hosts )
-def process(params, template, request_props):
-    logger.debug('template : {}'.format(template))
-    template_yaml = yaml.load(template)
+#  request_props (port, ssl, verify, hosts, max_parallel_calls,
+#  connect_timeout, read_timeout, deadline)
+#  template - template text or rest_sdk.template.CompiledTemplate
+#  transport - object with requests like request(method, url, **kwargs),
+#  by default the keep-alive session pool shared by the whole process
+#  checkpoint - dict updated after every successful call with the index
+#  of the next call and results collected so far, when it was filled by
+#  an earlier execution of the same template processing resumes from it
+#  metrics_sink - callable getting rest_sdk.metrics.CallMetrics of every
+#  call, in addition to sinks registered in rest_sdk.metrics
+def process(params, template, request_props, transport=None,
+            checkpoint=None, metrics_sink=None):
+    if transport is None:
+        transport = _transport.get_default_pool()
+    compiled_template = _template.get_compiled(template)
+    # calls are logged when rendered, with secrets hidden
+    logger.debug('template {} : {} calls'.format(compiled_template.digest,
+                                                 len(compiled_template)))
     result_propeties = {}
-    for call in template_yaml['rest_calls']:
-        call_with_request_props = request_props.copy()
-        logger.debug('call \n {}'.format(call))
+    start = _resume(checkpoint, compiled_template, result_propeties)
+    deadline = _timeouts.Deadline(request_props.get('deadline'))
+
+    def _prepare(index):
+        deadline.check('call {}'.format(index))
         # enrich params with items stored in runtime props by prev calls
         params.update(result_propeties)
-        template_engine = Template(str(call))
-        rendered_call = template_engine.render(params)
-        call = ast.literal_eval(rendered_call)
-        logger.debug('rendered call \n {}'.format(call))
-        call_with_request_props.update(call)
-        logger.info(
-            'call_with_request_props \n {}'.format(call_with_request_props))
-        response = _send_request(call_with_request_props)
-        _process_response(response, call, result_propeties)
+        call_metrics = _metrics.CallMetrics(index)
+        with call_metrics.measure('render'):
+            job = _render_call(compiled_template, index, params,
+                               request_props)
+        call_metrics.method = job[1].get('method')
+        call_metrics.path = job[1].get('path')
+        each = _foreach.Foreach(index, job[0]['foreach'], params) \
+            if job[0].get('foreach') else None
+        return job + (call_metrics, each)
+
+    def _run(job):
+        call, call_with_request_props, accessors, call_metrics, each = job
+        try:
+            with _metrics.activate(call_metrics):
+                if each is not None:
+                    return _send_foreach(compiled_template, each,
+                                         request_props, transport, deadline)
+                return _send_call(call, call_with_request_props, accessors,
+                                  transport, deadline)
+        except Exception as e:
+            _finish_metrics(call_metrics, metrics_sink, e)
+            raise
+
+    def _commit(index, job, json):
+        call, _, accessors, call_metrics, _ = job
+        try:
+            with call_metrics.measure('translate'):
+                _translate_response(json, call, result_propeties, accessors)
+        except Exception as e:
+            _finish_metrics(call_metrics, metrics_sink, e)
+            raise
+        _finish_metrics(call_metrics, metrics_sink)
+        if checkpoint is not None:
+            checkpoint['index'] = index + 1
+
+    max_workers = request_props.get('max_parallel_calls') or 1
+    if max_workers > 1:
+        _parallel.execute(_parallel.call_dependencies(compiled_template),
+                          max_workers, _prepare, _run, _commit, start)
+    else:
+        for index in range(start, len(compiled_template)):
+            job = _prepare(index)
+            _commit(index, job, _run(job))
+    if hasattr(transport, 'statistics'):
+        logger.debug('transport statistics : {}'.format(
+            transport.statistics()))
     return result_propeties
 
 
-def _send_request(call):
-    logger.info(
-        '_send_request request_props:{}'.format(call))
-    port = call['port']
-    ssl = call['ssl']
-    if port == -1:
-        port = 443 if ssl else 80
-    if not call.get('hosts',None):
-        call['hosts'] = [call['host']]
-    for i, host in enumerate(call['hosts']):
-        full_url = '{}://{}:{}{}'.format('https' if ssl else 'http', host,
-                                         port,
-                                         call['path'])
-        logger.debug('full_url : {}'.format(full_url))
-        # check if payload can be used as json
-        if call.get('payload_format', 'json') == 'json':
-            data = None
-            json_payload = call.get('payload', None)
-        else:
-            data = call.get('payload', None)
-            json_payload = None
+def _resume(checkpoint, compiled_template, result_propeties):
+    # returns index of the first call to send
+    if checkpoint is None:
+        return 0
+    index = checkpoint.get('index', 0)
+    if checkpoint.get('template') != compiled_template.digest or \
+            not 0 < index <= len(compiled_template):
+        checkpoint.clear()
+        checkpoint.update({'template': compiled_template.digest,
+                           'index': 0})
+        index = 0
+    else:
+        logger.info('resuming from call {} of {}'.format(
+            index, len(compiled_template)))
+        result_propeties.update(copy.deepcopy(checkpoint['results']))
+    # results of committed calls only, a call failing on expectation or
+    # status is not translated
+    checkpoint['results'] = result_propeties
+    return index
+
+
+def _render_call(compiled_template, index, params, request_props):
+    call = compiled_template.render_call(index, params)
+    call_with_request_props = request_props.copy()
+    call_with_request_props.update(call)
+    log_options = _logs.options(call_with_request_props)
+    logger.debug(_logs.Message(log_options, 'rendered call \n {}',
+                               _auth.redacted(call)))
+    logger.info(_logs.Message(log_options, 'call_with_request_props \n {}',
+                              _auth.redacted(call_with_request_props)))
+    accessors = compiled_template.accessors(index) or \
+        _accessors.CallAccessors(call)
+    return call, call_with_request_props, accessors
+
+
+def _finish_metrics(call_metrics, sink, error=None):
+    call_metrics.finish(error)
+    # one structured record per call, the dict is in record.rest_call
+    logger.info('call {} {} {} finished: status {}, {:.1f}ms, {} bytes '
+                'received{}'.format(
+                    call_metrics.index, call_metrics.method,
+                    call_metrics.path, call_metrics.status_code,
+                    call_metrics.duration * 1000,
+                    call_metrics.bytes_received,
+                    ', error {}'.format(call_metrics.error)
+                    if call_metrics.error else ''),
+                extra={'rest_call': call_metrics.to_dict()})
+    _metrics.emit(call_metrics, sink)
+
+
+def _send_call(call, call_with_request_props, accessors, transport,
+               deadline=_timeouts.NO_DEADLINE):
+    with _payload.resolved(call_with_request_props) as \
+            call_with_request_props:
+        if _broadcast.is_broadcast(call_with_request_props):
+            return _send_broadcast(call, call_with_request_props, accessors,
+                                   transport, deadline)
+        return _send_to_host(call, call_with_request_props, accessors,
+                             transport, deadline)
+
+
+def _send_to_host(call, call_with_request_props, accessors, transport,
+                  deadline=_timeouts.NO_DEADLINE):
+    if call.get('cache'):
+        return _send_cached(call, call_with_request_props, accessors,
+                            transport, deadline)
+    if call.get('pagination'):
+        return _send_pages(call, call_with_request_props, accessors,
+                           transport, deadline)
+    return _send_and_check(call, call_with_request_props, accessors,
+                           transport, deadline)
+
+
+def _send_cached(call, call_with_request_props, accessors, transport,
+                 deadline=_timeouts.NO_DEADLINE):
+    # answer from the response cache, revalidated when stale; results of
+    # the translation are cached with the response
+    policy, cache, entry, request = _cache_lookup(call,
+                                                  call_with_request_props)
+    changed = False
+    if request is not None:
+        try:
+            response = _send_request(request, transport, deadline=deadline)
+        except DeadlineExceededException:
+            raise
+        except Exception as e:
+            _check_deadline(deadline, e)
+            raise
+        entry = _cache_entry(cache, entry, response)
+        if entry is None:
+            call_metrics = _metrics.current() or _metrics.CallMetrics(None)
+            with call_metrics.measure('parse'):
+                return _parse_and_check_response(response, call, accessors)
+        changed = True
+    return _cached_result(call, accessors, policy, cache, entry, changed)
+
+
+def _cache_lookup(call, call_with_request_props):
+    # cache entry of the call and the request to send, None when the
+    # entry is fresh
+    policy = _cache.Policy(call['cache'], call_with_request_props)
+    cache = _cache.get_cache(call_with_request_props.get('cache_dir') or
+                             None)
+    entry = cache.get(policy.key)
+    if entry is not None and entry.fresh(policy.ttl):
+        logger.debug('response of {} taken from cache'.format(
+            call_with_request_props['path']))
+        cache.count('hits')
+        return policy, cache, entry, None
+    headers = dict(call_with_request_props.get('headers') or {})
+    if entry is not None and policy.revalidate:
+        headers.update(entry.validators())
+    return policy, cache, entry, dict(call_with_request_props,
+                                      headers=headers)
+
 
+def _cache_entry(cache, entry, response):
+    # entry of the response, None when it can't be cached
+    if response.status_code == 304 and entry is not None:
+        cache.count('revalidated')
+        return entry.revalidated(response)
+    cache.count('misses')
+    if not _cache.cacheable(response):
+        return None
+    return _cache.Entry.from_response(response)
+
+
+def _cached_result(call, accessors, policy, cache, entry, changed):
+    call_metrics = _metrics.current() or _metrics.CallMetrics(None)
+    properties = entry.results.get(policy.translation)
+    if properties is None:
+        with call_metrics.measure('parse'):
+            json = _parse_and_check_response(entry.response(), call,
+                                             accessors)
+        properties = {}
+        with call_metrics.measure('translate'):
+            _translate_response(json, call, properties, accessors)
+        entry.results[policy.translation] = properties
+        changed = True
+    if changed:
+        cache.put(policy.key, entry)
+    return _cache.Cached(copy.deepcopy(properties))
+
+
+def _send_broadcast(call, call_with_request_props, accessors, transport,
+                    deadline=_timeouts.NO_DEADLINE):
+    # send the call to every host at the same time, every response is
+    # checked and translated on its own
+    broadcast = _broadcast.Broadcast(
+        call_with_request_props.get('broadcast'),
+        [host for host, _ in _request_urls(call_with_request_props)])
+    call_metrics = _metrics.current() or _metrics.CallMetrics(None)
+    lock = threading.Lock()
+
+    def _host(host):
+        host_metrics = _metrics.CallMetrics(call_metrics.index)
         try:
-            response = requests.request(call['method'], full_url,
-                                        headers=call.get('headers', None),
-                                        data=data,
-                                        json=json_payload,
-                                        verify=call['verify'])
+            with _metrics.activate(host_metrics):
+                json = _send_to_host(
+                    call, dict(call_with_request_props, hosts=[host]),
+                    accessors, transport, deadline)
+                properties = {}
+                with host_metrics.measure('translate'):
+                    _translate_response(json, call, properties, accessors)
+                return properties
+        finally:
+            with lock:
+                call_metrics.merge(host_metrics)
+
+    return _broadcast.Result(broadcast, *_broadcast.run(
+        broadcast, _parallel.bind_context(_host), deadline))
+
+
+def _send_foreach(compiled_template, each, request_props, transport,
+                  deadline=_timeouts.NO_DEADLINE):
+    # render and send the call for every element, responses are
+    # translated as they arrive
+    call_metrics = _metrics.current() or _metrics.CallMetrics(None)
+    lock = threading.Lock()
+
+    def _element(position):
+        element_metrics = _metrics.CallMetrics(each.index)
+        try:
+            with _metrics.activate(element_metrics):
+                deadline.check('call {} element {}'.format(each.index,
+                                                           position))
+                with element_metrics.measure('render'):
+                    call, call_with_request_props, accessors = \
+                        _render_call(compiled_template, each.index,
+                                     each.params(position), request_props)
+                json = _send_call(call, call_with_request_props, accessors,
+                                  transport, deadline)
+                properties = {}
+                with element_metrics.measure('translate'):
+                    _translate_response(json, call, properties, accessors)
+                return properties
+        finally:
+            with lock:
+                call_metrics.merge(element_metrics)
+
+    logger.info('call {} sent for {} elements'.format(each.index,
+                                                      len(each)))
+    return _foreach.Result(each, *_foreach.run(
+        each, _parallel.bind_context(_element)))
+
+
+def _send_and_check(call, call_with_request_props, accessors, transport,
+                    deadline=_timeouts.NO_DEADLINE):
+    return _send_and_check_response(call, call_with_request_props,
+                                    accessors, transport, deadline)[1]
+
+
+def _send_pages(call, call_with_request_props, accessors, transport,
+                deadline=_timeouts.NO_DEADLINE):
+    # send the call and follow its pages, every page is checked and
+    # translated before the next one is processed
+    pagination = _pagination.Pagination(call['pagination'])
+    pages = _pagination.Pages(pagination)
+    call_metrics = _metrics.current() or _metrics.CallMetrics(None)
+    path = call_with_request_props['path']
+
+    def _fetch(page_path, page):
+        page_call = dict(call_with_request_props, path=page_path)
+        with _metrics.activate(call_metrics):
+            response, json = _send_and_check_response(
+                call, page_call, accessors, transport, deadline)
+        return json, pagination.next_path(path, response.url, response,
+                                          json, page)
+
+    fetched = _pagination.iterate(_parallel.bind_context(_fetch),
+                                  pagination.first_path(path),
+                                  pagination.prefetch)
+    try:
+        for json in fetched:
+            properties = {}
+            with call_metrics.measure('translate'):
+                _translate_response(json, call, properties, accessors)
+            pages.add(json, properties)
+    finally:
+        fetched.close()
+    logger.info('{} pages received'.format(pages.count))
+    return pages
+
+
+def _send_and_check_response(call, call_with_request_props, accessors,
+                             transport, deadline=_timeouts.NO_DEADLINE):
+    # send the call (again and again if it has poll) and parse the response
+    poll = _polling.call_poll(call)
+    call_metrics = _metrics.current() or _metrics.CallMetrics(None)
+    download = _download.Download(call['download'],
+                                  call_with_request_props) \
+        if call.get('download') else None
+    while True:
+        try:
+            deadline.check()
+            response = _send_request(call_with_request_props, transport,
+                                     deadline=deadline)
+            with call_metrics.measure('parse'):
+                return response, _parse_and_check_response(
+                    response, call, accessors, download)
+        except DeadlineExceededException:
+            raise
+        except Exception as e:
+            delay = _poll_delay(poll, e)
+            _check_deadline(deadline, e, delay)
+            if delay is None:
+                raise
+        call_metrics.retries += 1
+        with call_metrics.measure('wait'):
+            time.sleep(delay)
+
+
+def _check_deadline(deadline, exception, delay=None):
+    # failure caused by timeouts cut to the deadline, or no time left for
+    # the next poll attempt
+    remaining = deadline.remaining()
+    if remaining is not None and \
+            (not remaining or delay is not None and delay >= remaining):
+        raise DeadlineExceededException(
+            'Deadline of {}s exceeded, last error: {}'.format(
+                deadline.seconds, exception))
+
+
+def _poll_delay(poll, exception):
+    if poll is None:
+        return None
+    delay = poll.next_delay(exception)
+    if delay is not None:
+        logger.info('poll attempt {} failed: {}, next attempt in {:.1f}s'
+                    .format(poll.attempts, exception, delay))
+    return delay
+
+
+def _send_request(call, transport=None, selector=None,
+                  deadline=_timeouts.NO_DEADLINE):
+    if transport is None:
+        transport = _transport.get_default_pool()
+    logger.info(_logs.Message(_logs.options(call),
+                              '_send_request request_props:{}',
+                              _auth.redacted(call)))
+    authenticator = _auth.get_authenticator(call.get('auth'))
+    if authenticator is None:
+        response = _send_throttled(call, transport, selector, deadline)
+    else:
+        _fetch = _token_fetch(call, transport, deadline)
+        headers = authenticator.headers(_fetch)
+        response = _send_throttled(_with_headers(call, headers), transport,
+                                   selector, deadline)
+        if response.status_code == 401 and authenticator.renewable:
+            logger.info('auth token rejected, sending with a new one')
+            response.close()
+            authenticator.invalidate(headers)
+            response = _send_throttled(
+                _with_headers(call, authenticator.headers(_fetch)),
+                transport, selector, deadline)
+    _check_status(response, call)
+    return response
+
+
+def _token_fetch(call, transport=None, deadline=_timeouts.NO_DEADLINE):
+    # requests of auth tokens, sent with the timeouts of the call
+    if transport is None:
+        transport = _transport.get_default_pool()
+
+    def _fetch(method, url, **kwargs):
+        kwargs.setdefault('verify', call['verify'])
+        try:
+            return transport.request(
+                method, url,
+                timeout=_timeouts.request_timeout(call, deadline), **kwargs)
+        except Exception as e:
+            _check_deadline(deadline, e)
+            raise
+    return _fetch
+
+
+def _with_headers(call, headers):
+    # headers of the call win over the added ones
+    headers = dict(headers)
+    headers.update(call.get('headers') or {})
+    return dict(call, headers=headers)
+
+
+def _send_throttled(call, transport, selector=None,
+                    deadline=_timeouts.NO_DEADLINE):
+    # with rate_limit, 429 and 503 responses are sent again after the
+    # host was slowed down
+    options = call.get('rate_limit')
+    options = _ratelimit.Options(options) if options else None
+    response = _send_to_hosts(call, transport, selector, deadline)
+    for attempt in range(options.retries if options else 0):
+        if not _send_again(response, options, deadline):
+            break
+        logger.info('response {} throttled, attempt {} of {}'.format(
+            response.status_code, attempt + 1, options.retries))
+        response.close()
+        response = _send_to_hosts(call, transport, selector, deadline)
+    return response
+
+
+def _send_again(response, options, deadline):
+    # throttled response, unless Retry-After is too long to wait for
+    if response.status_code not in _ratelimit.THROTTLED:
+        return False
+    wait = _polling.retry_after(response) or 0
+    remaining = deadline.remaining()
+    return wait <= options.max_wait and \
+        (remaining is None or wait < remaining)
+
+
+def _send_to_hosts(call, transport, selector=None,
+                   deadline=_timeouts.NO_DEADLINE):
+    if selector is None:
+        selector = _hosts.get_default_selector()
+    data, json_payload, headers = _payload.request_body(call)
+    urls = _request_urls(call)
+    by_key = dict((_host_key(url), (host, url)) for host, url in urls)
+    strategy = call.get('host_selection') or _hosts.ORDERED
+    hosts = selector.order([_host_key(url) for _, url in urls], strategy)
+    call_metrics = _metrics.current() or _metrics.CallMetrics(None)
+
+    def _attempt(key):
+        host, full_url = by_key[key]
+        deadline.check('request to {}'.format(host))
+        logger.debug('full_url : {}'.format(full_url))
+        call_metrics.hosts.append(host)
+        limiter = _ratelimit.get_limiter(key, call.get('rate_limit'))
+        if limiter is not None:
+            call_metrics.add('throttle', limiter.acquire(deadline))
+        started = time.time()
+        status_code, retry_after = None, None
+        try:
+            with _metrics.activate(call_metrics):
+                response = transport.request(
+                    call['method'], full_url,
+                    headers=headers, data=data,
+                    json=json_payload, verify=call['verify'],
+                    stream=_stream_response(call),
+                    timeout=_timeouts.request_timeout(call, deadline))
+            status_code = response.status_code
+            retry_after = _polling.retry_after(response)
         except requests.exceptions.ConnectionError:
             logger.debug('ConnectionError for host : {}'.format(host))
-            if i == len(call['hosts']) - 1:
+            call_metrics.failovers += 1
+            selector.failure(key)
+            raise
+        finally:
+            if limiter is not None:
+                limiter.release(status_code, retry_after)
+        selector.success(key, time.time() - started)
+        return response, time.time() - started
+
+    connecting = _connect_time(call_metrics)
+    response = None
+    if strategy == _hosts.RACE and len(hosts) > 1 and \
+            str(call['method']).upper() in _parallel.SAFE_METHODS:
+        attempt = _parallel.bind_context(_attempt)
+        try:
+            _, (response, request_time) = _hosts.race(
+                [lambda key=key: attempt(key) for key in hosts[:2]])
+        except requests.exceptions.ConnectionError:
+            if len(hosts) == 2:
                 logger.error('No host from list available')
                 raise
-            else:
-                continue
+        hosts = hosts[2:] if response is None else []
+    for i, key in enumerate(hosts):
+        try:
+            response, request_time = _attempt(key)
+            break
+        except requests.exceptions.ConnectionError:
+            if i == len(hosts) - 1:
+                logger.error('No host from list available')
+                raise
+    _record_response(call_metrics, response, request_time,
+                     _connect_time(call_metrics) - connecting,
+                     _stream_response(call))
+    return response
+
+
+def _host_key(url):
+    # hosts are told apart by scheme, name and port
+    return '{0.scheme}://{0.netloc}'.format(urlparse(url))
+
 
-    logger.info(
-        'response \n text:{}\n status_code:{}\n'.format(response.text,
-                                                        response.status_code))
+def _connect_time(call_metrics):
+    return call_metrics.phases.get('connect', 0) + \
+        call_metrics.phases.get('tls', 0)
+
+
+def _record_response(call_metrics, response, request_time, connect_time,
+                     stream):
+    # elapsed of requests is the time until headers were parsed, including
+    # opening of a new connection
+    elapsed = response.elapsed.total_seconds() if response.elapsed else 0
+    if elapsed:
+        call_metrics.add('ttfb', max(elapsed - connect_time, 0))
+        if not stream:
+            call_metrics.add('download', max(request_time - elapsed, 0))
+    else:
+        call_metrics.add('ttfb', max(request_time - connect_time, 0))
+    call_metrics.status_code = response.status_code
+    body = getattr(response.request, 'body', None)
+    if isinstance(body, _payload.Body):
+        call_metrics.bytes_sent += body.sent
+    elif body:
+        call_metrics.bytes_sent += len(body)
+    if response._content_consumed and \
+            isinstance(response._content, bytes):
+        call_metrics.bytes_received += len(response._content)
+    elif response.headers.get('Content-Length', '').isdigit():
+        call_metrics.bytes_received += int(
+            response.headers['Content-Length'])
+
+
+def _request_urls(call):
+    port = call['port']
+    ssl = call['ssl']
+    if port == -1:
+        port = 443 if ssl else 80
+    hosts = call.get('hosts', None) or [call['host']]
+    return [(host, '{}://{}:{}{}'.format('https' if ssl else 'http', host,
+                                         port, call['path']))
+            for host in hosts]
+
+
+def _stream_response(call):
+    # downloads are written to a file while received
+    return bool(call.get('stream_response', False) or call.get('download'))
+
+
+def _check_status(response, call):
+    if _stream_response(call):
+        # body not downloaded yet
+        logger.info(
+            'response \n status_code:{}\n'.format(response.status_code))
+    else:
+        logger.info(_logs.Message(
+            _logs.options(call), 'response \n text:{}\n status_code:{}\n',
+            _logs.Body(response), response.status_code))
     try:
         response.raise_for_status()
     except requests.exceptions.HTTPError:
         if response.status_code in call.get('recoverable_codes', []):
-            raise RecoverebleStatusCodeCodeException(
+            exception = RecoverebleStatusCodeCodeException(
                 'Response code {} defined as recoverable'.format(
                     response.status_code))
+            exception.retry_after = _polling.retry_after(response)
+            raise exception
         raise
-    return response
+
+
+# marks responses which are not parsed (response_format: raw)
+RAW_RESPONSE = object()
 
 
 def _process_response(response, call, store_props):
-    logger.debug(
-        '_process_response \n response:{}\n call:{}\n store_props:{}'.format(
-            response,
-            call, store_props))
+    logger.debug(_logs.Message(
+        _logs.options(call),
+        '_process_response \n response:{}\n call:{}\n store_props:{}',
+        response, _auth.redacted(call), store_props))
+    json = _parse_and_check_response(response, call)
+    _translate_response(json, call, store_props)
+
+
+def _parse_and_check_response(response, call, accessors=None,
+                              download=None):
+    if accessors is None:
+        accessors = _accessors.CallAccessors(call)
     response_format = call.get('response_format', 'json').upper()
 
-    if re.match('JSON|XML', response_format):
+    def _check(json):
+        try:
+            accessors.check(json)
+        except ExpectationException as e:
+            e.retry_after = _polling.retry_after(response)
+            raise
+
+    if response_format == 'RAW':
+        if download is None:
+            logger.debug('no action for raw response_format')
+            return RAW_RESPONSE
+        # a file failing expectations doesn't replace the target
+        return download.save(response, _check)
+    elif re.match('JSON|XML', response_format):
         if response_format == 'JSON':
             logger.debug('response_format json')
-            json = response.json()
+            if _stream_response(call):
+                json = _streaming.parse_json(response, call)
+            else:
+                json = response.json()
         else:  # XML
             logger.debug('response_format xml')
-            json = xmltodict.parse(response.text)
-            logger.debug('xml transformed to dict \n{}'.format(json))
-        _check_expectation(json, call.get('response_expectation', None))
-        _check_expectation(json, call.get('response_unexpectation', None),
-                           True)
-        _translate_and_save(json, call.get('response_translation', None),
-                            store_props)
-    elif response_format == 'RAW':
-        logger.debug('no action for raw response_format')
+            if _stream_response(call):
+                json = _streaming.parse_xml(response, call)
+            else:
+                import xmltodict
+                json = xmltodict.parse(response.text)
+            logger.debug(_logs.Message(_logs.options(call),
+                                       'xml transformed to dict \n{}', json))
     else:
         raise WrongTemplateDataException(
             "response_format {} is not supported. "
             "Only json or raw response_format is supported".format(
                 response_format))
+    _check(json)
+    return json
+
+
+def _translate_response(json, call, store_props, accessors=None):
+    if json is RAW_RESPONSE:
+        return
+    if isinstance(json, (_pagination.Pages, _foreach.Result,
+                         _broadcast.Result, _cache.Cached)):
+        _pagination.merge(store_props, json.result())
+        return
+    if accessors is None:
+        accessors = _accessors.CallAccessors(call)
+    accessors.translation.apply(json, store_props)
 
 
 def _check_expectation(json, expectation, unexpectation=False):
-    logger.debug(
-        '_check_expectation \n json:{}\n '
-        'expectation:{}\n '
-        'unexpectation:{}'.format(
-            json, expectation, unexpectation))
+    logger.debug(_logs.Message(
+        _logs.Options(),
+        '_check_expectation \n json:{}\n expectation:{}\n unexpectation:{}',
+        json, expectation, unexpectation))
     if not expectation:
         return
     if not isinstance(expectation, list):
@@ -223,7 +795,6 @@ def _translate_and_save_v1(response_json, response_translation, runtime_dict):
 
 
 def _save(runtime_properties_dict_or_subdict, list, value):
-    print ('----- save ---- \n{}\n{}\n{}\n----------------'.format(runtime_properties_dict_or_subdict,list,value))
     first_el = list.pop(0)
     if len(list) == 0:
         runtime_properties_dict_or_subdict[first_el] = value
@@ -249,7 +820,7 @@ def _prepare_runtime_props_for_list(runtime_props, runtime_props_path , count):
        #print 'l_idx : {}   value : {}'.format(l_idx,value)
         if value == runtime_props_path[-1] or isinstance(runtime_props_path[l_idx+1],list):
            #print(runtime_props)
-            runtime_props[value] = [{}] * count
+            runtime_props[value] = [{} for _ in range(count)]
             return
         else:
             runtime_props[value] = runtime_props.get(value, {})
@@ -33,5 +33,11 @@ setup(
     install_requires=[
         "cloudify-plugins-common>=4.2",
         "PyYAML", 'requests', 'jinja2','xmltodict'
-    ]
+    ],
+    extras_require={
+        # rest_sdk.aio, python 3.5+ only
+        'async': ['aiohttp'],
+        # stream_response: true
+        'streaming': ['ijson'],
+    }
 )